@@ -0,0 +1,94 @@
+"""
+Microbenchmark for CacheManager get/set throughput
+
+Runs a 90/10 get/set mix over a fixed key space at several thread counts,
+comparing a single-lock store (1 shard), the sharded store, and the
+lock-free single-loop mode.
+
+Usage: python benchmarks/bench_cache.py [--ops 200000]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import threading
+import time
+
+# Add backend directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.cache_manager import CacheManager
+
+KEY_SPACE = 2000
+ROUTES = [("JFK", "LAX"), ("SFO", "BOS"), ("ORD", "MIA"), ("SEA", "DEN"), ("ATL", "PHX")]
+
+
+def make_params(i):
+    origin, destination = ROUTES[i % len(ROUTES)]
+    return {"origin": origin, "destination": destination, "departure_date": f"2026-12-{i % 28 + 1:02d}", "n": i}
+
+
+PARAMS = [make_params(i) for i in range(KEY_SPACE)]
+VALUE = {"flights": [{"price": 420, "airline": "Delta Airlines"}] * 6, "count": 6}
+
+
+def worker(cache, ops, seed):
+    rng = random.Random(seed)
+    for _ in range(ops):
+        params = PARAMS[rng.randrange(KEY_SPACE)]
+        if rng.random() < 0.1:
+            cache.set("bench", "flight_search", params, VALUE)
+        else:
+            cache.get("bench", "flight_search", params)
+
+
+def run_threads(cache, total_ops, threads):
+    per_thread = total_ops // threads
+    pool = [threading.Thread(target=worker, args=(cache, per_thread, seed)) for seed in range(threads)]
+    started = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return per_thread * threads / (time.perf_counter() - started)
+
+
+def run_event_loop(cache, total_ops):
+    async def main():
+        started = time.perf_counter()
+        worker(cache, total_ops, 0)
+        return total_ops / (time.perf_counter() - started)
+    return asyncio.run(main())
+
+
+def warm(cache):
+    for params in PARAMS:
+        cache.set("bench", "flight_search", params, VALUE)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--ops", type=int, default=200000)
+    args = parser.parse_args()
+
+    print("CacheManager throughput (ops/sec, 90% get / 10% set)")
+    print("=" * 60)
+    print(f"{'threads':>8} | {'1 shard':>12} | {'16 shards':>12}")
+    print("-" * 60)
+    for threads in (1, 2, 4, 8, 16):
+        single = CacheManager(maxsize=KEY_SPACE * 2, max_bytes=None, shards=1)
+        sharded = CacheManager(maxsize=KEY_SPACE * 2, max_bytes=None, shards=16)
+        warm(single)
+        warm(sharded)
+        print(f"{threads:>8} | {run_threads(single, args.ops, threads):>12,.0f} | "
+              f"{run_threads(sharded, args.ops, threads):>12,.0f}")
+
+    lock_free = CacheManager(maxsize=KEY_SPACE * 2, max_bytes=None, shards=1, lock_free=True)
+    warm(lock_free)
+    print("-" * 60)
+    print(f"lock-free, single event loop: {run_event_loop(lock_free, args.ops):,.0f} ops/sec")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Benchmark live vs pre-serialized (compressed) cache values
+
+For a realistic flight-search payload, compares per-entry memory and the
+cost of a cache hit that ends in a JSON response body: live values are
+re-serialized with json.dumps, serialized values are copied out as bytes.
+
+Usage: python benchmarks/bench_cache_values.py [--hits 20000]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+# Add backend directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.cache_codec import EncodedValue
+from services.cache_manager import CacheManager
+
+PARAMS = {"origin": "JFK", "destination": "LAX", "departure_date": "2026-12-01", "adults": 1}
+
+
+def make_payload(offers=20):
+    segment = {
+        "departure": {"iataCode": "JFK", "terminal": "4", "at": "2026-12-01T08:15:00"},
+        "arrival": {"iataCode": "LAX", "terminal": "B", "at": "2026-12-01T11:40:00"},
+        "carrierCode": "DL", "number": "417", "aircraft": {"code": "321"}, "duration": "PT6H25M",
+    }
+    flights = [{
+        "id": str(i),
+        "price": f"{300 + i * 7}.40",
+        "currency": "USD",
+        "itineraries": [{"duration": "PT6H25M", "segments": [dict(segment, number=str(400 + i))]}],
+        "validatingAirlineCodes": ["DL"],
+        "numberOfBookableSeats": 9,
+    } for i in range(offers)]
+    return {"flights": flights, "count": offers, "route": {"origin": "JFK", "destination": "LAX"}}
+
+
+def hit_to_body(cache, hits):
+    started = time.perf_counter()
+    for _ in range(hits):
+        value = cache.lookup("bench", "flight_search", PARAMS, decode=False).value
+        if isinstance(value, EncodedValue):
+            body = value.json_bytes()
+        else:
+            body = json.dumps(value, separators=(",", ":")).encode("utf-8")
+    return (time.perf_counter() - started) / hits * 1e6, len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--hits", type=int, default=20000)
+    args = parser.parse_args()
+
+    payload = make_payload()
+    modes = [
+        ("live dicts", CacheManager()),
+        ("json bytes", CacheManager(serialize_values=True, compress_level=0)),
+        ("json + zlib", CacheManager(serialize_values=True)),
+    ]
+    print(f"Cache value modes ({len(payload['flights'])} flight offers, {args.hits:,} hits)")
+    print("=" * 64)
+    print(f"{'mode':>12} | {'entry bytes':>12} | {'hit->body us':>13} | {'body bytes':>10}")
+    print("-" * 64)
+    for name, cache in modes:
+        cache.set("bench", "flight_search", PARAMS, payload)
+        entry_bytes = cache.get_stats()['memory']['bytes_used']
+        per_hit_us, body_bytes = hit_to_body(cache, args.hits)
+        print(f"{name:>12} | {entry_bytes:>12,} | {per_hit_us:>13.2f} | {body_bytes:>10,}")
+
+
+if __name__ == "__main__":
+    main()
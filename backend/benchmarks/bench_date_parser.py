@@ -0,0 +1,61 @@
+"""
+Benchmark and golden-corpus check for the date parser
+
+Parses every message in data/date_corpus.jsonl as of its "today" date,
+reports how many start/end dates match the expected ones (null = no date
+expected), then times repeated parses of the whole corpus.
+
+Usage: python benchmarks/bench_date_parser.py [--rounds 200]
+"""
+import argparse
+import datetime
+import json
+import os
+import sys
+import time
+
+# Add backend directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.date_parser import parse_dates
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "date_corpus.jsonl")
+
+
+def load_corpus(path=CORPUS):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    correct = 0
+    for case in corpus:
+        today = datetime.date.fromisoformat(case["today"])
+        dates = parse_dates(case["message"], today)
+        got = (dates.start.isoformat(), dates.end.isoformat() if dates.end else None) if dates else (None, None)
+        if got == (case["start"], case["end"]):
+            correct += 1
+        else:
+            print(f"MISS {case['message']!r} (today {case['today']}): got {got[0]}..{got[1]}, "
+                  f"expected {case['start']}..{case['end']}")
+
+    inputs = [(case["message"], datetime.date.fromisoformat(case["today"])) for case in corpus]
+    started = time.perf_counter()
+    for _ in range(args.rounds):
+        for message, today in inputs:
+            parse_dates(message, today)
+    per_message_us = (time.perf_counter() - started) / (args.rounds * len(inputs)) * 1e6
+
+    print("Date parser")
+    print("=" * 40)
+    print(f"accuracy:    {correct}/{len(corpus)} ({correct / len(corpus):.0%})")
+    print(f"parse time:  {per_message_us:.1f} us/message")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Benchmark for the fuzzy place-name index
+
+Resolves a list of misspelled and nickname city names, reports which ones
+map to the expected code, then times cold lookups (index scan and edit
+distances) and memoized repeats.
+
+Usage: python benchmarks/bench_fuzzy_places.py [--rounds 200]
+"""
+import argparse
+import os
+import sys
+import time
+
+# Add backend directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.fuzzy_places import FuzzyPlaceIndex
+
+CASES = [
+    ("barcelonna", "BCN"),
+    ("barcleona", "BCN"),
+    ("philly", "PHL"),
+    ("san fransisco", "SFO"),
+    ("Los Angelos", "LAX"),
+    ("chicgo", "CHI"),
+    ("Amsterdma", "AMS"),
+    ("pittsburg", "PIT"),
+    ("Minneaplois", "MSP"),
+    ("Cincinatti", "CVG"),
+    ("Phildelphia", "PHL"),
+    ("Albuquerque", None),
+    ("somewhere warm", None),
+    ("travel", None),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    index = FuzzyPlaceIndex()
+    correct = 0
+    for name, expected in CASES:
+        match = index.best(name)
+        code = match.place.code if match else None
+        if code == expected:
+            correct += 1
+        else:
+            print(f"MISS {name!r}: got {code}, expected {expected}")
+
+    names = [name for name, _ in CASES]
+    started = time.perf_counter()
+    for _ in range(args.rounds):
+        FuzzyPlaceIndex()
+    build_ms = (time.perf_counter() - started) / args.rounds * 1e3
+
+    # A one-entry memo never hits while cycling through distinct names
+    cold = FuzzyPlaceIndex(memo_size=1)
+    started = time.perf_counter()
+    for _ in range(args.rounds):
+        for name in names:
+            cold.candidates(name)
+    cold_us = (time.perf_counter() - started) / (args.rounds * len(names)) * 1e6
+
+    started = time.perf_counter()
+    for _ in range(args.rounds):
+        for name in names:
+            index.candidates(name)
+    warm_us = (time.perf_counter() - started) / (args.rounds * len(names)) * 1e6
+
+    print("Fuzzy place index")
+    print("=" * 40)
+    print(f"indexed aliases: {len(index)}")
+    print(f"accuracy:        {correct}/{len(CASES)} ({correct / len(CASES):.0%})")
+    print(f"index build:     {build_ms:.2f} ms")
+    print(f"cold lookup:     {cold_us:.1f} us/name")
+    print(f"memoized lookup: {warm_us:.1f} us/name")
+
+
+if __name__ == "__main__":
+    main()
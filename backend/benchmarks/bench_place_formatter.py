@@ -0,0 +1,81 @@
+"""
+Benchmark for place-name formatting on long itineraries
+
+Builds itineraries of increasing length from day-plan paragraphs, checks
+that every place is wrapped exactly once (no "**__**__" nesting, and
+formatting an already formatted reply changes nothing), then times the
+single-pass formatter against the previous pattern-by-pattern
+findall/replace loop, which re-scans the text per pattern and rewraps
+repeated names.
+
+Usage: python benchmarks/bench_place_formatter.py [--rounds 20]
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+# Add backend directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.place_formatter import DEFAULT_PATH, PlaceNameFormatter
+
+DAY_PLAN = (
+    "Day {day}: Start early at Sagrada Familia, then walk up to Park Güell for the views. "
+    "Lunch at the Boqueria Market or a Cal Tapas nearby on La Rambla. In the afternoon explore "
+    "the Gothic Quarter and the Picasso Museum before sunset at Barceloneta Beach. "
+    "Dinner in the Born District, drinks at Paradiso Bar, and if there is time, Casa Batlló "
+    "and Casa Milà along Passeig de Gràcia. Montjuïc and the Catalonia Palace can wait for day {next}.\n"
+)
+
+
+def itinerary(days):
+    return "".join(DAY_PLAN.format(day=day, next=day + 1) for day in range(1, days + 1))
+
+
+def legacy_format_place_names(text, names, suffixes):
+    """The per-pattern findall + str.replace loop the formatter replaced"""
+    patterns = [r"\b" + re.escape(name) + r"\b" for name in names]
+    patterns += [r"\b[A-Z][a-z]+ " + re.escape(suffix) + r"\b" for suffix in suffixes]
+    for pattern in patterns:
+        for match in re.findall(pattern, text):
+            if not match.startswith("**__") and not match.endswith("__**"):
+                text = text.replace(match, f"**__{match}__**")
+    return text
+
+
+def timed(function, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        function()
+    return (time.perf_counter() - start) / rounds * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    with open(DEFAULT_PATH, encoding="utf-8") as f:
+        data = json.load(f)
+    formatter = PlaceNameFormatter(data["names"], data["suffixes"])
+
+    sample = itinerary(3)
+    formatted = formatter.format(sample)
+    legacy = legacy_format_place_names(sample, data["names"], data["suffixes"])
+    print(f"Nested wrappers: formatter {formatted.count('**__**__')}, legacy {legacy.count('**__**__')}")
+    print(f"Idempotent: {formatter.format(formatted) == formatted}")
+
+    print(f"{'days':>6} {'chars':>8} {'formatter ms':>13} {'legacy ms':>10}")
+    for days in (5, 20, 80):
+        text = itinerary(days)
+        fast = timed(lambda: formatter.format(text), args.rounds)
+        slow = timed(lambda: legacy_format_place_names(text, data["names"], data["suffixes"]),
+                     1)
+        print(f"{days:>6} {len(text):>8} {fast:>13.2f} {slow:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
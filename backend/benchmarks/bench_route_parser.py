@@ -0,0 +1,58 @@
+"""
+Benchmark and accuracy check for the route parser
+
+Parses every message in data/route_corpus.jsonl, reports how many
+origin/destination pairs match the expected codes (null = no place
+expected), then times repeated parses of the whole corpus.
+
+Usage: python benchmarks/bench_route_parser.py [--rounds 200]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+# Add backend directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.route_parser import parse_route
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "route_corpus.jsonl")
+
+
+def load_corpus(path=CORPUS):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    correct = 0
+    for case in corpus:
+        route = parse_route(case["message"])
+        if (route.origin_code, route.destination_code) == (case["origin"], case["destination"]):
+            correct += 1
+        else:
+            print(f"MISS {case['message']!r}: got {route.origin_code}->{route.destination_code}, "
+                  f"expected {case['origin']}->{case['destination']}")
+
+    messages = [case["message"] for case in corpus]
+    started = time.perf_counter()
+    for _ in range(args.rounds):
+        for message in messages:
+            parse_route(message)
+    per_message_us = (time.perf_counter() - started) / (args.rounds * len(messages)) * 1e6
+
+    print("Route parser")
+    print("=" * 40)
+    print(f"accuracy:    {correct}/{len(corpus)} ({correct / len(corpus):.0%})")
+    print(f"parse time:  {per_message_us:.1f} us/message")
+
+
+if __name__ == "__main__":
+    main()
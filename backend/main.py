@@ -1,4 +1,4 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import Optional
@@ -6,15 +6,29 @@ from dotenv import load_dotenv
 import os
 from openai import OpenAI
 from datetime import datetime, timedelta
-import pytz
 import logging
 import uuid
 import asyncio
+import functools
+import json
+from collections import Counter
 
 # Import our services
 from services.amadeus_service import AmadeusService
 from services.intent_detector import IntentDetector
-from services.cache_manager import CacheManager
+from services.adaptive_ttl import AdaptiveTTLPolicy
+from services.airport_db import AIRPORTS
+from services.cache_codec import EncodedValue
+from services.cache_manager import DEFAULT_MAX_BYTES, CacheManager, classify_negative
+from services.cache_keys import flag
+from services.flight_keywords import FlightKeywordMatcher
+from services.flight_query_planner import FlightQueryPlanner
+from services.locale_format import format_local_time, locale_examples
+from services.nearest_airports import NEAREST_AIRPORTS
+from services.place_formatter import PlaceNameFormatter
+from services.query_parser import ParsedQuery, ParseTimings
+from services.redis_cache import RedisCacheTier
+from services.session_search import SessionSearchStore
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -50,12 +64,37 @@ except Exception as e:
     intent_detector = None
 
 try:
-    cache_manager = CacheManager()
+    # Shared L2 tier: Redis across replicas when CACHE_REDIS_URL is set, otherwise an
+    # optional on-disk SQLite file shared by all workers on the host (e.g. /tmp/miles-cache.db)
+    redis_url = os.getenv("CACHE_REDIS_URL")
+    cache_manager = CacheManager(
+        l2=RedisCacheTier(redis_url) if redis_url else None,
+        l2_path=os.getenv("CACHE_L2_PATH"),
+        # In-memory byte budget; size it to the container (default 64 MiB)
+        max_bytes=int(os.getenv("CACHE_MAX_BYTES", DEFAULT_MAX_BYTES)),
+        # Keep cached responses as compressed JSON so hits skip re-serialization
+        serialize_values=os.getenv("CACHE_SERIALIZE_VALUES", "true").lower() == "true",
+        # Longer TTLs for far-out, stable fares; shorter for near-term or volatile ones
+        adaptive_ttl=AdaptiveTTLPolicy(),
+    )
     print("CacheManager initialized successfully")
 except Exception as e:
     print(f"Error initializing CacheManager: {e}")
     cache_manager = None
 
+# Answers refined flight searches (max price, nonstop) from cached unfiltered results
+query_planner = FlightQueryPlanner(cache_manager) if cache_manager else None
+
+flight_keywords = FlightKeywordMatcher()
+# Place names to bold/underline in replies (services/data/place_names.json)
+place_formatter = PlaceNameFormatter.from_file()
+# Requests per chat path (refinement, flight_data, flight_no_route, intent, general)
+chat_paths = Counter()
+# Mean time per message parsing stage (tokenize, route, keywords, dates)
+parse_timings = ParseTimings()
+# Last flight search per session, so follow-ups ("cheaper ones", "nonstop only") are re-ranked in memory
+session_searches = SessionSearchStore(idle_ttl=int(os.getenv("SESSION_SEARCH_IDLE_TTL", "1800")))
+
 app = FastAPI(
     title="Smart Travel Assistant API",
     description="AI-powered travel planning API",
@@ -190,6 +229,28 @@ async def diag_amadeus_inspiration(origin: str = "PAR", maxPrice: int = 200):
     except Exception as e:
         return {"ok": False, "error": str(e)}
 
+@app.get("/api/diag/cache")
+def diag_cache():
+    """Cache size and per-tier (shared / session) hit rates"""
+    if not cache_manager:
+        return {"ok": False, "error": "CacheManager not initialized"}
+    return {
+        "ok": True,
+        "stats": cache_manager.get_stats(),
+        "query_planner": query_planner.get_stats(),
+        "session_searches": session_searches.get_stats(),
+    }
+
+@app.get("/api/diag/chat")
+def diag_chat():
+    """How many chat requests took each path, the flight keyword matcher's decisions and parse timings"""
+    return {
+        "ok": True,
+        "paths": dict(chat_paths),
+        "flight_keywords": flight_keywords.get_stats(),
+        "parse_timings": parse_timings.get_stats(),
+    }
+
 @app.post("/api/test-context")
 async def test_context(ctx: Context):
     """Diagnostic endpoint to verify context parsing and processing"""
@@ -221,28 +282,21 @@ async def test_context(ctx: Context):
     }
 
 
-def format_local_time(now_iso, user_tz):
-    """Format the current time in the user's timezone with UTC offset"""
-    try:
-        if not now_iso or not user_tz:
-            return now_iso or ""
-        dt = datetime.fromisoformat(now_iso.replace('Z', '+00:00'))
-        user_tz_obj = pytz.timezone(user_tz)
-        local_dt = dt.astimezone(user_tz_obj)
-        
-        # Calculate UTC offset
-        utc_offset = local_dt.strftime('%z')
-        if utc_offset:
-            # Format as UTC±HH:MM
-            utc_offset_formatted = f"UTC{utc_offset[:3]}:{utc_offset[3:]}"
-        else:
-            utc_offset_formatted = "UTC+00:00"
-        
-        # Use ASCII bullet and include UTC offset
-        return local_dt.strftime("%a, %d %b %Y - %I:%M %p").lstrip("0") + f" ({user_tz}, {utc_offset_formatted})"
-    except Exception as e:
-        logger.error(f"Error formatting local time: {e}")
-        return now_iso
+def fill_origin_from_location(route, ctx):
+    """Use the airport nearest the user's position as the origin of a route that names none"""
+    location = ctx.user_location if ctx else None
+    if not location or location.lat is None or location.lon is None:
+        return route
+    destination = AIRPORTS.get(route.destination_code)
+    nearby = NEAREST_AIRPORTS.departure_airport(location.lat, location.lon, destination=destination)
+    if nearby is None:
+        logger.info(f"No departure airport near ({location.lat:.3f}, {location.lon:.3f}) "
+                    f"for a trip to {route.destination_code}; origin left empty")
+        return route
+    airport = nearby.airport
+    logger.info(f"Origin filled from user location ({location.lat:.3f}, {location.lon:.3f}): "
+                f"{airport.code} {airport.name}, {nearby.distance_km} km away")
+    return route._replace(origin_code=airport.code, origin_name=airport.city)
 
 def get_location_string(user_location):
     """Get a readable location string from user_location"""
@@ -319,7 +373,7 @@ Style standard (strict):
 - Use # and ## headers, short bullets, and compact tables. No walls of text.
 - Prefer numbered steps for itineraries. One line per stop. Include travel time hints only if helpful.
 - Dates: ALWAYS use the exact formatted time provided: "{local_time}"
-- Currency and units: respect user_locale.
+- Currency and units: respect user_locale (prices and dates look like: {locale_examples(user_locale)}).
 - If you need info, ask at most one question at the end.
 - CRITICAL FORMATTING RULE: In ALL itineraries, EVERY single destination name, attraction, landmark, restaurant, museum, district, building, or place name MUST be formatted with **__bold and underlined__** text.
 - Examples: **__Sagrada Familia__**, **__Park Güell__**, **__Gothic Quarter__**, **__Casa Batlló__**, **__La Rambla__**, **__Montjuïc__**, **__Barceloneta Beach__**, **__Picasso Museum__**, **__Born District__**
@@ -541,35 +595,172 @@ Output:
 
 def format_place_names(text):
     """Format place names in text with bold and underlined formatting"""
-    import re
-    
-    # Common place names and patterns to format
-    place_patterns = [
-        # Barcelona attractions
-        r'\bSagrada Familia\b', r'\bPark Güell\b', r'\bGothic Quarter\b', r'\bCasa Batlló\b',
-        r'\bLa Rambla\b', r'\bMontjuïc\b', r'\bBarceloneta Beach\b', r'\bPicasso Museum\b',
-        r'\bBorn District\b', r'\bCasa Milà\b', r'\bLas Ramblas\b', r'\bBarri Gòtic\b',
-        r'\bEl Born\b', r'\bMontserrat\b', r'\bCamp Nou\b', r'\bParc de la Ciutadella\b',
-        r'\bPlaça de Catalunya\b', r'\bPlaça Reial\b', r'\bPasseig de Gràcia\b',
-        
-        # General patterns for museums, churches, parks, etc.
-        r'\b[A-Z][a-z]+ Museum\b', r'\b[A-Z][a-z]+ Cathedral\b', r'\b[A-Z][a-z]+ Church\b',
-        r'\b[A-Z][a-z]+ Park\b', r'\b[A-Z][a-z]+ Beach\b', r'\b[A-Z][a-z]+ District\b',
-        r'\b[A-Z][a-z]+ Quarter\b', r'\b[A-Z][a-z]+ Square\b', r'\b[A-Z][a-z]+ Palace\b',
-        
-        # Restaurant patterns
-        r'\b[A-Z][a-z]+ Restaurant\b', r'\b[A-Z][a-z]+ Bar\b', r'\b[A-Z][a-z]+ Café\b',
-        r'\b[A-Z][a-z]+ Tapas\b', r'\b[A-Z][a-z]+ Market\b'
-    ]
-    
-    for pattern in place_patterns:
-        # Find all matches and format them
-        matches = re.findall(pattern, text)
-        for match in matches:
-            if not match.startswith('**__') and not match.endswith('__**'):
-                text = text.replace(match, f'**__{match}__**')
-    
-    return text
+    return place_formatter.format(text)
+
+async def fetch_amadeus_data(intent_type, params):
+    """Call the Amadeus API matching a detected intent and return its response"""
+    amadeus_data = None
+    # Call appropriate Amadeus API based on intent
+    if intent_type == "flight_search":
+        logger.info(f"Calling flight search with params: {params}")
+        # If origin/destination are not IATA codes, try to get them via location search
+        origin = params["origin"]
+        destination = params["destination"]
+
+        # Check if we need to convert city names to IATA codes
+        if not _is_iata_code(origin) and (record := AIRPORTS.resolve_city(origin)) is not None:
+            logger.info(f"Resolved origin '{origin}' to {record.code} from the bundled airport database")
+            origin = record.code
+
+        if not _is_iata_code(origin):
+            logger.info(f"Converting origin '{origin}' to IATA code")
+            location_result = await amadeus_service.get_airport_city_search(keyword=origin)
+            if location_result and not location_result.get('error') and location_result.get('locations'):
+                # Use the first result's IATA code from normalized schema
+                origin = location_result['locations'][0].get('code', origin)
+                logger.info(f"Converted origin to IATA code: {origin}")
+
+        if not _is_iata_code(destination) and (record := AIRPORTS.resolve_city(destination)) is not None:
+            logger.info(f"Resolved destination '{destination}' to {record.code} from the bundled airport database")
+            destination = record.code
+
+        if not _is_iata_code(destination):
+            logger.info(f"Converting destination '{destination}' to IATA code")
+            location_result = await amadeus_service.get_airport_city_search(keyword=destination)
+            if location_result and not location_result.get('error') and location_result.get('locations'):
+                # Use the first result's IATA code from normalized schema
+                destination = location_result['locations'][0].get('code', destination)
+                logger.info(f"Converted destination to IATA code: {destination}")
+
+        amadeus_data = await amadeus_service.search_flights(
+            origin=origin,
+            destination=destination,
+            departure_date=params["departure_date"],
+            return_date=params.get("return_date"),
+            adults=params.get("adults", 1),
+            max_price=params.get("max_price"),
+            non_stop=flag(params.get("non_stop", False))
+        )
+        logger.info(f"Amadeus flight search returned count={(amadeus_data or {}).get('count')} for {origin}->{destination}")
+    elif intent_type == "hotel_search":
+        logger.info(f"Calling hotel search with params: {params}")
+        amadeus_data = await amadeus_service.search_hotels(
+            city_code=params["destination"],
+            check_in=params["check_in"],
+            check_out=params["check_out"],
+            adults=params.get("adults", 1),
+            radius=params.get("radius", 50),
+            price_range=params.get("price_range")
+        )
+        logger.info(f"Amadeus hotel search returned count={(amadeus_data or {}).get('count')}")
+    elif intent_type == "activity_search":
+        logger.info(f"Calling activity search with params: {params}")
+        if "latitude" in params and "longitude" in params:
+            amadeus_data = await amadeus_service.search_activities(
+                latitude=float(params["latitude"]),
+                longitude=float(params["longitude"]),
+                radius=params.get("radius", 20)
+            )
+        else:
+            # For city-based activity search, we'd need to get coordinates first
+            logger.warning("Activity search requires coordinates")
+            amadeus_data = {"error": "Activity search requires location coordinates"}
+    elif intent_type == "flight_inspiration":
+        logger.info(f"Calling flight inspiration with params: {params}")
+        amadeus_data = await amadeus_service.get_flight_inspiration(
+            origin=params["origin"],
+            max_price=params.get("max_price"),
+            departure_date=params.get("departure_date")
+        )
+        logger.info(f"Amadeus flight inspiration returned count={(amadeus_data or {}).get('count')}")
+    elif intent_type == "location_search":
+        logger.info(f"Calling location search with params: {params}")
+        amadeus_data = await amadeus_service.get_airport_city_search(
+            keyword=params["keyword"]
+        )
+        logger.info(f"Amadeus location search returned count={(amadeus_data or {}).get('count')}")
+    return amadeus_data
+
+def _register_cache_loaders():
+    """Let the cache refresh stale entries in the background (stale-while-revalidate)"""
+    if not cache_manager or not amadeus_service:
+        return
+    for api_type in ("flight_search", "hotel_search", "activity_search", "flight_inspiration", "location_search"):
+        cache_manager.register_loader(api_type, functools.partial(fetch_amadeus_data, api_type))
+
+_register_cache_loaders()
+
+# Optional warm-restart snapshot of the hottest cache entries (e.g. /tmp/miles-cache-snapshot.jsonl)
+CACHE_SNAPSHOT_PATH = os.getenv("CACHE_SNAPSHOT_PATH")
+CACHE_SNAPSHOT_INTERVAL = int(os.getenv("CACHE_SNAPSHOT_INTERVAL", "300"))
+# Expired entries are only skipped on read; this drops them from memory and the L2 tier
+CACHE_PURGE_INTERVAL = int(os.getenv("CACHE_PURGE_INTERVAL", "600"))
+_cache_background_tasks = set()
+
+def _start_background_task(coro):
+    task = asyncio.create_task(coro)
+    _cache_background_tasks.add(task)
+    task.add_done_callback(_cache_background_tasks.discard)
+
+async def _run_cache_maintenance(function, *args):
+    """Run a whole-cache pass (snapshot, purge) off the event loop, except in lock-free mode"""
+    if cache_manager.lock_free:
+        # Unlocked shards may only be touched from the event loop
+        return function(*args)
+    return await asyncio.to_thread(function, *args)
+
+async def _snapshot_cache_periodically():
+    while True:
+        await asyncio.sleep(CACHE_SNAPSHOT_INTERVAL)
+        try:
+            await _run_cache_maintenance(cache_manager.snapshot, CACHE_SNAPSHOT_PATH)
+        except Exception as e:
+            logger.warning(f"Cache snapshot failed: {e}")
+
+async def _purge_cache_periodically():
+    while True:
+        await asyncio.sleep(CACHE_PURGE_INTERVAL)
+        try:
+            removed = await _run_cache_maintenance(cache_manager.purge_expired)
+            logger.debug(f"Cache purge: removed {removed} expired entries")
+        except Exception as e:
+            logger.warning(f"Cache purge failed: {e}")
+
+@app.on_event("startup")
+async def start_cache_background_tasks():
+    """Restore the last snapshot and start periodic snapshots and purges, without delaying startup"""
+    if not cache_manager:
+        return
+    if CACHE_PURGE_INTERVAL > 0:
+        _start_background_task(_purge_cache_periodically())
+    if CACHE_SNAPSHOT_PATH:
+        _start_background_task(cache_manager.restore_snapshot(CACHE_SNAPSHOT_PATH))
+        _start_background_task(_snapshot_cache_periodically())
+
+@app.on_event("shutdown")
+async def snapshot_cache_on_shutdown():
+    for task in list(_cache_background_tasks):
+        task.cancel()
+    if cache_manager and CACHE_SNAPSHOT_PATH:
+        try:
+            await _run_cache_maintenance(cache_manager.snapshot, CACHE_SNAPSHOT_PATH)
+        except Exception as e:
+            logger.warning(f"Cache snapshot failed: {e}")
+
+def _with_json_member(raw_object: bytes, name: str, value) -> bytes:
+    """Append one member to a serialized JSON object without decoding it"""
+    inner = raw_object.strip()[1:-1].strip()
+    member = json.dumps(name).encode("utf-8") + b":" + json.dumps(value).encode("utf-8")
+    return b"{" + inner + (b"," if inner else b"") + member + b"}"
+
+def _json_response_with_raw(payload: dict, field: str, raw_json: bytes) -> Response:
+    """Render payload as JSON with one extra field spliced in from pre-serialized bytes"""
+    body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    separator = b"," if payload else b""
+    return Response(
+        content=body[:-1] + separator + json.dumps(field).encode("utf-8") + b":" + raw_json + b"}",
+        media_type="application/json",
+    )
 
 @app.post("/api/chat")
 async def chat(req: ChatRequest):
@@ -588,24 +779,16 @@ async def chat(req: ChatRequest):
         # Get the user's latest message
         user_message = req.messages[-1]["content"]
         
-        # Check if message contains flight-related keywords
-        flight_keywords = [
-            'flight', 'flights', 'airline', 'airlines', 'airplane', 'aircraft', 'plane',
-            'ticket', 'tickets', 'booking', 'book', 'reserve', 'reservation',
-            'travel', 'trip', 'journey', 'vacation', 'holiday', 'getaway',
-            'destination', 'departure', 'arrival', 'airport', 'terminal',
-            'price', 'prices', 'cost', 'costs', 'expensive', 'cheap', 'cheapest', 
-            'budget', 'affordable', 'fare', 'fares', 'rate', 'rates',
-            'search', 'find', 'look for', 'show me', 'get me', 'need', 'want',
-            'compare', 'comparison', 'options', 'available', 'schedule',
-            'to', 'from', 'between', 'route', 'way', 'path',
-            'today', 'tomorrow', 'next week', 'this month', 'soon', 'when',
-            'search flights', 'find flights', 'book flights', 'flight search',
-            'airline tickets', 'plane tickets', 'flight booking', 'travel booking'
-        ]
+        # Tokenize once; keywords, route and dates are parsed from it on first use
+        query = ParsedQuery(user_message, flight_keywords)
         
-        has_flight_keywords = any(keyword in user_message.lower() for keyword in flight_keywords)
-        logger.info(f"Flight keyword check: {has_flight_keywords}")
+        # Follow-ups on this session's last search are answered by re-ranking it in memory
+        refined_data = session_searches.refine(session_id, user_message, query)
+        
+        # Score the message for flight intent (whole words, weighted, plus place mentions)
+        keyword_match = query.keywords
+        has_flight_keywords = refined_data is not None or keyword_match.is_flight
+        logger.info(f"Flight keyword check: {has_flight_keywords} (score={keyword_match.score}, terms={sorted(keyword_match.terms)})")
         
         # Skip intent detection for now - just use basic logic
         logger.info(f"Processing message for session {session_id}: {user_message[:100]}...")
@@ -616,127 +799,103 @@ async def chat(req: ChatRequest):
         logger.info(f"Extracted parameters: {intent['params']}")
         
         amadeus_data = None
+        cached = None
+        cached_json = None
         
+        if refined_data is not None:
+            amadeus_data = refined_data
+            chat_paths['refinement'] += 1
         # Always fetch flight data if flight keywords are detected, regardless of intent detection
-        if has_flight_keywords:
+        elif has_flight_keywords:
             logger.info("Flight keywords detected - extracting route and fetching data")
             # Extract route information from the user's message
-            route_info = extract_route_from_message(user_message)
-            logger.info(f"Extracted route info: {route_info}")
-            
-            # Extract dates from the user's message
-            date_info = extract_dates_from_message(user_message)
-            logger.info(f"Extracted date info: {date_info}")
-            
-            # Combine route and date information
-            route_info.update(date_info)
+            route = query.route
+            if route.destination_code and not route.origin_code:
+                route = query.route = fill_origin_from_location(route, req.context)
+            logger.info(f"Parsed route: {route}")
             
-            # Temporarily use mock data to test enhanced features
-            logger.info("Using enhanced mock data for testing")
-            amadeus_data = generate_mock_flight_data(route_info)
-            
-            logger.info(f"Final amadeus_data with route: {amadeus_data.get('route', 'NO ROUTE')}")
-        # If travel intent detected and has required parameters, fetch data
+            if route.complete:
+                route_info = route.to_route_info()
+                
+                # Extract dates from the user's message
+                date_info = query.dates.to_date_info() if query.dates else {}
+                logger.info(f"Extracted date info: {date_info}")
+                
+                # Combine route and date information
+                route_info.update(date_info)
+                
+                # Temporarily use mock data to test enhanced features
+                logger.info("Using enhanced mock data for testing")
+                amadeus_data = generate_mock_flight_data(route_info)
+                session_searches.remember(session_id, route_info, amadeus_data)
+                
+                logger.info(f"Final amadeus_data with route: {amadeus_data.get('route', 'NO ROUTE')}")
+                chat_paths['flight_data'] += 1
+            else:
+                chat_paths['flight_no_route'] += 1
+                # No guessed default route: let the assistant ask for the missing origin/destination
+                logger.info("No complete route in message - skipping flight data")
+        # If travel intent detected and has required parameters, fetch data.
+        # Not reached while intent detection is skipped above (intent is always "general"):
+        # the cache planner, negative caching and stale-while-revalidate only apply here.
         elif intent["type"] != "general" and intent["has_required_params"] and intent["confidence"] > 0.5:
             logger.info(f"Detected {intent['type']} intent with confidence {intent['confidence']}")
+            chat_paths['intent'] += 1
             
             # Check cache first
             cache_key_params = intent["params"].copy()
             cache_key_params["type"] = intent["type"]
             
-            cached_data = cache_manager.get(session_id, intent["type"], cache_key_params)
+            # Keep serialized hits encoded so they can be copied into the response as-is;
+            # refined flight searches may be answered from a cached superset
+            cached = await cache_manager.run_blocking(
+                query_planner.lookup, session_id, intent["type"], cache_key_params, decode=False)
             
-            if cached_data:
-                logger.info("Using cached data")
-                amadeus_data = cached_data
+            if cached:
+                logger.info(f"Using cached {'negative result' if cached.negative else 'data'} from {cached.tier} tier "
+                            f"(stale={cached.stale}, age={cached.age:.0f}s)")
+                if isinstance(cached.value, EncodedValue):
+                    # Decompress once: the prompt needs the parsed value, the response reuses the bytes
+                    cached_json = cached.value.json_bytes()
+                    amadeus_data = json.loads(cached_json)
+                else:
+                    amadeus_data = cached.value
+                # Stale-while-revalidate: the dashboard shows when data is being refreshed
+                if isinstance(amadeus_data, dict):
+                    amadeus_data = {**amadeus_data, "stale": cached.stale}
             else:
                 logger.info("Fetching fresh data from Amadeus API")
                 try:
-                    # Call appropriate Amadeus API based on intent
-                    if intent["type"] == "flight_search":
-                        logger.info(f"Calling flight search with params: {intent['params']}")
-                        # If origin/destination are not IATA codes, try to get them via location search
-                        origin = intent["params"]["origin"]
-                        destination = intent["params"]["destination"]
-                        
-                        # Check if we need to convert city names to IATA codes
-                        if not _is_iata_code(origin):
-                            logger.info(f"Converting origin '{origin}' to IATA code")
-                            location_result = await amadeus_service.get_airport_city_search(keyword=origin)
-                            if location_result and not location_result.get('error') and location_result.get('locations'):
-                                # Use the first result's IATA code from normalized schema
-                                origin = location_result['locations'][0].get('code', origin)
-                                logger.info(f"Converted origin to IATA code: {origin}")
-                        
-                        if not _is_iata_code(destination):
-                            logger.info(f"Converting destination '{destination}' to IATA code")
-                            location_result = await amadeus_service.get_airport_city_search(keyword=destination)
-                            if location_result and not location_result.get('error') and location_result.get('locations'):
-                                # Use the first result's IATA code from normalized schema
-                                destination = location_result['locations'][0].get('code', destination)
-                                logger.info(f"Converted destination to IATA code: {destination}")
-                        
-                        amadeus_data = await amadeus_service.search_flights(
-                            origin=origin,
-                            destination=destination,
-                            departure_date=intent["params"]["departure_date"],
-                            return_date=intent["params"].get("return_date"),
-                            adults=intent["params"].get("adults", 1),
-                            max_price=intent["params"].get("max_price")
-                        )
-                        logger.info(f"Amadeus flight search returned count={(amadeus_data or {}).get('count')} for {origin}->{destination}")
-                    elif intent["type"] == "hotel_search":
-                        logger.info(f"Calling hotel search with params: {intent['params']}")
-                        amadeus_data = await amadeus_service.search_hotels(
-                            city_code=intent["params"]["destination"],
-                            check_in=intent["params"]["check_in"],
-                            check_out=intent["params"]["check_out"],
-                            adults=intent["params"].get("adults", 1),
-                            radius=intent["params"].get("radius", 50),
-                            price_range=intent["params"].get("price_range")
-                        )
-                        logger.info(f"Amadeus hotel search returned count={(amadeus_data or {}).get('count')}")
-                    elif intent["type"] == "activity_search":
-                        logger.info(f"Calling activity search with params: {intent['params']}")
-                        if "latitude" in intent["params"] and "longitude" in intent["params"]:
-                            amadeus_data = await amadeus_service.search_activities(
-                                latitude=float(intent["params"]["latitude"]),
-                                longitude=float(intent["params"]["longitude"]),
-                                radius=intent["params"].get("radius", 20)
-                            )
-                        else:
-                            # For city-based activity search, we'd need to get coordinates first
-                            logger.warning("Activity search requires coordinates")
-                            amadeus_data = {"error": "Activity search requires location coordinates"}
-                    elif intent["type"] == "flight_inspiration":
-                        logger.info(f"Calling flight inspiration with params: {intent['params']}")
-                        amadeus_data = await amadeus_service.get_flight_inspiration(
-                            origin=intent["params"]["origin"],
-                            max_price=intent["params"].get("max_price"),
-                            departure_date=intent["params"].get("departure_date")
-                        )
-                        logger.info(f"Amadeus flight inspiration returned count={(amadeus_data or {}).get('count')}")
-                    elif intent["type"] == "location_search":
-                        logger.info(f"Calling location search with params: {intent['params']}")
-                        amadeus_data = await amadeus_service.get_airport_city_search(
-                            keyword=intent["params"]["keyword"]
-                        )
-                        logger.info(f"Amadeus location search returned count={(amadeus_data or {}).get('count')}")
+                    amadeus_data = await fetch_amadeus_data(intent["type"], intent["params"])
                     
-                    # Cache the response
-                    if amadeus_data and not amadeus_data.get('error'):
-                        cache_manager.set(session_id, intent["type"], cache_key_params, amadeus_data)
+                    # Cache the response; empty results and errors get a short negative TTL
+                    if classify_negative(amadeus_data) is None:
+                        await cache_manager.run_blocking(
+                            cache_manager.set, session_id, intent["type"], cache_key_params, amadeus_data)
                         logger.info(f"Cached {intent['type']} data for session {session_id}")
+                    elif cache_manager.set_negative(session_id, intent["type"], cache_key_params, amadeus_data):
+                        logger.info(f"Negatively cached {intent['type']} result for session {session_id}")
                         
                 except Exception as e:
                     logger.error(f"Amadeus API call failed: {e}")
                     amadeus_data = {"error": f"API call failed: {str(e)}"}
+                    cache_manager.set_negative(session_id, intent["type"], cache_key_params, amadeus_data)
+            
+            if intent["type"] == "flight_search" and classify_negative(amadeus_data) is None:
+                session_searches.remember(session_id, intent["params"], amadeus_data)
                     
         # Add fallback for when no data is fetched but intent was detected
         elif intent["type"] != "general" and intent["confidence"] > 0.5:
             logger.warning(f"Intent detected but no API call made: {intent}")
+            chat_paths['intent_incomplete'] += 1
             amadeus_data = {"error": "Unable to fetch real-time data. Please try rephrasing your request with specific dates and locations."}
         
+        else:
+            chat_paths['general'] += 1
+        
+        parse_timings.record(query)
+        logger.info(f"Message parse timings (ms): {query.timings}")
+        
         # Generate response using OpenAI
         try:
             # Create system prompt with context and data
@@ -765,13 +924,19 @@ async def chat(req: ChatRequest):
             else:
                 reply = "I'm sorry, I'm having trouble processing your request right now. Please try again."
             
-        return {
+        result = {
             "reply": reply,
             "session_id": session_id,
             "intent_detected": intent["type"],
             "data_fetched": amadeus_data is not None and not amadeus_data.get('error'),
-            "amadeus_data": amadeus_data if amadeus_data is not None else None
         }
+        if cached:
+            result["cache"] = {"tier": cached.tier, "stale": cached.stale}
+            if cached_json is not None and isinstance(amadeus_data, dict):
+                raw_data = _with_json_member(cached_json, "stale", cached.stale)
+                return _json_response_with_raw(result, "amadeus_data", raw_data)
+        result["amadeus_data"] = amadeus_data
+        return result
     except HTTPException:
         raise
     except Exception as e:
@@ -894,317 +1059,6 @@ def get_city_name_from_code(code):
     }
     return airport_codes.get(code, code)
 
-def extract_route_from_message(message):
-    """Extract route information from user message using dynamic parsing"""
-    import re
-    
-    # Common airport codes and city mappings
-    airport_mappings = {
-        'miami': 'MIA', 'dfw': 'DFW', 'dallas': 'DFW', 'fort worth': 'DFW',
-        'new york': 'JFK', 'nyc': 'JFK', 'jfk': 'JFK', 'lga': 'LGA', 'newyork': 'JFK',
-        'los angeles': 'LAX', 'lax': 'LAX', 'la': 'LAX',
-        'chicago': 'ORD', 'ord': 'ORD', 'ohare': 'ORD',
-        'atlanta': 'ATL', 'atl': 'ATL',
-        'denver': 'DEN', 'den': 'DEN',
-        'san francisco': 'SFO', 'sfo': 'SFO', 'sf': 'SFO',
-        'seattle': 'SEA', 'sea': 'SEA',
-        'boston': 'BOS', 'bos': 'BOS',
-        'phoenix': 'PHX', 'phx': 'PHX',
-        'las vegas': 'LAS', 'las': 'LAS',
-        'orlando': 'MCO', 'mco': 'MCO',
-        'washington dc': 'DCA', 'washington': 'DCA', 'dc': 'DCA', 'dca': 'DCA',
-        'ohio': 'CMH', 'columbus': 'CMH', 'cleveland': 'CLE', 'cincinnati': 'CVG', 'cmh': 'CMH', 'cle': 'CLE', 'cvg': 'CVG',
-        'houston': 'IAH', 'iah': 'IAH',
-        'detroit': 'DTW', 'dtw': 'DTW',
-        'minneapolis': 'MSP', 'msp': 'MSP',
-        'philadelphia': 'PHL', 'phl': 'PHL',
-        'baltimore': 'BWI', 'bwi': 'BWI',
-        'barcelona': 'BCN', 'bcn': 'BCN',
-        'madrid': 'MAD', 'mad': 'MAD',
-        'london': 'LHR', 'lhr': 'LHR',
-        'paris': 'CDG', 'cdg': 'CDG',
-        'rome': 'FCO', 'fco': 'FCO',
-        'berlin': 'BER', 'ber': 'BER',
-        'amsterdam': 'AMS', 'ams': 'AMS',
-        'tokyo': 'NRT', 'nrt': 'NRT',
-        'mexico city': 'MEX', 'mex': 'MEX'
-    }
-    
-    city_mappings = {
-        'miami': 'Miami', 'dfw': 'Dallas', 'dallas': 'Dallas', 'fort worth': 'Dallas',
-        'new york': 'New York', 'nyc': 'New York', 'jfk': 'New York', 'lga': 'New York', 'newyork': 'New York',
-        'los angeles': 'Los Angeles', 'lax': 'Los Angeles', 'la': 'Los Angeles',
-        'chicago': 'Chicago', 'ord': 'Chicago', 'ohare': 'Chicago',
-        'atlanta': 'Atlanta', 'atl': 'Atlanta',
-        'denver': 'Denver', 'den': 'Denver',
-        'san francisco': 'San Francisco', 'sfo': 'San Francisco', 'sf': 'San Francisco',
-        'seattle': 'Seattle', 'sea': 'Seattle',
-        'boston': 'Boston', 'bos': 'Boston',
-        'phoenix': 'Phoenix', 'phx': 'Phoenix',
-        'las vegas': 'Las Vegas', 'las': 'Las Vegas',
-        'orlando': 'Orlando', 'mco': 'Orlando',
-        'washington dc': 'Washington DC', 'washington': 'Washington DC', 'dc': 'Washington DC', 'dca': 'Washington DC',
-        'ohio': 'Ohio', 'columbus': 'Ohio', 'cleveland': 'Ohio', 'cincinnati': 'Ohio', 'cmh': 'Ohio', 'cle': 'Ohio', 'cvg': 'Ohio',
-        'houston': 'Houston', 'iah': 'Houston',
-        'detroit': 'Detroit', 'dtw': 'Detroit',
-        'minneapolis': 'Minneapolis', 'msp': 'Minneapolis',
-        'philadelphia': 'Philadelphia', 'phl': 'Philadelphia',
-        'baltimore': 'Baltimore', 'bwi': 'Baltimore',
-        'barcelona': 'Barcelona', 'bcn': 'Barcelona',
-        'madrid': 'Madrid', 'mad': 'Madrid',
-        'london': 'London', 'lhr': 'London',
-        'paris': 'Paris', 'cdg': 'Paris',
-        'rome': 'Rome', 'fco': 'Rome',
-        'berlin': 'Berlin', 'ber': 'Berlin',
-        'amsterdam': 'Amsterdam', 'ams': 'Amsterdam',
-        'tokyo': 'Tokyo', 'nrt': 'Tokyo',
-        'mexico city': 'Mexico City', 'mex': 'Mexico City'
-    }
-    
-    message_lower = message.lower()
-    logger.debug(f"Processing message: '{message_lower}'")
-    
-    # Improved regex patterns to handle various formats
-    # Pattern 1: "flights to X to Y" format (highest priority)
-    flights_to_pattern = r'flights?\s+to\s+([a-z\s]+?)\s+to\s+([a-z\s]+?)(?:\s+(?:nov|dec|jan|feb|mar|apr|may|jun|jul|aug|sep|oct)[\s\-]*\d+|\s|$)'
-    match = re.search(flights_to_pattern, message_lower)
-    logger.debug(f"flights_to_pattern match: {match}")
-    
-    if match:
-        origin_city = match.group(1).strip()
-        destination_city = match.group(2).strip()
-        logger.debug(f"flights_to matched - origin: '{origin_city}', destination: '{destination_city}'")
-    else:
-        # Pattern 2: "from X to Y" (more flexible with dates)
-        from_to_pattern = r'from\s+([a-z\s]+?)\s+to\s+([a-z\s]+?)(?:\s+(?:nov|dec|jan|feb|mar|apr|may|jun|jul|aug|sep|oct)[\s\-]*\d+|\s|$)'
-        match = re.search(from_to_pattern, message_lower)
-        logger.debug(f"from_to_pattern match: {match}")
-        
-        if match:
-            origin_city = match.group(1).strip()
-            destination_city = match.group(2).strip()
-            logger.debug(f"from_to matched - origin: '{origin_city}', destination: '{destination_city}'")
-        else:
-            # Pattern 3: "X to Y" but avoid matching "show me" patterns
-            to_pattern = r'(?:^|^[^a-z]*)([a-z\s]{2,}?)\s+to\s+([a-z\s]+?)(?:\s+(?:nov|dec|jan|feb|mar|apr|may|jun|jul|aug|sep|oct)[\s\-]*\d+|\s|$)'
-            match = re.search(to_pattern, message_lower)
-            logger.debug(f"to_pattern match: {match}")
-            if match:
-                origin_city = match.group(1).strip()
-                destination_city = match.group(2).strip()
-                # Skip if origin contains common phrases that shouldn't be cities
-                if not any(phrase in origin_city for phrase in ['show me', 'find me', 'get me', 'need', 'want', 'looking for', 'flights']):
-                    print(f"DEBUG: to matched - origin: '{origin_city}', destination: '{destination_city}'")
-                else:
-                    match = None
-            
-            if not match:
-                # Pattern 4: Handle "to X to Y" format (like "to new york to barcelona")
-                to_to_pattern = r'to\s+([a-z\s]+?)\s+to\s+([a-z\s]+?)(?:\s+(?:nov|dec|jan|feb|mar|apr|may|jun|jul|aug|sep|oct)[\s\-]*\d+|\s|$)'
-                match = re.search(to_to_pattern, message_lower)
-                logger.debug(f"to_to_pattern match: {match}")
-                if match:
-                    origin_city = match.group(1).strip()
-                    destination_city = match.group(2).strip()
-                    print(f"DEBUG: to_to matched - origin: '{origin_city}', destination: '{destination_city}'")
-                else:
-                    # Default fallback
-                    origin_city = 'new york'
-                    destination_city = 'los angeles'
-                    print(f"DEBUG: Using fallback - origin: '{origin_city}', destination: '{destination_city}'")
-    
-    # Map cities to airport codes and proper names
-    origin_code = airport_mappings.get(origin_city.lower(), 'JFK')
-    destination_code = airport_mappings.get(destination_city.lower(), 'CMH')
-    origin_name = city_mappings.get(origin_city.lower(), ' '.join(word.capitalize() for word in origin_city.split()))
-    destination_name = city_mappings.get(destination_city.lower(), ' '.join(word.capitalize() for word in destination_city.split()))
-    
-    return {
-        'departure': origin_name,
-        'destination': destination_name,
-        'departureCode': origin_code,
-        'destinationCode': destination_code
-    }
-
-def extract_departure_date(message):
-    """Extract departure date from user message"""
-    import re
-    from datetime import datetime, timedelta
-    
-    message_lower = message.lower()
-    
-    # Look for date patterns like "10/26 to 10/30" or "Oct 26 to Oct 30"
-    date_patterns = [
-        r'(\d{1,2})/(\d{1,2})\s+to\s+(\d{1,2})/(\d{1,2})',  # 10/26 to 10/30
-        r'(oct|nov|dec|jan|feb|mar|apr|may|jun|jul|aug|sep)\s+(\d{1,2})\s+to\s+(oct|nov|dec|jan|feb|mar|apr|may|jun|jul|aug|sep)\s+(\d{1,2})',  # Oct 26 to Oct 30
-        r'(\d{1,2})/(\d{1,2})',  # Single date 10/26
-        r'(oct|nov|dec|jan|feb|mar|apr|may|jun|jul|aug|sep)\s+(\d{1,2})',  # Single date Oct 26
-    ]
-    
-    for pattern in date_patterns:
-        match = re.search(pattern, message_lower)
-        if match:
-            if '/' in pattern:  # MM/DD format
-                if len(match.groups()) == 2:  # Single date
-                    month, day = int(match.group(1)), int(match.group(2))
-                else:  # Date range, use first date
-                    month, day = int(match.group(1)), int(match.group(2))
-                
-                # Assume current year
-                current_year = datetime.now().year
-                try:
-                    return datetime(current_year, month, day).strftime("%Y-%m-%d")
-                except ValueError:
-                    continue
-            else:  # Month name format
-                month_names = {
-                    'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
-                    'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12
-                }
-                if len(match.groups()) == 2:  # Single date
-                    month = month_names.get(match.group(1), 10)
-                    day = int(match.group(2))
-                else:  # Date range, use first date
-                    month = month_names.get(match.group(1), 10)
-                    day = int(match.group(2))
-                
-                current_year = datetime.now().year
-                try:
-                    return datetime(current_year, month, day).strftime("%Y-%m-%d")
-                except ValueError:
-                    continue
-    
-    # Default to 30 days from now if no date found
-    default_date = (datetime.now() + timedelta(days=30)).strftime("%Y-%m-%d")
-    logger.debug(f"No date found in message, using default: {default_date}")
-    return default_date
-
-def extract_dates_from_message(message):
-    """Extract departure and return dates from user message"""
-    import re
-    from datetime import datetime, timedelta
-    
-    message_lower = message.lower()
-    logger.debug(f"Extracting dates from: '{message_lower}'")
-    
-    # Enhanced patterns for various date formats (ordered by specificity)
-    date_patterns = [
-        # Dash format without second month: "dec 10-17" (assume same month) - MOST SPECIFIC FIRST
-        r'(\w+)\s+(\d+)\s*-\s*(\d+)',
-        # Dash format with concatenated month+day: "dec 10-dec17" (same month)
-        r'(\w+)\s+(\d+)\s*-\s*(\w+)(\d+)',
-        # Dash format with spaces: "dec 10-dec 17" (same month)
-        r'(\w+)\s+(\d+)\s*-\s*(\w+)\s+(\d+)',
-        # Dash format with no spaces: "dec10-dec17" (same month) - specific month pattern
-        r'\b(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)(\d+)\s*-\s*(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)(\d+)\b',
-        # Full month names with ordinal numbers: "december 1st to december 5th"
-        r'(\w+)\s+(\d+)(?:st|nd|rd|th)?\s+to\s+(\w+)\s+(\d+)(?:st|nd|rd|th)?',
-        # Full month names: "december 1 to december 5"
-        r'(\w+)\s+(\d+)\s+to\s+(\w+)\s+(\d+)',
-        # Abbreviated months with ordinal: "dec 1st to dec 5th"
-        r'(\w+)\s+(\d+)(?:st|nd|rd|th)?\s+to\s+(\w+)\s+(\d+)(?:st|nd|rd|th)?',
-        # Abbreviated months: "dec 1 to dec 5"
-        r'(\w+)\s+(\d+)\s+to\s+(\w+)\s+(\d+)',
-        # Dash format with ordinals: "december 1st-december 5th"
-        r'(\w+)\s+(\d+)(?:st|nd|rd|th)?\s*-\s*(\w+)\s*(\d+)(?:st|nd|rd|th)?',
-        # Dash format: "dec 1-dec 5" (same month, different days)
-        r'(\w+)\s+(\d+)\s*-\s*(\w+)\s*(\d+)',
-        # Through format: "december 1 through december 5"
-        r'(\w+)\s+(\d+)\s+through\s+(\w+)\s+(\d+)',
-    ]
-    
-    match = None
-    matched_pattern = None
-    for i, pattern in enumerate(date_patterns):
-        test_match = re.search(pattern, message_lower)
-        if test_match:
-            logger.debug(f"Pattern {i} matched: {pattern} -> {test_match.groups()}")
-            if not match:  # Use first match
-                match = test_match
-                matched_pattern = pattern
-    
-    if match:
-        groups = match.groups()
-        logger.debug(f"Using pattern: {matched_pattern}")
-        logger.debug(f"Date pattern matched: {groups}")
-        
-        month_names = {
-            'jan': 1, 'january': 1, 'feb': 2, 'february': 2, 'mar': 3, 'march': 3,
-            'apr': 4, 'april': 4, 'may': 5, 'jun': 6, 'june': 6,
-            'jul': 7, 'july': 7, 'aug': 8, 'august': 8, 'sep': 9, 'september': 9,
-            'oct': 10, 'october': 10, 'nov': 11, 'november': 11, 'dec': 12, 'december': 12
-        }
-        
-        if len(groups) == 4:
-            # Format: "dec 10-dec 17" or "december 1 to december 5" or "dec 10-dec17"
-            month1, day1, month2, day2 = groups
-            # Extract day numbers (remove ordinal suffixes if present)
-            day1 = int(re.sub(r'(st|nd|rd|th)$', '', day1))
-            day2 = int(re.sub(r'(st|nd|rd|th)$', '', day2))
-            
-            # Check if this is one of the special concatenated formats
-            if matched_pattern in [r'(\w+)\s+(\d+)\s*-\s*(\w+)(\d+)', r'\b(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)(\d+)\s*-\s*(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)(\d+)\b']:
-                # For "dec 10-dec17" or "dec10-dec17", we need to handle concatenated month+day
-                logger.debug(f"Concatenated format detected: {month1} {day1}-{month2}{day2}")
-                
-                # Check if month2 starts with month1 (e.g., "dec1" starts with "dec")
-                if month2.lower().startswith(month1.lower()):
-                    # This is the concatenated format like "dec 10-dec17" -> "dec", "10", "dec1", "7"
-                    # We need to extract the correct day from the concatenated part
-                    remaining_part = month2[len(month1):]  # "1" from "dec1"
-                    actual_day2_str = remaining_part + str(day2)  # "1" + "7" = "17"
-                    logger.debug(f"Reconstructed: month1={month1}, day1={day1}, month2={month1}, day2={actual_day2_str}")
-                    
-                    month1_num = month_names.get(month1.lower(), 11)
-                    month2_num = month1_num  # Same month
-                    day2 = int(actual_day2_str)  # Update day2 with the correct value
-                else:
-                    # Regular case where months are different
-                    month1_num = month_names.get(month1.lower(), 11)
-                    month2_num = month_names.get(month2.lower(), 11)
-            elif matched_pattern == r'(\w+)\s+(\d+)\s*-\s*(\w+)\s+(\d+)':
-                # For "dec 10-dec 17" format (with spaces)
-                logger.debug(f"Spaced format detected: {month1} {day1}-{month2} {day2}")
-                
-                # Check if both months are the same
-                if month1.lower() == month2.lower():
-                    month1_num = month_names.get(month1.lower(), 11)
-                    month2_num = month1_num  # Same month
-                    logger.debug(f"Same month detected: {month1}")
-                else:
-                    month1_num = month_names.get(month1.lower(), 11)
-                    month2_num = month_names.get(month2.lower(), 11)
-            else:
-                # Regular 4-group format
-                month1_num = month_names.get(month1.lower(), 11)
-                month2_num = month_names.get(month2.lower(), 11)
-        elif len(groups) == 3:
-            # Format: "dec 10-17" (same month, different days)
-            month1, day1, day2 = groups
-            # Extract day numbers (remove ordinal suffixes if present)
-            day1 = int(re.sub(r'(st|nd|rd|th)$', '', day1))
-            day2 = int(re.sub(r'(st|nd|rd|th)$', '', day2))
-            
-            month1_num = month_names.get(month1.lower(), 11)
-            month2_num = month1_num  # Same month for both dates
-        
-        # Use current year
-        current_year = datetime.now().year
-        departure_date = datetime(current_year, month1_num, day1)
-        return_date = datetime(current_year, month2_num, day2)
-        
-        departure_display = departure_date.strftime("%b %d, %Y")
-        return_display = return_date.strftime("%b %d, %Y")
-        
-        return {
-            'departure_date': departure_date.strftime("%Y-%m-%d"),
-            'return_date': return_date.strftime("%Y-%m-%d"),
-            'departure_display': departure_display,
-            'return_display': return_display
-        }
-    
-    return {}
-
 def calculate_value_score(flight):
     """Calculate a value score for a flight (lower is better)"""
     price = flight.get('price', 1000)
@@ -1262,16 +1116,13 @@ def generate_flights_for_route(origin, destination, origin_code, dest_code, date
     
     return flights
 
-def generate_mock_flight_data(route_info=None, user_message=""):
+def generate_mock_flight_data(route_info=None):
     """Generate enhanced mock flight data with separate outbound/return flights and best combinations"""
     import random
     from datetime import datetime, timedelta
     
     logger.debug(f"generate_mock_flight_data called with route_info: {route_info}")
     
-    # Extract dates from user message
-    date_info = extract_dates_from_message(user_message)
-    
     # Use provided dates or generate random dates
     if route_info and 'departure_date' in route_info:
         departure_date = route_info['departure_date']
@@ -0,0 +1,79 @@
+"""
+Build services/data/airports.bin from the airportsdata CSV files
+
+Keeps every airport with an IATA code and adds the IATA metropolitan-area
+codes (NYC, LON, PAR, ...) with their member airports. The CSVs ship with
+the ``airportsdata`` package (MIT, see services/data/AIRPORTS_LICENSE.txt);
+it is only needed to rebuild the file, not at runtime.
+
+Usage: python scripts/build_airport_db.py [--airports airports.csv] [--metros iata_macs.csv]
+"""
+import argparse
+import csv
+import os
+import sys
+from collections import defaultdict
+
+# Add backend directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.airport_db import AIRPORT, DEFAULT_PATH, METRO, AirportRecord, write_airport_db
+
+
+def _package_csv(name):
+    import airportsdata
+    return os.path.join(os.path.dirname(airportsdata.__file__), name)
+
+
+def load_airports(path):
+    airports = {}
+    with open(path, encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            code = row["iata"].strip().upper()
+            if len(code) != 3 or not row["tz"]:
+                continue
+            airports[code] = AirportRecord(
+                code, AIRPORT, row["name"], row["city"] or row["name"], row["country"],
+                float(row["lat"]), float(row["lon"]), row["tz"],
+            )
+    return airports
+
+
+def add_metros(airports, path):
+    """Metro codes, or member lists on airports that double as metro codes (DXB)"""
+    members = defaultdict(list)
+    cities = {}
+    with open(path, encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            if row["Airport Code"] in airports:
+                members[row["City Code"]].append(row["Airport Code"])
+                cities[row["City Code"]] = row["City Name"]
+    for code, codes in members.items():
+        codes = tuple(sorted(codes))
+        if code in airports:
+            airports[code] = airports[code]._replace(airports=codes)
+            continue
+        first = airports[codes[0]]
+        airports[code] = AirportRecord(
+            code, METRO, f"{cities[code]} (all airports)", cities[code], first.country,
+            sum(airports[c].latitude for c in codes) / len(codes),
+            sum(airports[c].longitude for c in codes) / len(codes),
+            first.timezone, codes,
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--airports", help="airports.csv (default: from the airportsdata package)")
+    parser.add_argument("--metros", help="iata_macs.csv (default: from the airportsdata package)")
+    parser.add_argument("--output", default=DEFAULT_PATH)
+    args = parser.parse_args()
+
+    airports = load_airports(args.airports or _package_csv("airports.csv"))
+    add_metros(airports, args.metros or _package_csv("iata_macs.csv"))
+    count = write_airport_db(args.output, airports.values())
+    print(f"Wrote {count} codes to {args.output} ({os.path.getsize(args.output) / 1024:.0f} KiB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Adaptive cache TTLs from days-to-departure and observed price drift
+"""
+import datetime
+import threading
+from collections import Counter
+from typing import Any, Dict, Iterator, Optional, Sequence, Tuple
+from cachetools import LRUCache
+
+# Params holding the travel date each API type's prices depend on
+DATE_PARAMS: Dict[str, str] = {
+    "flight_search": "departure_date",
+    "cheapest_dates": "departure_date",
+    "flight_inspiration": "departure_date",
+    "hotel_search": "check_in",
+}
+
+# (max days to departure, TTL multiplier): near-term fares move fast, far-out ones barely
+DEFAULT_PROXIMITY_STEPS: Sequence[Tuple[int, float]] = (
+    (1, 0.5),
+    (7, 1.0),
+    (30, 2.0),
+    (90, 4.0),
+)
+FAR_OUT_MULTIPLIER = 8.0
+
+# Relative price drift between refreshes that leaves the TTL unchanged; calmer
+# keys get up to 2x longer, jumpier ones down to 0.5x
+TARGET_DRIFT = 0.02
+VOLATILITY_BOUNDS = (0.5, 2.0)
+# Weight of the newest observation in the drift moving average
+DRIFT_SMOOTHING = 0.5
+
+
+def _prices(value: Any) -> Iterator[float]:
+    """Prices found in the result lists of a formatted API response"""
+    if not isinstance(value, dict):
+        return
+    for items in value.values():
+        if not isinstance(items, list):
+            continue
+        for item in items:
+            price = item.get("price") if isinstance(item, dict) else None
+            if isinstance(price, dict):
+                price = price.get("total")
+            try:
+                yield float(price)
+            except (TypeError, ValueError):
+                continue
+
+
+def reference_price(value: Any) -> Optional[float]:
+    """The cheapest price in a response, used to track drift between refreshes"""
+    return min(_prices(value), default=None)
+
+
+class AdaptiveTTLPolicy:
+    """
+    Scales an API type's base TTL per entry
+
+    The multiplier is the product of a proximity factor (days until the
+    departure or check-in date in the params) and a volatility factor
+    (moving average of the relative change in the cheapest price between
+    successive stores of the same key). Results are clamped to
+    ``[min_ttl, max_ttl]``. API types without a date param keep their
+    base TTL.
+    """
+
+    def __init__(self, min_ttl: int = 60, max_ttl: int = 6 * 3600,
+                 proximity_steps: Sequence[Tuple[int, float]] = DEFAULT_PROXIMITY_STEPS,
+                 max_tracked_keys: int = 10000):
+        self.min_ttl = min_ttl
+        self.max_ttl = max_ttl
+        self.proximity_steps = sorted(proximity_steps)
+        # key -> (last reference price, smoothed relative drift or None)
+        self._drift: LRUCache = LRUCache(maxsize=max_tracked_keys)
+        self._lock = threading.Lock()
+        self._counters: Counter = Counter()
+
+    def proximity_factor(self, api_type: str, params: Optional[dict],
+                         today: Optional[datetime.date] = None) -> float:
+        name = DATE_PARAMS.get(api_type)
+        raw = (params or {}).get(name) if name else None
+        if not raw:
+            return 1.0
+        try:
+            travel_date = datetime.date.fromisoformat(str(raw).strip()[:10])
+        except ValueError:
+            return 1.0
+        days = (travel_date - (today or datetime.date.today())).days
+        for max_days, multiplier in self.proximity_steps:
+            if days <= max_days:
+                return multiplier
+        return FAR_OUT_MULTIPLIER
+
+    def observe(self, key: str, value: Any) -> float:
+        """Record a fresh value for key and return its volatility factor"""
+        price = reference_price(value)
+        with self._lock:
+            previous = self._drift.get(key)
+            if price is None:
+                return 1.0
+            drift = previous[1] if previous else None
+            if previous and previous[0]:
+                change = abs(price - previous[0]) / previous[0]
+                drift = change if drift is None else DRIFT_SMOOTHING * change + (1 - DRIFT_SMOOTHING) * drift
+            self._drift[key] = (price, drift)
+        if drift is None:
+            return 1.0
+        low, high = VOLATILITY_BOUNDS
+        return min(high, max(low, TARGET_DRIFT / max(drift, 1e-6)))
+
+    def ttl(self, key: str, api_type: str, params: Optional[dict], value: Any, base_ttl: float) -> float:
+        """TTL for a value about to be stored under key"""
+        if api_type not in DATE_PARAMS:
+            return base_ttl
+        multiplier = self.proximity_factor(api_type, params) * self.observe(key, value)
+        ttl = min(self.max_ttl, max(self.min_ttl, base_ttl * multiplier))
+        with self._lock:
+            self._counters['extended' if ttl > base_ttl else 'shortened' if ttl < base_ttl else 'unchanged'] += 1
+        return ttl
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                'tracked_keys': len(self._drift),
+                'extended': self._counters['extended'],
+                'shortened': self._counters['shortened'],
+                'unchanged': self._counters['unchanged'],
+            }
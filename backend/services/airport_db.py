@@ -0,0 +1,277 @@
+"""
+Bundled airport database: a compact binary table memory-mapped on first use
+
+Layout (little-endian), written by ``write_airport_db``:
+
+    header      magic, version, record count, name index count,
+                offsets of the name index, timezone table and string pool
+    records     fixed 24-byte rows sorted by IATA code (binary search)
+    name index  10-byte rows (key offset, key length, record number) sorted
+                by normalized city name, for name -> code lookups
+    timezones   newline-separated IANA names, referenced by number
+    strings     UTF-8 "name<US>city<US>member airports" blobs and name keys
+"""
+import logging
+import math
+import mmap
+import os
+import struct
+import threading
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple
+from .gazetteer import tokenize
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "airports.bin")
+
+MAGIC = b"APDB"
+VERSION = 1
+_HEADER = struct.Struct("<4sHIIIII")
+# code, kind, country, latitude, longitude, timezone number, string offset, string length
+_RECORD = struct.Struct("<3sB2sffHII")
+# key offset, key length, record number
+_NAME_ENTRY = struct.Struct("<IHI")
+_SEPARATOR = "\x1f"
+
+AIRPORT, METRO = 0, 1
+
+EARTH_RADIUS_KM = 6371.0088
+# Airports sharing a city name this close together serve the same city
+CITY_RADIUS_KM = 100.0
+
+
+class AirportRecord(NamedTuple):
+    code: str
+    kind: int  # AIRPORT or METRO (a city code covering several airports)
+    name: str
+    city: str
+    country: str
+    latitude: float
+    longitude: float
+    timezone: str
+    airports: Tuple[str, ...] = ()  # member airports of a metro code
+
+    @property
+    def is_metro(self) -> bool:
+        return self.kind == METRO
+
+
+def normalize_name(name: str) -> str:
+    """City name key: accents folded, lowercase, punctuation collapsed to spaces"""
+    return " ".join(tokenize(name)[1])
+
+
+def write_airport_db(path: str, records: Iterable[AirportRecord]) -> int:
+    """Write records to path atomically; returns the number written"""
+    records = sorted({record.code: record for record in records}.values(), key=lambda record: record.code)
+    timezones = sorted({record.timezone for record in records})
+    tz_numbers = {tz: number for number, tz in enumerate(timezones)}
+
+    strings = bytearray()
+    rows = []
+    names = []
+    for number, record in enumerate(records):
+        blob = _SEPARATOR.join((record.name, record.city, ",".join(record.airports))).encode("utf-8")
+        rows.append(_RECORD.pack(
+            record.code.encode("ascii"), record.kind, (record.country or "").encode("ascii")[:2].ljust(2),
+            record.latitude, record.longitude, tz_numbers[record.timezone], len(strings), len(blob),
+        ))
+        strings += blob
+        key = normalize_name(record.city)
+        if key:
+            names.append((key.encode("utf-8"), number))
+    names.sort()
+
+    index = []
+    for key, number in names:
+        index.append(_NAME_ENTRY.pack(len(strings), len(key), number))
+        strings += key
+
+    tz_table = "\n".join(timezones).encode("utf-8")
+    name_index_offset = _HEADER.size + _RECORD.size * len(rows)
+    tz_offset = name_index_offset + _NAME_ENTRY.size * len(index)
+    strings_offset = tz_offset + len(tz_table)
+    header = _HEADER.pack(MAGIC, VERSION, len(rows), len(index), name_index_offset, tz_offset, strings_offset)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header)
+        f.write(b"".join(rows))
+        f.write(b"".join(index))
+        f.write(tz_table)
+        f.write(strings)
+    os.replace(tmp_path, path)
+    return len(rows)
+
+
+class AirportDatabase:
+    """
+    Read-only view of the bundled airport table
+
+    Nothing is read at import: the file is memory-mapped the first time a
+    lookup needs it, and lookups binary-search the mapped rows in place, so
+    only the pages touched are ever loaded. Code lookups and city-name
+    lookups are both O(log n). A missing or unreadable file behaves as an
+    empty database (logged once), so callers fall back to the Amadeus
+    location search.
+    """
+
+    def __init__(self, path: str = DEFAULT_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._map: Optional[mmap.mmap] = None
+        self._count = 0
+        self._name_count = 0
+        self._name_index_offset = 0
+        self._strings_offset = 0
+        self._timezones: List[str] = []
+
+    def _open(self) -> Optional[mmap.mmap]:
+        if self._loaded:
+            return self._map
+        with self._lock:
+            if self._loaded:
+                return self._map
+            try:
+                with open(self.path, "rb") as f:
+                    mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                magic, version, count, name_count, name_index_offset, tz_offset, strings_offset = \
+                    _HEADER.unpack_from(mapped, 0)
+                if magic != MAGIC or version != VERSION:
+                    raise ValueError(f"unsupported airport database format {magic!r} v{version}")
+                self._timezones = mapped[tz_offset:strings_offset].decode("utf-8").split("\n")
+                self._count, self._name_count = count, name_count
+                self._name_index_offset, self._strings_offset = name_index_offset, strings_offset
+                self._map = mapped
+                logger.info(f"Airport database mapped from {self.path}: {count} codes")
+            except (OSError, ValueError, struct.error) as e:
+                logger.warning(f"Airport database unavailable ({self.path}): {e}")
+            self._loaded = True
+            return self._map
+
+    def __len__(self) -> int:
+        self._open()
+        return self._count
+
+    def __contains__(self, code: str) -> bool:
+        return self._find(code) is not None
+
+    def _code_at(self, mapped: mmap.mmap, number: int) -> bytes:
+        offset = _HEADER.size + number * _RECORD.size
+        return mapped[offset:offset + 3]
+
+    def _find(self, code: str) -> Optional[int]:
+        mapped = self._open()
+        if mapped is None or not code or len(code) != 3:
+            return None
+        target = code.upper().encode("ascii", "replace")
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self._code_at(mapped, middle) < target:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self._count and self._code_at(mapped, low) == target:
+            return low
+        return None
+
+    def _record(self, number: int) -> AirportRecord:
+        mapped = self._map
+        code, kind, country, latitude, longitude, tz, offset, length = \
+            _RECORD.unpack_from(mapped, _HEADER.size + number * _RECORD.size)
+        start = self._strings_offset + offset
+        name, city, members = mapped[start:start + length].decode("utf-8").split(_SEPARATOR)
+        return AirportRecord(
+            code.decode("ascii"), kind, name, city, country.decode("ascii").strip(),
+            round(latitude, 5), round(longitude, 5), self._timezones[tz],
+            tuple(members.split(",")) if members else (),
+        )
+
+    def get(self, code: str) -> Optional[AirportRecord]:
+        """Record for an IATA airport or metro code"""
+        number = self._find(code)
+        return self._record(number) if number is not None else None
+
+    def _name_key(self, mapped: mmap.mmap, position: int) -> Tuple[bytes, int]:
+        key_offset, key_length, number = _NAME_ENTRY.unpack_from(
+            mapped, self._name_index_offset + position * _NAME_ENTRY.size)
+        start = self._strings_offset + key_offset
+        return mapped[start:start + key_length], number
+
+    def find_city(self, name: str) -> List[AirportRecord]:
+        """Every airport and metro code whose city is name (case and accents ignored)"""
+        mapped = self._open()
+        key = normalize_name(name or "").encode("utf-8")
+        if mapped is None or not key:
+            return []
+        low, high = 0, self._name_count
+        while low < high:
+            middle = (low + high) // 2
+            if self._name_key(mapped, middle)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+        records = []
+        while low < self._name_count:
+            found, number = self._name_key(mapped, low)
+            if found != key:
+                break
+            records.append(self._record(number))
+            low += 1
+        return records
+
+    def resolve_city(self, name: str) -> Optional[AirportRecord]:
+        """
+        Code to search a city with, when the name is unambiguous: its metro
+        code if exactly one metro carries the name, otherwise the
+        international airport of a single city
+
+        Names shared by cities far apart ("Valencia", "Santa Cruz") and
+        names matching only minor airfields ("Bali") return None: the table
+        has no traffic figures to rank them, so callers fall back to the
+        Amadeus location search, which does.
+        """
+        records = self.find_city(name)
+        metros = [record for record in records if record.is_metro]
+        if len(metros) == 1:
+            return metros[0]
+        if metros or not records or not _within(records, CITY_RADIUS_KM):
+            return None
+        international = [record for record in records if "international" in record.name.lower()]
+        return international[0] if len(international) == 1 else None
+
+    def positions(self) -> Iterator[Tuple[str, float, float]]:
+        """(code, latitude, longitude) of every airport, skipping metro codes and string decoding"""
+        mapped = self._open()
+        if mapped is None:
+            return
+        for number in range(self._count):
+            code, kind, _, latitude, longitude, _, _, _ = \
+                _RECORD.unpack_from(mapped, _HEADER.size + number * _RECORD.size)
+            if kind == AIRPORT:
+                yield code.decode("ascii"), latitude, longitude
+
+    def records(self) -> Iterator[AirportRecord]:
+        """Every record in code order (reads the whole table)"""
+        if self._open() is None:
+            return
+        for number in range(self._count):
+            yield self._record(number)
+
+
+def distance_km(a: AirportRecord, b: AirportRecord) -> float:
+    """Great-circle distance between two records"""
+    lat_a, lat_b = math.radians(a.latitude), math.radians(b.latitude)
+    half_chord = (math.sin((lat_b - lat_a) / 2) ** 2
+                  + math.cos(lat_a) * math.cos(lat_b) * math.sin(math.radians(b.longitude - a.longitude) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(half_chord)))
+
+
+def _within(records: List[AirportRecord], radius_km: float) -> bool:
+    """Whether every pair of records lies within radius_km of each other"""
+    return all(distance_km(a, b) <= radius_km for i, a in enumerate(records) for b in records[i + 1:])
+
+
+AIRPORTS = AirportDatabase()
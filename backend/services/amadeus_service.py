@@ -11,6 +11,14 @@ import json
 logger = logging.getLogger(__name__)
 
 
+class AmadeusAPIError(Exception):
+    """Amadeus returned an HTTP error status"""
+
+    def __init__(self, message: str, status_code: int):
+        super().__init__(message)
+        self.status_code = status_code
+
+
 class AmadeusService:
     """
     Service class for Amadeus API integration
@@ -79,13 +87,15 @@ class AmadeusService:
                 self._access_token = None
                 return await self._make_request(endpoint, params)
             # include body to help diagnose
-            raise Exception(f"Amadeus API error: {e.response.status_code} - {e.response.text}")
+            raise AmadeusAPIError(f"Amadeus API error: {e.response.status_code} - {e.response.text}",
+                                  e.response.status_code)
         except Exception as e:
             logger.error(f"Amadeus API request failed: {e}")
             raise Exception(f"Amadeus API request failed: {e}")
     
     async def search_flights(self, origin: str, destination: str, departure_date: str, 
-                           return_date: str = None, adults: int = 1, max_price: int = None) -> Dict[str, Any]:
+                           return_date: str = None, adults: int = 1, max_price: int = None,
+                           non_stop: bool = False) -> Dict[str, Any]:
         """Search for flight offers"""
         params = {
             "originLocationCode": origin,
@@ -100,12 +110,15 @@ class AmadeusService:
         if max_price:
             params["maxPrice"] = max_price
         
+        if non_stop:
+            params["nonStop"] = "true"
+        
         try:
             response = await self._make_request("/v2/shopping/flight-offers", params)
             return self._format_flight_response(response)
         except Exception as e:
             logger.error(f"Flight search failed: {e}")
-            return {"error": str(e), "flights": []}
+            return {"error": str(e), "status_code": getattr(e, "status_code", None), "flights": []}
     
     async def get_flight_inspiration(self, origin: str, max_price: int = None, 
                                     departure_date: str = None) -> Dict[str, Any]:
@@ -122,7 +135,7 @@ class AmadeusService:
             return self._format_inspiration_response(response)
         except Exception as e:
             logger.error(f"Flight inspiration failed: {e}")
-            return {"error": str(e), "destinations": []}
+            return {"error": str(e), "status_code": getattr(e, "status_code", None), "destinations": []}
     
     async def search_hotels(self, city_code: str, check_in: str, check_out: str, 
                            adults: int = 1, radius: int = 50, price_range: str = None) -> Dict[str, Any]:
@@ -143,7 +156,7 @@ class AmadeusService:
             return self._format_hotel_response(response)
         except Exception as e:
             logger.error(f"Hotel search failed: {e}")
-            return {"error": str(e), "hotels": []}
+            return {"error": str(e), "status_code": getattr(e, "status_code", None), "hotels": []}
     
     async def search_activities(self, latitude: float, longitude: float, radius: int = 20) -> Dict[str, Any]:
         """Search for activities near coordinates"""
@@ -158,7 +171,7 @@ class AmadeusService:
             return self._format_activity_response(response)
         except Exception as e:
             logger.error(f"Activity search failed: {e}")
-            return {"error": str(e), "activities": []}
+            return {"error": str(e), "status_code": getattr(e, "status_code", None), "activities": []}
     
     async def get_airport_city_search(self, keyword: str) -> Dict[str, Any]:
         """Search for airports and cities"""
@@ -169,7 +182,7 @@ class AmadeusService:
             return self._format_location_response(response)
         except Exception as e:
             logger.error(f"Location search failed: {e}")
-            return {"error": str(e), "locations": []}
+            return {"error": str(e), "status_code": getattr(e, "status_code", None), "locations": []}
     
     async def get_cheapest_dates(self, origin: str, destination: str, 
                                departure_date_range: str) -> Dict[str, Any]:
@@ -185,7 +198,7 @@ class AmadeusService:
             return self._format_cheapest_dates_response(response)
         except Exception as e:
             logger.error(f"Cheapest dates search failed: {e}")
-            return {"error": str(e), "dates": []}
+            return {"error": str(e), "status_code": getattr(e, "status_code", None), "dates": []}
     
     def _format_flight_response(self, response: Dict[str, Any]) -> Dict[str, Any]:
         """Format flight search response"""
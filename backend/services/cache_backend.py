@@ -0,0 +1,62 @@
+"""
+Interface for shared (L2) cache backends behind CacheManager
+"""
+from abc import ABC, abstractmethod
+from typing import Any, NamedTuple, Optional
+
+# Fields that bulk invalidation may filter on
+INDEXED_FIELDS = ("session_id", "api_type", "route")
+
+
+class BackendEntry(NamedTuple):
+    """An entry read back from an L2 backend; times are wall-clock (time.time())"""
+    value: Any
+    stored_at: float
+    stale_at: float
+    expires_at: float
+    api_type: str
+    session_id: Optional[str]
+    route: Optional[str]
+
+
+class CacheBackend(ABC):
+    """
+    A cache tier shared beyond one process (SQLite on a host, Redis across hosts)
+
+    Values must be JSON-serializable (or an EncodedValue). Expiry uses
+    wall-clock time so entries stay valid across processes and hosts.
+    Implementations may raise on I/O failures; CacheManager logs and counts
+    them instead of failing the request.
+    """
+
+    # Where the data lives, for diagnostics (a file path, a redacted URL, ...)
+    location: str = ""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[BackendEntry]:
+        """Return the entry for a key, or None if missing or past its hard expiry"""
+
+    @abstractmethod
+    def set(self, key: str, api_type: str, value: Any, ttl: float, soft_ttl: Optional[float] = None,
+            session_id: Optional[str] = None, route: Optional[str] = None) -> bool:
+        """Write an entry; returns False if the value is not JSON-serializable"""
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        ...
+
+    @abstractmethod
+    def delete_by(self, field: str, value: str) -> int:
+        """Delete every entry whose session_id, api_type or route equals value"""
+
+    @abstractmethod
+    def purge_expired(self) -> int:
+        """Drop expired entries now and return how many were removed"""
+
+    @abstractmethod
+    def clear(self) -> None:
+        ...
+
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
@@ -0,0 +1,48 @@
+"""
+Pre-serialized, optionally compressed cache values
+"""
+import json
+import sys
+import zlib
+from typing import Any
+
+# Payloads smaller than this are stored as plain JSON; deflate barely helps them
+MIN_COMPRESS_BYTES = 512
+
+
+class EncodedValue:
+    """
+    A value stored as UTF-8 JSON bytes, zlib-compressed when large enough
+
+    ``json_bytes()`` gives the JSON without building Python objects, so a
+    cache hit can be written straight into an HTTP response; ``decode()``
+    rebuilds the original value when the caller needs to inspect it.
+    """
+
+    __slots__ = ("data", "compressed")
+
+    def __init__(self, data: bytes, compressed: bool):
+        self.data = data
+        self.compressed = compressed
+
+    def json_bytes(self) -> bytes:
+        return zlib.decompress(self.data) if self.compressed else self.data
+
+    def decode(self) -> Any:
+        return json.loads(self.json_bytes())
+
+    def __sizeof__(self) -> int:
+        return object.__sizeof__(self) + sys.getsizeof(self.data)
+
+
+def encode_value(value: Any, compress_level: int = 6) -> EncodedValue:
+    """Serialize a JSON-compatible value; raises TypeError/ValueError otherwise"""
+    data = json.dumps(value, separators=(",", ":")).encode("utf-8")
+    if compress_level and len(data) >= MIN_COMPRESS_BYTES:
+        return EncodedValue(zlib.compress(data, compress_level), True)
+    return EncodedValue(data, False)
+
+
+def decode_value(value: Any) -> Any:
+    """Return the live value whether or not it was stored encoded"""
+    return value.decode() if isinstance(value, EncodedValue) else value
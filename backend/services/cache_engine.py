@@ -0,0 +1,234 @@
+"""
+In-memory storage engine for CacheManager: TTL/LRU shards with secondary indexes
+"""
+import contextlib
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+from cachetools import Cache, TLRUCache
+from .cache_metrics import LatencyHistogram
+
+# Fields of KeyMeta that have a secondary index (value -> keys)
+INDEX_FIELDS = ("session_id", "api_type", "route")
+
+
+# Fixed per-entry overhead: the CacheEntry itself, the key and the heap/LRU bookkeeping
+ENTRY_OVERHEAD_BYTES = 200
+
+
+def estimate_size(value: Any) -> int:
+    """Approximate deep memory footprint of a JSON-like value in bytes
+
+    Walks dicts, lists, tuples and sets iteratively; shared sub-objects are
+    counted once. Meant to be computed once per entry, not exact.
+    """
+    seen = set()
+    stack = [value]
+    total = 0
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+    return total
+
+
+class CacheEntry:
+    """A cached value with its hard TTL, the monotonic time it goes stale and its size
+
+    ``negative`` marks a cached failure or empty result rather than data;
+    ``hits`` counts lookups served, to pick the hottest entries for snapshots;
+    ``saved_windows`` is the last base-TTL window credited as a saved call.
+    """
+
+    __slots__ = ("value", "ttl", "stored_at", "stale_at", "size", "negative", "hits", "saved_windows")
+
+    def __init__(self, value: Any, ttl: float, soft_ttl: Optional[float] = None, age: float = 0.0,
+                 size: Optional[int] = None, negative: bool = False):
+        self.value = value
+        self.ttl = ttl
+        self.negative = negative
+        self.hits = 0
+        self.saved_windows = 0
+        self.stored_at = time.monotonic() - age
+        self.stale_at = self.stored_at + (ttl if soft_ttl is None else soft_ttl)
+        self.size = (estimate_size(value) if size is None else size) + ENTRY_OVERHEAD_BYTES
+
+    def is_stale(self, now: float) -> bool:
+        return now >= self.stale_at
+
+
+class KeyMeta(NamedTuple):
+    """What a cache key belongs to, for the secondary invalidation indexes"""
+    api_type: str
+    session_id: Optional[str] = None  # None for shared-tier keys
+    route: Optional[str] = None       # "ORIGIN-DESTINATION" for route-based API types
+
+
+def _entry_expiry(key: str, entry: CacheEntry, now: float) -> float:
+    """Time-to-use function for TLRUCache: each entry expires after its own TTL"""
+    return now + entry.ttl
+
+
+def _entry_size(entry: CacheEntry) -> int:
+    return entry.size
+
+
+class IndexedTLRUCache(TLRUCache):
+    """TLRUCache that reports every removal (TTL expiry, LRU eviction, delete)
+
+    Lets the owning shard keep its secondary indexes consistent with
+    evictions it does not trigger itself.
+    """
+
+    def __init__(self, maxsize, ttu, on_remove: Callable[[str], None], **kwargs):
+        super().__init__(maxsize, ttu, **kwargs)
+        self._on_remove = on_remove
+        self.evictions = 0
+
+    def popitem(self):
+        # Called by Cache.__setitem__ until the new entry fits (count or byte budget)
+        item = super().popitem()
+        self.evictions += 1
+        return item
+
+    def expire(self, time=None):
+        expired = super().expire(time)
+        for key, _ in expired:
+            self._on_remove(key)
+        return expired
+
+    def __delitem__(self, key):
+        # popitem() (LRU eviction) and pop() both end up here
+        try:
+            super().__delitem__(key)
+        finally:
+            self._on_remove(key)
+
+
+class CacheShard:
+    """
+    One independent slice of the in-memory cache
+
+    Each shard owns its TLRU store, secondary indexes, counters and latency
+    histograms, guarded by its own lock. Methods assume the caller already
+    holds ``lock``. With ``lock_free`` the lock is a no-op, which is only
+    safe when every access comes from a single event loop thread.
+
+    With ``by_bytes`` the store's ``maxsize`` is a byte budget measured with
+    each entry's precomputed size, so LRU eviction frees enough bytes for
+    the incoming entry rather than a fixed number of slots.
+    """
+
+    def __init__(self, maxsize: int, lock_free: bool = False, by_bytes: bool = False):
+        self.lock = contextlib.nullcontext() if lock_free else threading.Lock()
+        self.cache = IndexedTLRUCache(maxsize=maxsize, ttu=_entry_expiry, on_remove=self.unindex,
+                                      getsizeof=_entry_size if by_bytes else None)
+        self.key_meta: Dict[str, KeyMeta] = {}
+        self.indexes: Dict[str, Dict[str, Set[str]]] = {field: {} for field in INDEX_FIELDS}
+        self.counters: Counter = Counter()
+        self.latency = {
+            'l1': LatencyHistogram(thread_safe=not lock_free),
+            'l2': LatencyHistogram(thread_safe=not lock_free),
+        }
+
+    def put(self, key: str, entry: CacheEntry, meta: KeyMeta) -> bool:
+        """Store an entry; returns False if it alone exceeds the shard's budget"""
+        try:
+            self.cache[key] = entry
+        except ValueError:
+            # cachetools refuses values larger than maxsize; drop any older version
+            self.cache.pop(key, None)
+            self.counters['oversize'] += 1
+            return False
+        self.index(key, meta)
+        return True
+
+    def index(self, key: str, meta: KeyMeta) -> None:
+        """Record a key in the secondary indexes"""
+        if self.key_meta.get(key) == meta:
+            return
+        self.unindex(key)
+        self.key_meta[key] = meta
+        for field, index in self.indexes.items():
+            value = getattr(meta, field)
+            if value is not None:
+                index.setdefault(value, set()).add(key)
+
+    def unindex(self, key: str) -> None:
+        """Drop a key from the secondary indexes; also the store's removal hook"""
+        meta = self.key_meta.pop(key, None)
+        if meta is None:
+            return
+        for field, index in self.indexes.items():
+            value = getattr(meta, field)
+            keys = index.get(value)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del index[value]
+
+    def invalidate(self, field: str, value: str) -> int:
+        """Remove every key listed under value in one index"""
+        keys = self.indexes[field].pop(value, set())
+        for key in keys:
+            self.cache.pop(key, None)
+            # pop() skips already-expired entries, so unindex explicitly
+            self.unindex(key)
+        return len(keys)
+
+    def expire(self) -> int:
+        return len(self.cache.expire())
+
+    def peek(self) -> List[Tuple[str, CacheEntry]]:
+        """Live (key, entry) pairs, read without touching LRU order"""
+        getitem = Cache.__getitem__
+        return [(key, getitem(self.cache, key)) for key in self.cache]
+
+    def bytes_used(self) -> int:
+        """Approximate bytes held by stored entries"""
+        if self.cache.getsizeof is _entry_size:
+            return self.cache.currsize
+        return sum(entry.size for _, entry in self.peek())
+
+    def clear(self) -> None:
+        self.cache.clear()
+        self.key_meta.clear()
+        for index in self.indexes.values():
+            index.clear()
+
+
+class ShardedStore:
+    """N independent CacheShards, with keys assigned to shards by hash
+
+    Bounded by ``max_bytes`` (approximate, split evenly across shards) when
+    given, otherwise by ``maxsize`` entries.
+    """
+
+    def __init__(self, maxsize: int = 1000, shards: int = 8, lock_free: bool = False,
+                 max_bytes: Optional[int] = None):
+        if shards < 1:
+            raise ValueError("shards must be >= 1")
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.lock_free = lock_free
+        budget = max_bytes if max_bytes is not None else maxsize
+        per_shard = max(1, budget // shards)
+        self.shards: List[CacheShard] = [
+            CacheShard(per_shard, lock_free, by_bytes=max_bytes is not None) for _ in range(shards)
+        ]
+
+    def shard_for(self, key: str) -> CacheShard:
+        shards = self.shards
+        return shards[hash(key) % len(shards)] if len(shards) > 1 else shards[0]
+
+    def __len__(self) -> int:
+        return sum(len(shard.cache) for shard in self.shards)
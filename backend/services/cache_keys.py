@@ -0,0 +1,129 @@
+"""
+Canonical cache keys: per-API-type param schemas hashed into fixed-size digests
+"""
+import datetime
+import hashlib
+import json
+from typing import Any, Callable, Dict, NamedTuple, Optional, Tuple
+
+# blake2b digest size in bytes; 16 bytes (32 hex chars) makes collisions negligible
+DIGEST_SIZE = 16
+
+
+class ParamSpec(NamedTuple):
+    """How one request param is normalized before hashing"""
+    cast: Callable[[Any], Any]
+    default: Any = None  # values equal to the default are left out of the key
+
+
+def upper(value: Any) -> str:
+    return str(value).strip().upper()
+
+
+def casefold(value: Any) -> str:
+    return " ".join(str(value).split()).casefold()
+
+
+def date(value: Any) -> str:
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()[:10]
+    return datetime.date.fromisoformat(str(value).strip()[:10]).isoformat()
+
+
+def flag(value: Any) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in ("true", "1", "yes", "y")
+    return bool(value)
+
+
+def price(value: Any) -> float:
+    return round(float(value), 2)
+
+
+def coordinate(value: Any) -> float:
+    # 4 decimal places is ~11 m, well below any search radius
+    return round(float(value), 4)
+
+
+_FLIGHT_ROUTE = {
+    "origin": ParamSpec(upper),
+    "destination": ParamSpec(upper),
+    "departure_date": ParamSpec(date),
+}
+
+# Param schemas per API type; defaults mirror the ones fetch_amadeus_data applies
+DEFAULT_KEY_SCHEMAS: Dict[str, Dict[str, ParamSpec]] = {
+    "flight_search": {
+        **_FLIGHT_ROUTE,
+        "return_date": ParamSpec(date),
+        "adults": ParamSpec(int, 1),
+        "max_price": ParamSpec(price),
+        "non_stop": ParamSpec(flag, False),
+    },
+    "cheapest_dates": dict(_FLIGHT_ROUTE),
+    "flight_inspiration": {
+        "origin": ParamSpec(upper),
+        "departure_date": ParamSpec(date),
+        "max_price": ParamSpec(price),
+    },
+    "hotel_search": {
+        "destination": ParamSpec(upper),
+        "check_in": ParamSpec(date),
+        "check_out": ParamSpec(date),
+        "adults": ParamSpec(int, 1),
+        "radius": ParamSpec(int, 50),
+        "price_range": ParamSpec(casefold),
+    },
+    "activity_search": {
+        "latitude": ParamSpec(coordinate),
+        "longitude": ParamSpec(coordinate),
+        "radius": ParamSpec(int, 20),
+    },
+    "location_search": {
+        "keyword": ParamSpec(casefold),
+    },
+}
+
+
+class CacheKeyBuilder:
+    """
+    Builds canonical, fixed-size cache keys
+
+    Params are normalized through the API type's schema (type casts,
+    casing, defaults elided, empty values dropped) so that logically
+    identical queries such as ``adults=1``/``adults="1"`` or "jfk"/"JFK"
+    map to the same key. The canonical params are hashed with blake2b, so
+    keys stay short however many params a request carries. Params without
+    a schema entry are kept verbatim rather than dropped, so distinct
+    queries never collide.
+    """
+
+    def __init__(self, schemas: Optional[Dict[str, Dict[str, ParamSpec]]] = None):
+        self.schemas = dict(DEFAULT_KEY_SCHEMAS if schemas is None else schemas)
+
+    def canonical_params(self, api_type: str, params: Optional[dict]) -> Tuple[Tuple[str, Any], ...]:
+        """Sorted (name, value) pairs after normalization"""
+        schema = self.schemas.get(api_type, {})
+        canonical = []
+        for name, value in (params or {}).items():
+            if value is None or value == "" or (name == "type" and value == api_type):
+                continue
+            spec = schema.get(name)
+            if spec is not None:
+                try:
+                    value = spec.cast(value)
+                except (TypeError, ValueError):
+                    # Keep unparseable values distinct instead of failing the lookup
+                    value = str(value)
+                if value == spec.default:
+                    continue
+            elif not isinstance(value, (str, int, float, bool)):
+                value = str(value)
+            canonical.append((str(name), value))
+        canonical.sort()
+        return tuple(canonical)
+
+    def digest(self, api_type: str, params: Optional[dict]) -> str:
+        """Fixed-size hex digest of the canonical params"""
+        payload = json.dumps(self.canonical_params(api_type, params), separators=(",", ":"))
+        return hashlib.blake2b(payload.encode("utf-8"), digest_size=DIGEST_SIZE).hexdigest()
@@ -1,66 +1,679 @@
 """
 Cache Manager for session-based caching of API responses
 """
-import time
+import asyncio
+import heapq
+import inspect
+import logging
 import threading
-from typing import Any, Optional
-from cachetools import TTLCache
+import time
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple, Union
+from .cache_codec import EncodedValue, encode_value
+from .cache_engine import INDEX_FIELDS, CacheEntry, CacheShard, KeyMeta, ShardedStore
+from .cache_keys import CacheKeyBuilder, ParamSpec
+from .cache_snapshot import SnapshotEntry, read_snapshot, write_snapshot
+from .cache_metrics import LatencyHistogram
+from .adaptive_ttl import AdaptiveTTLPolicy
+from .cache_backend import BackendEntry, CacheBackend
+from .disk_cache import SQLiteCacheTier
+
+logger = logging.getLogger(__name__)
+
+# API types whose responses are public travel data (they don't depend on who is
+# asking), so they are cached once in a namespace shared by every session.
+SHARED_API_TYPES = frozenset({
+    "flight_search",
+    "flight_inspiration",
+    "location_search",
+    "cheapest_dates",
+})
+
+SHARED_TIER = "shared"
+SESSION_TIER = "session"
+
+# Per-API-type TTLs in seconds. Reference data barely changes, prices move fast.
+DEFAULT_TTL_POLICIES: Dict[str, int] = {
+    "location_search": 3 * 24 * 3600,   # 3 days
+    "activity_search": 6 * 3600,        # 6 hours
+    "cheapest_dates": 3600,             # 1 hour
+    "flight_inspiration": 30 * 60,      # 30 minutes
+    "hotel_search": 15 * 60,            # 15 minutes
+    "flight_search": 5 * 60,            # 5 minutes
+}
+
+# Stale-while-revalidate grace periods in seconds. Once an entry is past its
+# (soft) TTL it may still be served for this long while a background refresh
+# runs; after soft TTL + grace (the hard TTL) callers wait for a fresh fetch.
+DEFAULT_STALE_GRACE: Dict[str, int] = {
+    "location_search": 24 * 3600,
+    "cheapest_dates": 3600,
+    "flight_inspiration": 30 * 60,
+    "flight_search": 10 * 60,
+}
+
+# Negative-cache TTLs in seconds, by outcome class (see classify_negative).
+# Empty results and client errors are stable for a while; anything that
+# may be transient (5xx, 429, timeouts, unknown failures) is capped hard.
+DEFAULT_NEGATIVE_TTLS: Dict[str, int] = {
+    "empty": 120,
+    "client_error": 60,
+    "transient": 5,
+}
+MAX_TRANSIENT_NEGATIVE_TTL = 5
+
+# Default byte budget for the in-memory tier (approximate, see estimate_size)
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# How many of the hottest entries a snapshot keeps
+DEFAULT_SNAPSHOT_LIMIT = 1000
+
+# A loader refetches a value from upstream given the cached params
+Loader = Callable[[dict], Union[Any, Awaitable[Any]]]
+
+
+class CacheResult(NamedTuple):
+    """Outcome of a cache lookup: the value plus where it came from and whether it is stale"""
+    value: Any
+    tier: str
+    stale: bool
+    age: float
+    negative: bool = False  # a cached error or empty result
+
+
+def classify_negative(value: Any) -> Optional[str]:
+    """Classify a response that should not be cached as data
+
+    Returns None for a usable response, "empty" for no results,
+    "client_error" for a 4xx the same request will hit again, and
+    "transient" for every other error.
+    """
+    if not value:
+        return "empty"
+    if not isinstance(value, dict):
+        return None
+    if value.get('error'):
+        status = value.get('status_code')
+        if isinstance(status, int) and 400 <= status < 500 and status not in (408, 429):
+            return "client_error"
+        return "transient"
+    if value.get('count') == 0:
+        return "empty"
+    return None
+
+
+def route_key(origin: Optional[str], destination: Optional[str]) -> Optional[str]:
+    """Normalized route identifier used by the route index"""
+    if not origin or not destination:
+        return None
+    return f"{str(origin).strip().upper()}-{str(destination).strip().upper()}"
 
 
 class CacheManager:
     """
-    Thread-safe cache manager with TTL support for API responses
+    Thread-safe, two-tier cache for API responses
+
+    Public travel data is shared across sessions, everything else is kept
+    per session. Entries live in a sharded in-memory tier (L1) and, when
+    configured, a shared SQLite or Redis tier (L2).
     """
-    
-    def __init__(self, default_ttl: int = 300):  # 5 minutes default
+
+    def __init__(self, default_ttl: int = 300, shared_api_types: frozenset = SHARED_API_TYPES,
+                 ttl_policies: Optional[Dict[str, int]] = None,
+                 stale_grace: Optional[Dict[str, int]] = None,
+                 l2_path: Optional[str] = None,
+                 maxsize: int = 1000, shards: int = 8, lock_free: bool = False,
+                 max_bytes: Optional[int] = DEFAULT_MAX_BYTES,
+                 serialize_values: bool = False, compress_level: int = 6,
+                 key_schemas: Optional[Dict[str, Dict[str, ParamSpec]]] = None,
+                 negative_ttls: Optional[Dict[str, int]] = None,
+                 l2: Optional[CacheBackend] = None,
+                 adaptive_ttl: Optional[AdaptiveTTLPolicy] = None):  # 5 minutes default
+        """
+        Args:
+            default_ttl: TTL in seconds for API types without a policy
+            shared_api_types: API types cached once for every session
+            ttl_policies: TTL in seconds per API type
+            stale_grace: Seconds past the TTL an entry is served stale while it refreshes
+            l2_path: SQLite file for an on-disk L2 tier shared by the host's workers
+            maxsize: L1 entry limit, used when max_bytes is None
+            shards: Number of independently locked L1 shards
+            lock_free: Drop the shard locks; only safe when used from one event loop
+            max_bytes: Approximate L1 byte budget
+            serialize_values: Keep values as (compressed) JSON bytes instead of live objects
+            compress_level: zlib level for serialized values (0 disables compression)
+            key_schemas: Param normalization per API type (see CacheKeyBuilder)
+            negative_ttls: TTL in seconds per negative outcome class (see classify_negative)
+            l2: Any CacheBackend as L2, e.g. a RedisCacheTier shared by all replicas
+            adaptive_ttl: Policy scaling TTLs by departure proximity and price drift
+        """
         self.default_ttl = default_ttl
-        self._cache = TTLCache(maxsize=1000, ttl=default_ttl)
+        self.shared_api_types = frozenset(shared_api_types)
+        self.ttl_policies = dict(DEFAULT_TTL_POLICIES if ttl_policies is None else ttl_policies)
+        self.stale_grace = dict(DEFAULT_STALE_GRACE if stale_grace is None else stale_grace)
+        self.adaptive_ttl = adaptive_ttl
+        self.negative_ttls = dict(DEFAULT_NEGATIVE_TTLS if negative_ttls is None else negative_ttls)
+        if "transient" in self.negative_ttls:
+            self.negative_ttls["transient"] = min(self.negative_ttls["transient"], MAX_TRANSIENT_NEGATIVE_TTL)
+        self.lock_free = lock_free
+        self.serialize_values = serialize_values
+        self.compress_level = compress_level
+        self.key_builder = CacheKeyBuilder(key_schemas)
+        self._l1 = ShardedStore(maxsize=maxsize, shards=shards, lock_free=lock_free, max_bytes=max_bytes)
+        # Guards state touched off the hot path: loaders, in-flight refreshes, rare counters
         self._lock = threading.RLock()
-    
-    def _generate_key(self, session_id: str, api_type: str, params: dict) -> str:
-        """Generate cache key from session, API type, and parameters"""
-        # Sort params for consistent key generation
-        sorted_params = sorted(params.items()) if params else []
-        param_str = "|".join(f"{k}={v}" for k, v in sorted_params)
-        return f"{session_id}:{api_type}:{param_str}"
-    
-    def get(self, session_id: str, api_type: str, params: dict) -> Optional[Any]:
-        """Get cached response if available"""
-        with self._lock:
-            key = self._generate_key(session_id, api_type, params)
-            return self._cache.get(key)
-    
-    def set(self, session_id: str, api_type: str, params: dict, value: Any, ttl: Optional[int] = None) -> None:
-        """Cache response with TTL"""
+        self._counters: Counter = Counter()
+        self._loaders: Dict[str, Loader] = {}
+        self._refreshing = set()
+        self._refresh_tasks = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # Sessions holding personalized values of shared API types (see _candidates)
+        self._overlay_sessions = set()
+        if l2 is None and l2_path:
+            l2 = SQLiteCacheTier(l2_path)
+        self._l2 = l2
+
+    def is_shared(self, api_type: str) -> bool:
+        """Whether responses for this API type are shared across sessions"""
+        return api_type in self.shared_api_types
+
+    def ttl_for(self, api_type: str) -> int:
+        """TTL policy for an API type, falling back to the default TTL"""
+        return self.ttl_policies.get(api_type, self.default_ttl)
+
+    def register_loader(self, api_type: str, loader: Loader) -> None:
+        """Register the function used to refresh stale entries of an API type
+
+        The loader is called with the cached params and may be sync or async.
+        """
         with self._lock:
-            key = self._generate_key(session_id, api_type, params)
-            # Create new cache entry with custom TTL if specified
-            if ttl and ttl != self.default_ttl:
-                # For custom TTL, we need to manually track expiration
-                self._cache[key] = {
-                    'value': value,
-                    'expires_at': time.time() + ttl
-                }
+            self._loaders[api_type] = loader
+
+    def _generate_key(self, session_id: Optional[str], api_type: str, params: dict, shared: bool = False) -> str:
+        """Generate cache key from namespace, API type, and a digest of the canonical params"""
+        return self._namespaced_key(session_id, api_type, self.key_builder.digest(api_type, params), shared)
+
+    @staticmethod
+    def _namespaced_key(session_id: Optional[str], api_type: str, digest: str, shared: bool) -> str:
+        namespace = SHARED_TIER if shared else f"{SESSION_TIER}:{session_id}"
+        return f"{namespace}:{api_type}:{digest}"
+
+    def _key_meta_for(self, session_id: Optional[str], api_type: str, params: dict, shared: bool) -> KeyMeta:
+        params = params or {}
+        origin = params.get('origin') or params.get('originLocationCode')
+        destination = params.get('destination') or params.get('destinationLocationCode')
+        return KeyMeta(api_type, None if shared else session_id, route_key(origin, destination))
+
+    def get(self, session_id: str, api_type: str, params: dict) -> Optional[Any]:
+        """Get cached response if available, checking the session overlay before the shared tier
+
+        Negatively cached errors and empty results read as a miss; use
+        ``lookup`` to tell them apart.
+        """
+        result = self.lookup(session_id, api_type, params)
+        return result.value if result and not result.negative else None
+
+    def lookup(self, session_id: str, api_type: str, params: dict, decode: bool = True,
+               count: bool = True) -> Optional[CacheResult]:
+        """Like get, but also report the serving tier, staleness and age of the value
+
+        A stale hit schedules a background refresh of that entry. With
+        ``decode=False`` serialized values are returned as EncodedValue.
+        With ``count=False`` the hit/miss counters are left alone, for
+        callers that probe several keys to answer one request and report
+        the outcome once through ``record_lookup``.
+        """
+        shard = None
+        for tier, key in self._candidates(session_id, api_type, params):
+            shard = self._l1.shard_for(key)
+            entry = self._get_entry(shard, key, count)
+            if entry is None:
+                continue
+            now = time.monotonic()
+            if entry.negative:
+                result = CacheResult(self._decode(entry.value, decode), tier, False, now - entry.stored_at, True)
             else:
-                self._cache[key] = value
-    
-    def clear_session(self, session_id: str) -> None:
-        """Clear all cached data for a session"""
+                result = CacheResult(self._decode(entry.value, decode), tier, entry.is_stale(now), now - entry.stored_at)
+                if result.stale:
+                    meta = self._key_meta_for(session_id, api_type, params, tier == SHARED_TIER)
+                    self._schedule_refresh(key, meta, params)
+            if count:
+                self._count_lookup(shard, api_type, result, entry)
+            return result
+        if count and shard is not None:
+            self._count_lookup(shard, api_type, None)
+        return None
+
+    def record_lookup(self, session_id: str, api_type: str, params: dict, result: Optional[CacheResult]) -> None:
+        """Count one hit or miss for a request answered with ``lookup(..., count=False)`` probes"""
+        candidates = self._candidates(session_id, api_type, params)
+        if not candidates:
+            return
+        key = dict(candidates).get(result.tier) if result is not None else None
+        shard = self._l1.shard_for(key or candidates[-1][1])
+        entry = None
+        if key is not None:
+            # Served from the requested key itself (not derived): it counts towards snapshot hotness
+            with shard.lock:
+                entry = shard.cache.get(key)
+        self._count_lookup(shard, api_type, result, entry)
+
+    def _candidates(self, session_id: Optional[str], api_type: str, params: dict) -> List[Tuple[str, str]]:
+        """(tier, key) pairs to try in order: the session overlay, then the shared tier
+
+        The params are digested once for both keys. For shared API types the
+        overlay is only tried (L1 and L2) for sessions that stored a
+        personalized value, so an ordinary lookup costs one key read.
+        """
+        digest = self.key_builder.digest(api_type, params)
+        if not self.is_shared(api_type):
+            return [(SESSION_TIER, self._namespaced_key(session_id, api_type, digest, False))] if session_id else []
+        candidates = []
+        if session_id and session_id in self._overlay_sessions:
+            candidates.append((SESSION_TIER, self._namespaced_key(session_id, api_type, digest, False)))
+        candidates.append((SHARED_TIER, self._namespaced_key(session_id, api_type, digest, True)))
+        return candidates
+
+    def _count_lookup(self, shard: CacheShard, api_type: str, result: Optional[CacheResult],
+                      entry: Optional[CacheEntry] = None) -> None:
+        with shard.lock:
+            if result is None:
+                shard.counters[f'{SHARED_TIER if self.is_shared(api_type) else SESSION_TIER}_misses'] += 1
+                return
+            if result.negative:
+                shard.counters['negative_hits'] += 1
+                return
+            shard.counters[f'{result.tier}_hits'] += 1
+            if result.stale:
+                shard.counters['stale_hits'] += 1
+            if entry is None:
+                return
+            entry.hits += 1
+            if self.adaptive_ttl is not None and not result.stale:
+                # Without the adaptive policy this entry would have been refetched once per
+                # base-TTL window, so only the first hit in each window past the first saves a call
+                window = int(result.age // self.ttl_for(api_type))
+                if window > entry.saved_windows:
+                    entry.saved_windows = window
+                    shard.counters['adaptive_saved_calls'] += 1
+
+    def _get_entry(self, shard: CacheShard, key: str, count: bool = True) -> Optional[CacheEntry]:
+        """Read an entry from L1, falling back to L2 and promoting L2 hits"""
+        with shard.lock:
+            started = time.perf_counter()
+            entry = shard.cache.get(key)
+            shard.latency['l1'].observe(time.perf_counter() - started)
+        if entry is not None or self._l2 is None:
+            return entry
+        # Disk I/O happens outside the shard lock
+        started = time.perf_counter()
+        try:
+            disk_entry = self._l2.get(key)
+        except Exception as e:
+            logger.warning(f"L2 cache read failed: {e}")
+            with self._lock:
+                self._counters['l2_errors'] += 1
+            return None
+        finally:
+            elapsed = time.perf_counter() - started
+            with shard.lock:
+                shard.latency['l2'].observe(elapsed)
+        with shard.lock:
+            if disk_entry is None:
+                if count:
+                    shard.counters['l2_misses'] += 1
+                return None
+            if count:
+                shard.counters['l2_hits'] += 1
+            return self._promote(shard, key, disk_entry)
+
+    def _promote(self, shard: CacheShard, key: str, disk_entry: BackendEntry) -> Optional[CacheEntry]:
+        """Copy an L2 entry into L1, keeping its remaining soft and hard TTLs (shard lock held)"""
+        now = time.time()
+        remaining = disk_entry.expires_at - now
+        if remaining <= 0:
+            return None
+        value = self._encode(disk_entry.value) if self.serialize_values else disk_entry.value
+        entry = CacheEntry(value, remaining, disk_entry.stale_at - now, age=now - disk_entry.stored_at)
+        if shard.put(key, entry, KeyMeta(disk_entry.api_type, disk_entry.session_id, disk_entry.route)):
+            shard.counters['l2_promotions'] += 1
+        return entry
+
+    async def run_blocking(self, function: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Run a cache call that may wait on L2 I/O (a lookup, a write) off the event loop
+
+        With an L2 tier the call runs on a worker thread, so a Redis round
+        trip or SQLite write never stalls other requests. Without one, or in
+        lock-free mode (which must stay on the loop), it runs inline.
+        """
+        if self._l2 is None or self.lock_free:
+            return function(*args, **kwargs)
+        # Stale hits found on the worker thread schedule their refresh back on this loop
+        self._loop = asyncio.get_running_loop()
+        return await asyncio.to_thread(function, *args, **kwargs)
+
+    async def get_or_load(self, session_id: str, api_type: str, params: dict) -> Optional[CacheResult]:
+        """Look up a value, calling the registered loader on a miss (the caller waits)"""
+        result = await self.run_blocking(self.lookup, session_id, api_type, params)
+        if result or api_type not in self._loaders:
+            return result
+        value = await self._call_loader(self._loaders[api_type], params)
+        if value is None:
+            return None
+        negative = not self._is_cacheable(value)
+        if negative:
+            self.set_negative(session_id, api_type, params, value)
+        else:
+            await self.run_blocking(self.set, session_id, api_type, params, value)
+        return CacheResult(value, SHARED_TIER if self.is_shared(api_type) else SESSION_TIER, False, 0.0, negative)
+
+    def set(self, session_id: str, api_type: str, params: dict, value: Any, ttl: Optional[int] = None,
+            personalized: bool = False) -> None:
+        """Cache response with an explicit TTL or the API type's TTL policy
+
+        Shared API types go to the shared tier unless ``personalized`` is set,
+        in which case the value is stored in the session overlay only.
+        """
+        shared = self.is_shared(api_type) and not personalized
+        if not shared and self.is_shared(api_type):
+            self._overlay_sessions.add(session_id)
+        key = self._generate_key(session_id, api_type, params, shared=shared)
+        self._store(key, self._key_meta_for(session_id, api_type, params, shared), value, ttl, params)
+
+    def set_negative(self, session_id: str, api_type: str, params: dict, value: Any) -> bool:
+        """Cache an empty result or upstream error for its class's short TTL
+
+        Returns False (and caches nothing) if the value is usable data or its
+        class has no negative TTL configured. Negative entries stay in L1,
+        are never served stale and are counted apart from data hits.
+        """
+        kind = classify_negative(value)
+        ttl = self.negative_ttls.get(kind) if kind else None
+        if not ttl:
+            return False
+        shared = self.is_shared(api_type)
+        key = self._generate_key(session_id, api_type, params, shared=shared)
+        meta = self._key_meta_for(session_id, api_type, params, shared)
+        if self.serialize_values:
+            value = self._encode(value)
+        entry = CacheEntry(value, ttl, negative=True)
+        shard = self._l1.shard_for(key)
+        with shard.lock:
+            existing = shard.cache.get(key)
+            # A failed refresh must not replace data that can still be served
+            if existing is not None and not existing.negative:
+                return False
+            if not shard.put(key, entry, meta):
+                return False
+            shard.counters[f'negative_stores_{kind}'] += 1
+        return True
+
+    def _store(self, key: str, meta: KeyMeta, value: Any, ttl: Optional[int] = None,
+               params: Optional[dict] = None) -> None:
+        """Write an entry whose soft TTL is ``ttl`` and hard TTL adds the stale grace"""
+        api_type = meta.api_type
+        soft_ttl = ttl or self.ttl_for(api_type)
+        if not ttl and self.adaptive_ttl is not None:
+            soft_ttl = self.adaptive_ttl.ttl(key, api_type, params, value, soft_ttl)
+        hard_ttl = soft_ttl + self.stale_grace.get(api_type, 0)
+        if self.serialize_values:
+            value = self._encode(value)
+        shard = self._l1.shard_for(key)
+        # Size the value outside the lock; it is estimated once per write
+        entry = CacheEntry(value, hard_ttl, soft_ttl)
+        with shard.lock:
+            stored = shard.put(key, entry, meta)
+        if not stored:
+            logger.debug(f"Not caching {key} in memory: {entry.size} bytes exceeds the shard budget")
+        if self._l2 is not None:
+            try:
+                self._l2.set(key, api_type, value, hard_ttl, soft_ttl, meta.session_id, meta.route)
+            except Exception as e:
+                logger.warning(f"L2 cache write failed: {e}")
+                with self._lock:
+                    self._counters['l2_errors'] += 1
+
+    def _encode(self, value: Any) -> Any:
+        """Serialize a value for L1, keeping it live if it is not JSON-compatible"""
+        try:
+            return encode_value(value, self.compress_level)
+        except (TypeError, ValueError):
+            return value
+
+    @staticmethod
+    def _decode(value: Any, decode: bool) -> Any:
+        return value.decode() if decode and isinstance(value, EncodedValue) else value
+
+    @staticmethod
+    def _is_cacheable(value: Any) -> bool:
+        """Upstream errors and empty responses are never cached as data"""
+        return classify_negative(value) is None
+
+    @staticmethod
+    async def _call_loader(loader: Loader, params: dict) -> Any:
+        value = loader(params)
+        if inspect.isawaitable(value):
+            value = await value
+        return value
+
+    def _schedule_refresh(self, key: str, meta: KeyMeta, params: dict) -> None:
+        """Start one background refresh per stale key"""
         with self._lock:
-            keys_to_remove = [key for key in self._cache.keys() if key.startswith(f"{session_id}:")]
-            for key in keys_to_remove:
-                self._cache.pop(key, None)
-    
+            loader = self._loaders.get(meta.api_type)
+            if loader is None or key in self._refreshing:
+                return
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                loop = None
+            if loop is None and self.lock_free:
+                # A worker thread would break the single-loop assumption of lock-free mode
+                return
+            self._refreshing.add(key)
+        coro = self._refresh(key, meta, dict(params), loader)
+        if loop is None and self._loop is not None and self._loop.is_running():
+            # Called from run_blocking's worker thread: refresh on the request's event loop
+            asyncio.run_coroutine_threadsafe(coro, self._loop)
+        elif loop is None:
+            # No event loop in this thread (sync caller): refresh on a worker thread
+            threading.Thread(target=asyncio.run, args=(coro,), daemon=True).start()
+        else:
+            task = loop.create_task(coro)
+            self._refresh_tasks.add(task)
+            task.add_done_callback(self._refresh_tasks.discard)
+
+    async def _refresh(self, key: str, meta: KeyMeta, params: dict, loader: Loader) -> None:
+        outcome = 'refresh_failures'
+        try:
+            value = await self._call_loader(loader, params)
+            if self._is_cacheable(value):
+                await self.run_blocking(self._store, key, meta, value, params=params)
+                outcome = 'refreshes'
+        except Exception as e:
+            logger.warning(f"Background refresh failed for {meta.api_type}: {e}")
+        finally:
+            with self._lock:
+                self._counters[outcome] += 1
+                self._refreshing.discard(key)
+
+    def clear_session(self, session_id: str) -> int:
+        """Clear all cached data for a session (the shared tier is left intact)"""
+        self._overlay_sessions.discard(session_id)
+        return self._invalidate('session_id', session_id)
+
+    def invalidate_api_type(self, api_type: str) -> int:
+        """Drop every cached entry of an API type, in all sessions and the shared tier"""
+        return self._invalidate('api_type', api_type)
+
+    def invalidate_route(self, origin: str, destination: str) -> int:
+        """Drop every cached entry for a route (e.g. after a fare change on JFK-LAX)"""
+        route = route_key(origin, destination)
+        return self._invalidate('route', route) if route else 0
+
+    def _invalidate(self, field: str, value: str) -> int:
+        """Remove the keys listed under value in one secondary index, plus their L2 rows"""
+        removed = 0
+        for shard in self._l1.shards:
+            with shard.lock:
+                removed += shard.invalidate(field, value)
+        if self._l2 is not None:
+            try:
+                removed = max(removed, self._l2.delete_by(field, value))
+            except Exception as e:
+                logger.warning(f"L2 cache invalidation failed: {e}")
+                with self._lock:
+                    self._counters['l2_errors'] += 1
+        return removed
+
+    def purge_expired(self) -> int:
+        """Drop expired entries now and return how many were removed"""
+        removed = 0
+        for shard in self._l1.shards:
+            with shard.lock:
+                removed += shard.expire()
+        if self._l2 is not None:
+            try:
+                removed += self._l2.purge_expired()
+            except Exception as e:
+                logger.warning(f"L2 cache purge failed: {e}")
+                with self._lock:
+                    self._counters['l2_errors'] += 1
+        return removed
+
+    def snapshot(self, path: str, limit: int = DEFAULT_SNAPSHOT_LIMIT) -> int:
+        """Write the ``limit`` most-hit live entries to path; returns how many were written"""
+        now = time.monotonic()
+        candidates = []
+        for shard in self._l1.shards:
+            with shard.lock:
+                for key, entry in shard.peek():
+                    if not entry.negative:
+                        candidates.append((entry.hits, entry.stored_at, key, entry, shard.key_meta.get(key)))
+        hottest = heapq.nlargest(limit, candidates, key=lambda c: (c[0], c[1]))
+        entries = (
+            SnapshotEntry(key, meta.api_type, meta.session_id, meta.route, self._decode(entry.value, True),
+                          entry.stale_at - now, entry.stored_at + entry.ttl - now, now - entry.stored_at, hits)
+            for hits, _, key, entry, meta in hottest
+            if meta is not None and entry.stored_at + entry.ttl > now
+        )
+        written = write_snapshot(path, entries)
+        logger.info(f"Cache snapshot: wrote {written} entries to {path}")
+        return written
+
+    async def restore_snapshot(self, path: str, batch_size: int = 100) -> int:
+        """Load a snapshot into L1 in small batches, yielding to the event loop in between
+
+        File reads run on a worker thread. Keys already cached are left alone,
+        since whatever is in memory is at least as fresh as the snapshot.
+        """
+        entries = await asyncio.to_thread(lambda: list(read_snapshot(path)))
+        restored = 0
+        for start in range(0, len(entries), batch_size):
+            for snapshot_entry in entries[start:start + batch_size]:
+                restored += self._restore_entry(snapshot_entry)
+            await asyncio.sleep(0)
+        with self._lock:
+            self._counters['snapshot_restored'] += restored
+        logger.info(f"Cache snapshot: restored {restored} of {len(entries)} entries from {path}")
+        return restored
+
+    def _restore_entry(self, snapshot_entry: SnapshotEntry) -> bool:
+        value = self._encode(snapshot_entry.value) if self.serialize_values else snapshot_entry.value
+        entry = CacheEntry(value, snapshot_entry.hard_ttl, snapshot_entry.soft_ttl, age=snapshot_entry.age)
+        entry.hits = snapshot_entry.hits
+        meta = KeyMeta(snapshot_entry.api_type, snapshot_entry.session_id, snapshot_entry.route)
+        shard = self._l1.shard_for(snapshot_entry.key)
+        with shard.lock:
+            if snapshot_entry.key in shard.cache:
+                return False
+            return shard.put(snapshot_entry.key, entry, meta)
+
     def clear_all(self) -> None:
         """Clear all cached data"""
-        with self._lock:
-            self._cache.clear()
-    
+        self._overlay_sessions.clear()
+        for shard in self._l1.shards:
+            with shard.lock:
+                shard.clear()
+        if self._l2 is not None:
+            try:
+                self._l2.clear()
+            except Exception as e:
+                logger.warning(f"L2 cache clear failed: {e}")
+                with self._lock:
+                    self._counters['l2_errors'] += 1
+
     def get_stats(self) -> dict:
-        """Get cache statistics"""
+        """Get cache statistics, with hit rates reported per tier"""
+        shards = self._l1.shards
+        counters = Counter()
+        indexed = {field: set() for field in INDEX_FIELDS}
+        size = bytes_used = evictions = 0
+        for shard in shards:
+            with shard.lock:
+                counters.update(shard.counters)
+                for field, index in shard.indexes.items():
+                    indexed[field].update(index)
+                size += len(shard.cache)
+                bytes_used += shard.bytes_used()
+                evictions += shard.cache.evictions
         with self._lock:
-            return {
-                'size': len(self._cache),
-                'maxsize': self._cache.maxsize,
-                'ttl': self._cache.ttl
+            counters.update(self._counters)
+            in_flight = len(self._refreshing)
+        tiers = {}
+        for tier in (SHARED_TIER, SESSION_TIER):
+            hits, misses = counters[f'{tier}_hits'], counters[f'{tier}_misses']
+            lookups = hits + misses
+            tiers[tier] = {
+                'hits': hits,
+                'misses': misses,
+                'hit_rate': hits / lookups if lookups else 0.0,
+            }
+        return {
+            'size': size,
+            'maxsize': self._l1.maxsize if self._l1.max_bytes is None else None,
+            'memory': {
+                'bytes_used': bytes_used,
+                'max_bytes': self._l1.max_bytes,
+                'utilization': bytes_used / self._l1.max_bytes if self._l1.max_bytes else None,
+                'evictions': evictions,
+                'oversize_rejections': counters['oversize'],
+            },
+            'shards': len(shards),
+            'lock_free': self.lock_free,
+            'serialize_values': self.serialize_values,
+            'ttl': self.default_ttl,
+            'ttl_policies': dict(self.ttl_policies),
+            'stale_grace': dict(self.stale_grace),
+            'stale_while_revalidate': {
+                'stale_hits': counters['stale_hits'],
+                'refreshes': counters['refreshes'],
+                'refresh_failures': counters['refresh_failures'],
+                'in_flight': in_flight,
+            },
+            'negative': {
+                'hits': counters['negative_hits'],
+                'stores': {kind: counters[f'negative_stores_{kind}'] for kind in DEFAULT_NEGATIVE_TTLS},
+                'ttls': dict(self.negative_ttls),
+            },
+            'snapshot_restored': counters['snapshot_restored'],
+            'adaptive_ttl': dict(
+                self.adaptive_ttl.get_stats(),
+                saved_calls=counters['adaptive_saved_calls'],
+            ) if self.adaptive_ttl is not None else None,
+            'shared_api_types': sorted(self.shared_api_types),
+            'tiers': tiers,
+            'indexed': {field: len(values) for field, values in indexed.items()},
+            'l2': {
+                'hits': counters['l2_hits'],
+                'misses': counters['l2_misses'],
+                'promotions': counters['l2_promotions'],
+                'errors': counters['l2_errors'],
+                'enabled': self._l2 is not None,
+                'backend': type(self._l2).__name__ if self._l2 is not None else None,
+                'location': self._l2.location if self._l2 is not None else None,
+            },
+            'latency': {
+                tier: LatencyHistogram.merged(shard.latency[tier] for shard in shards).snapshot()
+                for tier in ('l1', 'l2')
             }
+        }
@@ -0,0 +1,84 @@
+"""
+Lightweight metrics for the cache layer
+"""
+import bisect
+import contextlib
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence
+
+# Bucket upper bounds in milliseconds, roughly log-spaced from sub-microsecond
+# in-memory hits up to slow disk or network round trips.
+DEFAULT_LATENCY_BUCKETS_MS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100)
+
+
+class LatencyHistogram:
+    """
+    Latency histogram with fixed, non-cumulative buckets
+
+    Thread-safe unless created with ``thread_safe=False`` (single event loop).
+    """
+
+    def __init__(self, buckets_ms: Sequence[float] = DEFAULT_LATENCY_BUCKETS_MS, thread_safe: bool = True):
+        self._bounds: List[float] = sorted(buckets_ms)
+        self._counts: List[int] = [0] * (len(self._bounds) + 1)  # last bucket is +Inf
+        self._sum_ms = 0.0
+        self._max_ms = 0.0
+        self._lock = threading.Lock() if thread_safe else contextlib.nullcontext()
+
+    @classmethod
+    def merged(cls, histograms: Iterable["LatencyHistogram"]) -> "LatencyHistogram":
+        """Combine histograms with identical buckets (e.g. one per cache shard)"""
+        histograms = list(histograms)
+        result = cls(histograms[0]._bounds if histograms else DEFAULT_LATENCY_BUCKETS_MS)
+        for histogram in histograms:
+            with histogram._lock:
+                result._counts = [a + b for a, b in zip(result._counts, histogram._counts)]
+                result._sum_ms += histogram._sum_ms
+                result._max_ms = max(result._max_ms, histogram._max_ms)
+        return result
+
+    def observe(self, seconds: float) -> None:
+        """Record one observation given in seconds"""
+        ms = seconds * 1000.0
+        index = bisect.bisect_left(self._bounds, ms)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum_ms += ms
+            if ms > self._max_ms:
+                self._max_ms = ms
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Approximate percentile (upper bound of the bucket holding it), in ms"""
+        with self._lock:
+            total = sum(self._counts)
+            if not total:
+                return None
+            rank = q * total
+            seen = 0
+            for index, count in enumerate(self._counts):
+                seen += count
+                if seen >= rank:
+                    return self._bounds[index] if index < len(self._bounds) else self._max_ms
+        return self._max_ms
+
+    def snapshot(self) -> Dict[str, object]:
+        """Counts per bucket plus summary figures, for get_stats"""
+        with self._lock:
+            total = sum(self._counts)
+            buckets = {f"le_{bound}ms": count for bound, count in zip(self._bounds, self._counts)}
+            buckets["le_inf"] = self._counts[-1]
+            summary = {
+                'count': total,
+                'avg_ms': self._sum_ms / total if total else 0.0,
+                'max_ms': self._max_ms,
+                'buckets': buckets,
+            }
+        summary['p50_ms'] = self.percentile(0.5)
+        summary['p99_ms'] = self.percentile(0.99)
+        return summary
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts = [0] * (len(self._bounds) + 1)
+            self._sum_ms = 0.0
+            self._max_ms = 0.0
@@ -0,0 +1,90 @@
+"""
+Cache snapshots: the hottest entries and their remaining TTLs, saved to a local file
+"""
+import json
+import logging
+import os
+import time
+from typing import Any, Iterable, Iterator, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+# Bump when the line format changes; snapshots with another version are ignored
+_SNAPSHOT_VERSION = 1
+
+
+class SnapshotEntry(NamedTuple):
+    """One cache entry; TTLs and age are relative to when it was written or read"""
+    key: str
+    api_type: str
+    session_id: Optional[str]
+    route: Optional[str]
+    value: Any
+    soft_ttl: float
+    hard_ttl: float
+    age: float
+    hits: int
+
+
+def write_snapshot(path: str, entries: Iterable[SnapshotEntry]) -> int:
+    """Atomically replace the snapshot at path; returns the number of entries written
+
+    The file is JSON lines: a header with the version and wall-clock write
+    time, then one entry per line. Values that are not JSON-serializable
+    are skipped.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    # Per-process temp file so workers sharing a path never interleave writes
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    written = 0
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"version": _SNAPSHOT_VERSION, "written_at": time.time()}) + "\n")
+            for entry in entries:
+                try:
+                    line = json.dumps(entry._asdict(), separators=(",", ":"))
+                except (TypeError, ValueError):
+                    continue
+                f.write(line + "\n")
+                written += 1
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return written
+
+
+def read_snapshot(path: str) -> Iterator[SnapshotEntry]:
+    """Yield entries still within their hard TTL, with TTLs shifted by the time elapsed
+
+    A missing, foreign-version or corrupt snapshot yields nothing (or stops
+    at the first bad line) rather than raising.
+    """
+    try:
+        f = open(path, encoding="utf-8")
+    except FileNotFoundError:
+        return
+    with f:
+        try:
+            header = json.loads(f.readline() or "{}")
+        except ValueError:
+            header = {}
+        if header.get("version") != _SNAPSHOT_VERSION:
+            logger.warning(f"Ignoring cache snapshot {path}: unsupported version {header.get('version')!r}")
+            return
+        elapsed = max(0.0, time.time() - header.get("written_at", 0.0))
+        for line in f:
+            try:
+                entry = SnapshotEntry(**json.loads(line))
+            except (TypeError, ValueError):
+                logger.warning(f"Stopping at corrupt line in cache snapshot {path}")
+                return
+            if entry.hard_ttl - elapsed <= 0:
+                continue
+            yield entry._replace(
+                soft_ttl=entry.soft_ttl - elapsed,
+                hard_ttl=entry.hard_ttl - elapsed,
+                age=entry.age + elapsed,
+            )
@@ -0,0 +1,261 @@
+"""
+Single-pass travel date parser: one compiled pattern for dates, ranges and relative phrases
+"""
+import calendar
+import datetime
+import re
+from typing import List, NamedTuple, Optional
+
+# Round trips without an explicit return date get this many days
+DEFAULT_TRIP_DAYS = 7
+
+_MONTHS = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12,
+}
+_WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+_NUMBER_WORDS = {"a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+                 "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10}
+
+_MONTH = (r"(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?"
+          r"|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)(?![a-z])\.?")
+_DAY = r"\d{1,2}(?:st|nd|rd|th)?"
+_YEAR = r"(?:,?\s*20\d{2}\b)"
+_TO = r"\s*(?:-|–|—|to|through|thru|until|till)\s*"
+_COUNT = r"(?:\d+|" + "|".join(_NUMBER_WORDS) + r")"
+
+# Alternatives are tried left to right at each position, and the leftmost
+# match in the message wins, so the first date mentioned is the one used
+_DATES = re.compile(
+    r"\b(?:"
+    # 2026-12-05 [to 2026-12-12]
+    r"(?P<iso>\d{4}-\d{2}-\d{2})(?:" + _TO + r"(?P<iso2>\d{4}-\d{2}-\d{2}))?"
+    # 12/5[/26] [to 12/12[/26]]
+    r"|(?P<num>\d{1,2}/\d{1,2}(?:/\d{2,4})?)(?:" + _TO + r"(?P<num2>\d{1,2}/\d{1,2}(?:/\d{2,4})?))?\b"
+    # dec 5th[, 2026] [to|- [dec] 12th[, 2026]], also "dec10-dec17"
+    r"|(?P<md_month>" + _MONTH + r")\s*(?P<md_day>" + _DAY + r")\b(?P<md_year>" + _YEAR + r")?"
+    r"(?:" + _TO + r"(?:(?P<md_month2>" + _MONTH + r")\s*)?(?P<md_day2>" + _DAY + r")\b(?P<md_year2>" + _YEAR + r")?)?"
+    # 5th[-10th] [of] december [to 12th [of] december]
+    r"|(?P<dm_day>" + _DAY + r")(?:" + _TO + r"(?P<dm_day_end>" + _DAY + r"))?\s+(?:of\s+)?(?P<dm_month>" + _MONTH + r")"
+    r"(?P<dm_year>" + _YEAR + r")?"
+    r"(?:" + _TO + r"(?P<dm_day2>" + _DAY + r")\s+(?:of\s+)?(?P<dm_month2>" + _MONTH + r")(?P<dm_year2>" + _YEAR + r")?)?"
+    # the 5th
+    r"|the\s+(?P<ordinal>\d{1,2})(?:st|nd|rd|th)\b"
+    # relative phrases
+    r"|(?P<relative>day after tomorrow|today|tonight|tomorrow|this weekend|next weekend|this week|next week"
+    r"|this month|next month)\b"
+    r"|in\s+(?P<count>" + _COUNT + r")\s+(?P<unit>day|week|month)s?\b"
+    r"|(?:(?P<weekday_mod>next|this|on)\s+)?(?P<weekday>" + "|".join(_WEEKDAYS) + r")\b"
+    # [in] december [2026]
+    r"|(?P<month_prefix>(?:in|during|for|early|mid|late)\s+)?(?P<month_only>" + _MONTH + r")(?P<month_year>" + _YEAR + r")?"
+    r")",
+    re.IGNORECASE,
+)
+
+# Words that can start or carry a date; a message with none of them and no
+# digit cannot contain one, so a caller's tokens let parse_dates skip the scan
+_DATE_WORDS = frozenset(
+    [name for month in calendar.month_name[1:] for name in (month.lower(), month.lower()[:3])]
+    + ["sept"] + _WEEKDAYS
+    + ["today", "tonight", "tomorrow", "day", "days", "week", "weeks", "weekend", "month", "months"]
+)
+
+# Day a bare month name stands for, by the word before it ("mid march" is the 15th)
+_PART_OF_MONTH = {"early": 1, "mid": 15, "late": 22}
+
+# "... for a week", "for 5 nights" right after a start date sets the return date
+_DURATION = re.compile(r"\s*,?\s*for\s+(?P<count>" + _COUNT + r")\s+(?P<unit>night|day|week)s?\b", re.IGNORECASE)
+
+
+class DateRange(NamedTuple):
+    """Travel dates found in a message; end is None when only one date was given"""
+    start: datetime.date
+    end: Optional[datetime.date] = None
+
+    def to_date_info(self, trip_days: int = DEFAULT_TRIP_DAYS) -> dict:
+        """The departure/return dict the flight data generator and dashboard use"""
+        end = self.end or self.start + datetime.timedelta(days=trip_days)
+        return {
+            'departure_date': self.start.isoformat(),
+            'return_date': end.isoformat(),
+            'departure_display': self.start.strftime("%b %d, %Y"),
+            'return_display': end.strftime("%b %d, %Y"),
+        }
+
+
+def _month(text: str) -> int:
+    return _MONTHS[text.lower()[:3]]
+
+
+def _day(text: str) -> int:
+    return int(text.rstrip("stndrdhSTNDRDH"))
+
+
+def _year(text: Optional[str]) -> Optional[int]:
+    digits = re.sub(r"\D", "", text or "")
+    return int(digits) if digits else None
+
+
+def _count(text: str) -> int:
+    return int(text) if text.isdigit() else _NUMBER_WORDS[text.lower()]
+
+
+def _add_months(day: datetime.date, months: int) -> datetime.date:
+    month = day.month - 1 + months
+    year, month = day.year + month // 12, month % 12 + 1
+    return day.replace(year=year, month=month, day=min(day.day, calendar.monthrange(year, month)[1]))
+
+
+def _on_or_after(month: int, day: int, year: Optional[int], today: datetime.date) -> datetime.date:
+    """A calendar date, rolled into next year when no year is given and it has passed"""
+    if year is not None:
+        return datetime.date(year, month, day)
+    # Feb 29 may be up to four years away; any other impossible day raises ValueError
+    for year in range(today.year, today.year + 5):
+        try:
+            candidate = datetime.date(year, month, day)
+        except ValueError:
+            continue
+        if candidate >= today:
+            return candidate
+    raise ValueError(f"no such date: {month}/{day}")
+
+
+def _after(start: datetime.date, month: int, day: int, year: Optional[int]) -> datetime.date:
+    """The end of a range: the first such date on or after its start ("dec 28 - jan 3")"""
+    if year is not None:
+        return datetime.date(year, month, day)
+    return _on_or_after(month, day, None, start)
+
+
+def _numeric(text: str, today: datetime.date) -> datetime.date:
+    parts = [int(part) for part in text.split("/")]
+    year = parts[2] if len(parts) == 3 else None
+    if year is not None and year < 100:
+        year += 2000
+    return _on_or_after(parts[0], parts[1], year, today)
+
+
+def _relative(match: "re.Match[str]", today: datetime.date) -> Optional[DateRange]:
+    phrase = (match.group("relative") or "").lower()
+    if phrase in ("today", "tonight"):
+        return DateRange(today)
+    if phrase == "tomorrow":
+        return DateRange(today + datetime.timedelta(days=1))
+    if phrase == "day after tomorrow":
+        return DateRange(today + datetime.timedelta(days=2))
+    if phrase.endswith("weekend"):
+        saturday = today + datetime.timedelta(days=(5 - today.weekday()) % 7)
+        if phrase.startswith("next"):
+            saturday += datetime.timedelta(days=7)
+        return DateRange(saturday, saturday + datetime.timedelta(days=1))
+    if phrase == "this week":
+        return DateRange(today + datetime.timedelta(days=3))
+    if phrase == "next week":
+        return DateRange(today + datetime.timedelta(weeks=1))
+    if phrase == "this month":
+        return DateRange(max(today, today.replace(day=15)))
+    if phrase == "next month":
+        return DateRange(_add_months(today, 1))
+    if match.group("count"):
+        count, unit = _count(match.group("count")), match.group("unit").lower()
+        if unit == "month":
+            return DateRange(_add_months(today, count))
+        return DateRange(today + datetime.timedelta(days=count * (7 if unit == "week" else 1)))
+    if match.group("weekday"):
+        ahead = (_WEEKDAYS.index(match.group("weekday").lower()) - today.weekday()) % 7
+        if ahead == 0 and (match.group("weekday_mod") or "").lower() == "next":
+            ahead = 7
+        return DateRange(today + datetime.timedelta(days=ahead))
+    return None
+
+
+def _to_range(match: "re.Match[str]", message: str, today: datetime.date) -> Optional[DateRange]:
+    group = match.group
+    if group("iso"):
+        start = datetime.date.fromisoformat(group("iso"))
+        return DateRange(start, datetime.date.fromisoformat(group("iso2")) if group("iso2") else None)
+    if group("num"):
+        start = _numeric(group("num"), today)
+        if group("num2"):
+            parts = [int(part) for part in group("num2").split("/")]
+            return DateRange(start, _after(start, parts[0], parts[1], None))
+        return DateRange(start)
+    if group("md_month"):
+        start = _on_or_after(_month(group("md_month")), _day(group("md_day")), _year(group("md_year")), today)
+        if group("md_day2"):
+            month = _month(group("md_month2")) if group("md_month2") else start.month
+            return DateRange(start, _after(start, month, _day(group("md_day2")), _year(group("md_year2"))))
+        return DateRange(start)
+    if group("dm_month"):
+        month = _month(group("dm_month"))
+        start = _on_or_after(month, _day(group("dm_day")), _year(group("dm_year")), today)
+        if group("dm_day_end"):
+            return DateRange(start, _after(start, month, _day(group("dm_day_end")), None))
+        if group("dm_day2"):
+            return DateRange(start, _after(start, _month(group("dm_month2")), _day(group("dm_day2")),
+                                           _year(group("dm_year2"))))
+        return DateRange(start)
+    if group("ordinal"):
+        day = int(group("ordinal"))
+        start = today.replace(day=min(day, calendar.monthrange(today.year, today.month)[1]))
+        if start < today:
+            following = _add_months(today.replace(day=1), 1)
+            start = following.replace(day=min(day, calendar.monthrange(following.year, following.month)[1]))
+        return DateRange(start)
+    if group("month_only"):
+        year = _year(group("month_year"))
+        # A bare month name is only a date when it is the whole text, has a
+        # year, or follows "in"/"during"/...: "I may travel" is not May
+        if not (group("month_prefix") or year or match.group(0).strip() == message.strip()):
+            return None
+        month = _month(group("month_only"))
+        day = _PART_OF_MONTH.get((group("month_prefix") or "").strip().lower(), 1)
+        if year is None and month == today.month and today.day >= day:
+            return DateRange(today)
+        return DateRange(_on_or_after(month, day, year, today))
+    return _relative(match, today)
+
+
+def parse_dates(message: str, today: Optional[datetime.date] = None,
+                words: Optional[List[str]] = None) -> Optional[DateRange]:
+    """
+    Travel dates in a message, or None
+
+    A single scan with one compiled pattern that stops at the first date
+    mentioned: ISO and M/D[/Y] dates, month names with ordinals ("dec 5th",
+    "5th of december"), ranges ("dec 10-17", "dec 28 - jan 3"), relative
+    phrases ("tomorrow", "next friday", "this weekend", "in 2 weeks") and a
+    trailing duration ("for a week"). Dates without a year that have already
+    passed this year roll over to next year.
+
+    ``words`` are the message's lowercased word tokens, if the caller has
+    them: a message with no digit and no date word is rejected without
+    running the pattern.
+    """
+    if not message:
+        return None
+    if words is not None and _DATE_WORDS.isdisjoint(words) and not any(char.isdigit() for char in message):
+        return None
+    today = today or datetime.date.today()
+    for match in _DATES.finditer(message):
+        try:
+            found = _to_range(match, message, today)
+        except (ValueError, KeyError):
+            # Impossible dates such as "2/30" or "13/5"
+            continue
+        if found is None:
+            continue
+        if found.end is None:
+            duration = _DURATION.match(message, match.end())
+            if duration:
+                count, unit = _count(duration.group("count")), duration.group("unit").lower()
+                found = found._replace(end=found.start + datetime.timedelta(days=count * (7 if unit == "week" else 1)))
+        return found
+    return None
+
+
+def parse_date(text: str, today: Optional[datetime.date] = None) -> Optional[str]:
+    """First date in text as YYYY-MM-DD, or None"""
+    found = parse_dates(text, today)
+    return found.start.isoformat() if found else None
@@ -0,0 +1,140 @@
+"""
+On-disk L2 cache tier backed by SQLite, shared by all workers on a host
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Optional
+from .cache_backend import INDEXED_FIELDS, BackendEntry, CacheBackend
+from .cache_codec import EncodedValue
+
+logger = logging.getLogger(__name__)
+
+# Bump when the table layout changes; older cache files are simply rebuilt
+_SCHEMA_VERSION = 2
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    api_type TEXT NOT NULL,
+    session_id TEXT,
+    route TEXT,
+    value TEXT NOT NULL,
+    stored_at REAL NOT NULL,
+    stale_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+)
+"""
+
+# Kept for callers that predate the backend interface
+DiskEntry = BackendEntry
+
+
+class SQLiteCacheTier(CacheBackend):
+    """
+    Persistent cache tier in a single SQLite file using WAL mode
+
+    WAL lets every uvicorn worker on the host read concurrently while one
+    writes, and the file survives restarts. Each thread gets its own
+    connection. Expiry uses wall-clock time so entries stay valid across
+    processes.
+    """
+
+    def __init__(self, path: str, busy_timeout_ms: int = 2000):
+        self.path = path
+        self.location = path
+        self.busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        if conn.execute("PRAGMA user_version").fetchone()[0] != _SCHEMA_VERSION:
+            conn.execute("DROP TABLE IF EXISTS cache")
+            conn.execute(f"PRAGMA user_version={_SCHEMA_VERSION}")
+        conn.execute(_SCHEMA)
+        conn.execute("CREATE INDEX IF NOT EXISTS cache_expires_at ON cache (expires_at)")
+        for field in INDEXED_FIELDS:
+            conn.execute(f"CREATE INDEX IF NOT EXISTS cache_{field} ON cache ({field})")
+        conn.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000.0)
+            conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+            # WAL + NORMAL is durable across application crashes, which is all a cache needs
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[BackendEntry]:
+        """Return the entry for a key, or None if missing or past its hard expiry"""
+        row = self._connection().execute(
+            "SELECT value, stored_at, stale_at, expires_at, api_type, session_id, route "
+            "FROM cache WHERE key = ? AND expires_at > ?",
+            (key, time.time()),
+        ).fetchone()
+        if row is None:
+            return None
+        try:
+            return BackendEntry(json.loads(row[0]), *row[1:])
+        except ValueError:
+            logger.warning(f"Dropping undecodable L2 cache entry {key}")
+            self.delete(key)
+            return None
+
+    def set(self, key: str, api_type: str, value: Any, ttl: float, soft_ttl: Optional[float] = None,
+            session_id: Optional[str] = None, route: Optional[str] = None) -> bool:
+        """Write an entry; returns False if the value is not JSON-serializable"""
+        try:
+            if isinstance(value, EncodedValue):
+                payload = value.json_bytes().decode("utf-8")
+            else:
+                payload = json.dumps(value, separators=(",", ":"))
+        except (TypeError, ValueError):
+            logger.debug(f"Skipping L2 write for {key}: value is not JSON-serializable")
+            return False
+        now = time.time()
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (key, api_type, session_id, route, value, stored_at, stale_at, expires_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (key, api_type, session_id, route, payload,
+             now, now + (ttl if soft_ttl is None else soft_ttl), now + ttl),
+        )
+        conn.commit()
+        return True
+
+    def delete(self, key: str) -> None:
+        conn = self._connection()
+        conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+        conn.commit()
+
+    def delete_by(self, field: str, value: str) -> int:
+        """Delete every entry whose session_id, api_type or route equals value"""
+        if field not in INDEXED_FIELDS:
+            raise ValueError(f"Cannot invalidate by {field!r}; expected one of {INDEXED_FIELDS}")
+        conn = self._connection()
+        cursor = conn.execute(f"DELETE FROM cache WHERE {field} = ?", (value,))
+        conn.commit()
+        return cursor.rowcount
+
+    def purge_expired(self) -> int:
+        conn = self._connection()
+        cursor = conn.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+        conn.commit()
+        return cursor.rowcount
+
+    def clear(self) -> None:
+        conn = self._connection()
+        conn.execute("DELETE FROM cache")
+        conn.commit()
+
+    def __len__(self) -> int:
+        return self._connection().execute(
+            "SELECT COUNT(*) FROM cache WHERE expires_at > ?", (time.time(),)
+        ).fetchone()[0]
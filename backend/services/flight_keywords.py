@@ -0,0 +1,104 @@
+"""
+Weighted word-boundary keyword matcher deciding whether a message asks for flights
+"""
+import threading
+from collections import Counter
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Tuple
+from .gazetteer import tokenize
+from .route_parser import ParsedRoute, parse_route
+
+# Term -> weight; a message is a flight request once its distinct terms and
+# place mentions add up to FLIGHT_THRESHOLD
+DEFAULT_WEIGHTS: Dict[str, float] = {
+    # Unmistakably about flying
+    **dict.fromkeys([
+        "flight", "flights", "fly", "flying", "airline", "airlines", "airfare", "airfares",
+        "plane", "plane ticket", "plane tickets", "airline tickets", "nonstop", "non-stop",
+        "direct flight", "round trip", "round-trip", "one way", "one-way", "layover",
+        "departure", "departing", "airport", "boarding",
+    ], 1.0),
+    # Travel planning
+    **dict.fromkeys([
+        "ticket", "tickets", "fare", "fares", "book", "booking", "trip", "travel", "journey",
+        "vacation", "holiday", "getaway", "destination", "itinerary",
+    ], 0.5),
+    # Price shopping
+    **dict.fromkeys([
+        "cheap", "cheaper", "cheapest", "price", "prices", "cost", "budget", "affordable", "deal", "deals",
+    ], 0.3),
+    # Route and timing words: only meaningful next to other signals
+    **dict.fromkeys([
+        "to", "from", "between", "via", "return", "leaving",
+        "today", "tomorrow", "tonight", "next week", "this weekend", "next month",
+    ], 0.2),
+}
+# Each end of the route found in the message (origin, destination) adds this
+PLACE_WEIGHT = 0.5
+FLIGHT_THRESHOLD = 1.0
+
+
+class KeywordMatch(NamedTuple):
+    score: float
+    terms: FrozenSet[str]
+    places: int
+    is_flight: bool
+
+
+class FlightKeywordMatcher:
+    """
+    Scores a message for flight intent in one pass over its word tokens
+
+    Terms are stored as word tuples ("round-trip" and "round trip" are both
+    ("round", "trip")) and matched at each token longest first, so "plane
+    tickets" wins over "plane"; whole-word tokens keep "to" from matching
+    inside "tomorrow" and "way" inside "always". Each distinct term counts
+    once, plus a weight per route end, so "Boston to Denver tomorrow"
+    qualifies while "what's today's date?" does not. Callers that already
+    tokenized the message (ParsedQuery) pass their tokens.
+    """
+
+    def __init__(self, weights: Dict[str, float] = DEFAULT_WEIGHTS, threshold: float = FLIGHT_THRESHOLD):
+        self.weights: Dict[str, float] = {}
+        for term, weight in weights.items():
+            self.weights[" ".join(tokenize(term)[1])] = weight
+        self.threshold = threshold
+        self._phrases: Dict[Tuple[str, ...], str] = {tuple(term.split()): term for term in self.weights}
+        self._max_words = max((len(phrase) for phrase in self._phrases), default=0)
+        self._lock = threading.Lock()
+        self._counters: Counter = Counter()
+
+    def _terms(self, words: List[str]) -> FrozenSet[str]:
+        found = set()
+        i = 0
+        while i < len(words):
+            for length in range(min(self._max_words, len(words) - i), 0, -1):
+                term = self._phrases.get(tuple(words[i:i + length]))
+                if term is not None:
+                    found.add(term)
+                    i += length
+                    break
+            else:
+                i += 1
+        return frozenset(found)
+
+    def match(self, message: str, route: Optional[ParsedRoute] = None,
+              tokens: Optional[Tuple[List[str], List[str]]] = None) -> KeywordMatch:
+        """Score a message; pass its tokenize() output and parsed route if the caller already has them"""
+        tokens = tokens or tokenize(message or "")
+        terms = self._terms(tokens[1])
+        if route is None:
+            route = parse_route(message or "", tokens)
+        places = (route.origin_code is not None) + (route.destination_code is not None)
+        score = round(sum(self.weights[term] for term in terms) + places * PLACE_WEIGHT, 2)
+        result = KeywordMatch(score, terms, places, score >= self.threshold)
+        with self._lock:
+            self._counters['flight' if result.is_flight else 'general'] += 1
+        return result
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                'flight': self._counters['flight'],
+                'general': self._counters['general'],
+                'threshold': self.threshold,
+            }
@@ -0,0 +1,172 @@
+"""
+Answers refined flight searches from cached, less filtered results
+"""
+import itertools
+import logging
+import threading
+from collections import Counter, OrderedDict
+from typing import Any, Dict, Iterator, Optional
+from .cache_codec import decode_value
+from .cache_keys import flag, price
+from .cache_manager import CacheManager, CacheResult
+
+logger = logging.getLogger(__name__)
+
+FLIGHT_API_TYPE = "flight_search"
+
+# Amadeus flight-offers returns at most this many offers (its default `max`),
+# cheapest first; a result this long may have been cut off.
+UPSTREAM_RESULT_LIMIT = 250
+
+# Params that narrow a search without changing which flights exist
+REFINEMENT_PARAMS = ("max_price", "non_stop")
+
+# Price caps remembered per base search (most recent searches, most recent caps)
+MAX_TRACKED_SEARCHES = 4096
+MAX_CAPS_PER_SEARCH = 8
+
+
+def _offer_price(offer: dict) -> Optional[float]:
+    try:
+        return float(offer.get("price"))
+    except (TypeError, ValueError):
+        return None
+
+
+def _is_nonstop(offer: dict) -> bool:
+    itineraries = offer.get("itineraries") or []
+    return bool(itineraries) and all(len(itinerary.get("segments") or []) == 1 for itinerary in itineraries)
+
+
+def _within(offer_price: Optional[float], cap: float) -> bool:
+    return offer_price is not None and offer_price <= cap
+
+
+def _max_price_covered(superset: dict, cap: float, truncated: bool) -> bool:
+    # Offers are sorted by price, so a cut-off list still holds every offer
+    # up to its most expensive one
+    if not truncated:
+        return True
+    prices = [p for p in map(_offer_price, superset.get("flights", [])) if p is not None]
+    return bool(prices) and cap <= max(prices)
+
+
+class FlightQueryPlanner:
+    """
+    Query planner in front of the flight_search cache
+
+    A flight search can be narrowed by refinement params (``max_price``,
+    ``non_stop``). On a cache miss the planner looks for a cached result of
+    the same search with looser refinements, i.e. a superset: a higher
+    price cap, no cap, or without ``non_stop``. It filters that locally
+    instead of calling upstream again. Cache keys are digests, so the
+    planner remembers which caps it has looked up for each base search and
+    probes those. Supersets that may have been truncated upstream are only
+    used when they provably contain every matching offer.
+
+    Other API types pass straight through to ``CacheManager.lookup``.
+    """
+
+    def __init__(self, cache: CacheManager):
+        self.cache = cache
+        self.counters: Counter = Counter()
+        self._lock = threading.Lock()
+        # base search digest -> price caps looked up for it, oldest first
+        self._caps: OrderedDict = OrderedDict()
+
+    def lookup(self, session_id: str, api_type: str, params: dict, decode: bool = True) -> Optional[CacheResult]:
+        if api_type != FLIGHT_API_TYPE:
+            return self.cache.lookup(session_id, api_type, params, decode=decode)
+        refinements = self._refinements(params)
+        base = {k: v for k, v in params.items() if k not in REFINEMENT_PARAMS}
+        base_digest = self.cache.key_builder.digest(api_type, base)
+        # Probes are uncounted; the request is recorded once as a hit or a miss
+        result = self.cache.lookup(session_id, api_type, params, decode=decode, count=False)
+        if result is None and refinements:
+            result = self._derive(session_id, api_type, base, base_digest, refinements)
+        if "max_price" in refinements:
+            # A miss is normally cached under these params next, so later searches can use it
+            self._remember_cap(base_digest, refinements["max_price"])
+        self.cache.record_lookup(session_id, api_type, params, result)
+        return result
+
+    def _derive(self, session_id: str, api_type: str, base: dict, base_digest: str,
+                refinements: Dict[str, Any]) -> Optional[CacheResult]:
+        """Answer a flight search by filtering a cached superset, or None"""
+        for looser in self._supersets(base_digest, refinements):
+            superset = self.cache.lookup(session_id, api_type, {**base, **looser}, count=False)
+            if superset is None or superset.negative:
+                continue
+            filtered = self._filter(decode_value(superset.value), refinements)
+            if filtered is None:
+                continue
+            self.counters['derived_hits'] += 1
+            logger.info(f"Answered flight search from cached superset {looser or 'without refinements'}")
+            return superset._replace(value=filtered)
+        self.counters['superset_misses'] += 1
+        return None
+
+    def _supersets(self, base_digest: str, refinements: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """Looser refinement params to try, closest first (the requested ones excluded)"""
+        non_stop_options = [{"non_stop": True}, {}] if "non_stop" in refinements else [{}]
+        cap = refinements.get("max_price")
+        if cap is None:
+            cap_options = [{}]
+        else:
+            with self._lock:
+                known = sorted(known_cap for known_cap in self._caps.get(base_digest, ()) if known_cap > cap)
+            cap_options = [{"max_price": cap}] + [{"max_price": known_cap} for known_cap in known] + [{}]
+        for non_stop, max_price in itertools.product(non_stop_options, cap_options):
+            looser = {**non_stop, **max_price}
+            if self._refinements(looser) != refinements:
+                yield looser
+
+    def _remember_cap(self, base_digest: str, cap: float) -> None:
+        with self._lock:
+            caps = self._caps.pop(base_digest, {})
+            caps.pop(cap, None)
+            caps[cap] = None
+            while len(caps) > MAX_CAPS_PER_SEARCH:
+                del caps[next(iter(caps))]
+            self._caps[base_digest] = caps
+            while len(self._caps) > MAX_TRACKED_SEARCHES:
+                self._caps.popitem(last=False)
+
+    def _refinements(self, params: dict) -> Dict[str, Any]:
+        """Active refinement params, normalized; unparseable ones are ignored"""
+        active = {}
+        raw = params.get("max_price")
+        if raw not in (None, ""):
+            try:
+                active["max_price"] = price(raw)
+            except (TypeError, ValueError):
+                pass
+        if flag(params.get("non_stop", False)):
+            active["non_stop"] = True
+        return active
+
+    def _filter(self, superset: Any, refinements: Dict[str, Any]) -> Optional[dict]:
+        """Apply refinements to a superset, or None if it cannot be trusted to be complete"""
+        if not isinstance(superset, dict) or not isinstance(superset.get("flights"), list):
+            return None
+        offers = superset["flights"]
+        truncated = len(offers) >= UPSTREAM_RESULT_LIMIT
+        if "non_stop" in refinements:
+            if truncated:
+                return None
+            offers = [offer for offer in offers if _is_nonstop(offer)]
+        if "max_price" in refinements:
+            cap = refinements["max_price"]
+            if not _max_price_covered(superset, cap, truncated):
+                return None
+            offers = [offer for offer in offers if _within(_offer_price(offer), cap)]
+        return {**superset, "flights": offers, "count": len(offers)}
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            tracked = len(self._caps)
+        return {
+            'derived_hits': self.counters['derived_hits'],
+            'superset_misses': self.counters['superset_misses'],
+            'tracked_searches': tracked,
+        }
@@ -0,0 +1,141 @@
+"""
+Fuzzy place-name lookup: trigram inverted index over the gazetteer, ranked by edit distance
+"""
+import threading
+from collections import Counter
+from typing import Dict, List, NamedTuple, Optional, Set
+from cachetools import LRUCache
+from .gazetteer import GAZETTEER, Gazetteer, Place, fold
+
+# Names shorter than this are too easy to confuse ("home" is one letter from "rome")
+MIN_QUERY_LENGTH = 5
+# Lowest similarity (1 - edit distance / longer length) accepted as a match
+MIN_SCORE = 0.8
+# Candidates taken from the trigram index before computing edit distances
+PREFILTER_LIMIT = 24
+
+
+class FuzzyMatch(NamedTuple):
+    place: Place
+    alias: str
+    score: float
+
+
+def _normalize(name: str) -> str:
+    return " ".join(fold(name).lower().replace("-", " ").replace(".", " ").split())
+
+
+def _trigrams(text: str) -> Set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """
+    Levenshtein distance with adjacent transpositions ("barcleona")
+
+    Only the diagonal band of width ``2 * limit + 1`` is computed; returns
+    limit + 1 as soon as the distance is known to exceed limit.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    over = limit + 1
+    previous2: List[int] = []
+    previous = [j if j <= limit else over for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        ca = a[i - 1]
+        current = [over] * (len(b) + 1)
+        current[0] = i if i <= limit else over
+        low, high = max(1, i - limit), min(len(b), i + limit)
+        for j in range(low, high + 1):
+            cb = b[j - 1]
+            best = previous[j - 1] + (ca != cb)
+            if previous[j] + 1 < best:
+                best = previous[j] + 1
+            if current[j - 1] + 1 < best:
+                best = current[j - 1] + 1
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb and previous2[j - 2] + 1 < best:
+                best = previous2[j - 2] + 1
+            current[j] = best if best <= limit else over
+        if min(current[low - 1:high + 1]) > limit:
+            return over
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+class FuzzyPlaceIndex:
+    """
+    Resolves misspelled place names ("barcelonna", "san fransisco") offline
+
+    Every unambiguous alias of at least ``MIN_QUERY_LENGTH`` characters is
+    indexed by its character trigrams. A query collects the aliases sharing
+    the most trigrams with it, then ranks that short list by edit distance.
+    Aliases sharing too few trigrams to be within the allowed distance are
+    skipped outright, so a lookup costs a few posting-list scans and a
+    handful of banded distance computations whatever the table size.
+    """
+
+    def __init__(self, gazetteer: Gazetteer = GAZETTEER, min_score: float = MIN_SCORE,
+                 memo_size: int = 4096):
+        self.min_score = min_score
+        # Normalized query -> ranked matches; chat messages repeat the same typos
+        self._memo: LRUCache = LRUCache(maxsize=memo_size)
+        self._lock = threading.Lock()
+        self._aliases: List[str] = []
+        self._places: List[Place] = []
+        self._postings: Dict[str, List[int]] = {}
+        for alias, place, ambiguous in gazetteer.entries():
+            if ambiguous or len(alias) < MIN_QUERY_LENGTH:
+                continue
+            index = len(self._aliases)
+            self._aliases.append(alias)
+            self._places.append(place)
+            for gram in _trigrams(alias):
+                self._postings.setdefault(gram, []).append(index)
+
+    def __len__(self) -> int:
+        return len(self._aliases)
+
+    def candidates(self, name: str, limit: int = 5) -> List[FuzzyMatch]:
+        """Best-matching places for name, most similar first"""
+        query = _normalize(name)
+        if len(query) < MIN_QUERY_LENGTH:
+            return []
+        with self._lock:
+            matches = self._memo.get(query)
+        if matches is None:
+            matches = self._rank(query)
+            with self._lock:
+                self._memo[query] = matches
+        return matches[:limit]
+
+    def _rank(self, query: str) -> List[FuzzyMatch]:
+        grams = _trigrams(query)
+        # One edit changes at most three trigrams, so a close alias shares at
+        # least this many with the query
+        max_edits = int(len(query) * (1 - self.min_score) / self.min_score + 1e-9)
+        min_shared = len(grams) - 3 * max_edits
+        shared: Counter = Counter()
+        for gram in grams:
+            for index in self._postings.get(gram, ()):
+                shared[index] += 1
+        matches = []
+        for index, count in shared.most_common(PREFILTER_LIMIT):
+            if count < min_shared:
+                break
+            alias = self._aliases[index]
+            longest = max(len(alias), len(query))
+            max_distance = int(longest * (1 - self.min_score) + 1e-9)
+            distance = edit_distance(query, alias, max_distance)
+            if distance <= max_distance:
+                matches.append(FuzzyMatch(self._places[index], alias, round(1 - distance / longest, 3)))
+        matches.sort(key=lambda match: -match.score)
+        return matches
+
+    def best(self, name: str) -> Optional[FuzzyMatch]:
+        """The closest place for name, or None if nothing is close enough"""
+        matches = self.candidates(name, limit=1)
+        return matches[0] if matches else None
+
+
+FUZZY_PLACES = FuzzyPlaceIndex()
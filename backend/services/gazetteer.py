@@ -0,0 +1,320 @@
+"""
+Unified gazetteer of city, airport and alias names, matched with a token trie
+"""
+import re
+import unicodedata
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+
+class Place(NamedTuple):
+    """A searchable place: IATA city or airport code, display name and main airport"""
+    code: str
+    name: str
+    airport: str
+
+
+class Mention(NamedTuple):
+    """A place found in a text, spanning tokens [start, end)"""
+    place: Place
+    alias: str
+    start: int
+    end: int
+    ambiguous: bool
+
+
+# (code, display name, aliases, main airport if different from code); aliases
+# are lowercase, ASCII and may span several words. Codes are the ones searches
+# are made with (metro codes such as PAR cover every airport of the city), the
+# main airport is what the dashboard shows for a route.
+PLACE_TABLE: List[Tuple[str, str, Tuple[str, ...], Optional[str]]] = [
+    # Major cities
+    ("PAR", "Paris", ("paris",), "CDG"),
+    ("TYO", "Tokyo", ("tokyo",), "NRT"),
+    ("LON", "London", ("london",), "LHR"),
+    ("NYC", "New York", ("new york", "new york city", "nyc", "newyork"), "JFK"),
+    ("DCA", "Washington DC", ("washington dc", "washington", "dc"), None),
+    ("CMH", "Columbus", ("columbus", "ohio"), None),
+    ("CLE", "Cleveland", ("cleveland",), None),
+    ("CVG", "Cincinnati", ("cincinnati",), None),
+    ("LAX", "Los Angeles", ("los angeles", "la"), None),
+    ("CHI", "Chicago", ("chicago",), "ORD"),
+    ("MIA", "Miami", ("miami",), None),
+    ("BOS", "Boston", ("boston",), None),
+    ("SFO", "San Francisco", ("san francisco", "san fran", "sf"), None),
+    ("SEA", "Seattle", ("seattle",), None),
+    ("YYZ", "Toronto", ("toronto",), None),
+    ("YVR", "Vancouver", ("vancouver",), None),
+    ("YUL", "Montreal", ("montreal",), None),
+
+    # Airports of the cities above
+    ("CDG", "Paris", ("cdg", "charles de gaulle"), None),
+    ("NRT", "Tokyo", ("nrt", "narita"), None),
+    ("LHR", "London", ("lhr", "heathrow"), None),
+    ("JFK", "New York", ("jfk",), None),
+    ("LGA", "New York", ("lga", "laguardia", "la guardia"), None),
+    ("ORD", "Chicago", ("ord", "ohare", "o hare"), None),
+
+    # European cities
+    ("BER", "Berlin", ("berlin",), None),
+    ("MUC", "Munich", ("munich",), None),
+    ("FRA", "Frankfurt", ("frankfurt",), None),
+    ("FCO", "Rome", ("rome",), None),
+    ("MXP", "Milan", ("milan",), None),
+    ("MAD", "Madrid", ("madrid",), None),
+    ("BCN", "Barcelona", ("barcelona",), None),
+    ("AMS", "Amsterdam", ("amsterdam",), None),
+    ("BRU", "Brussels", ("brussels",), None),
+    ("ZUR", "Zurich", ("zurich",), None),
+    ("VIE", "Vienna", ("vienna",), None),
+    ("PRG", "Prague", ("prague",), None),
+    ("WAW", "Warsaw", ("warsaw",), None),
+    ("SVO", "Moscow", ("moscow",), None),
+    ("IST", "Istanbul", ("istanbul",), None),
+    ("ATH", "Athens", ("athens",), None),
+    ("LIS", "Lisbon", ("lisbon",), None),
+    ("DUB", "Dublin", ("dublin",), None),
+    ("CPH", "Copenhagen", ("copenhagen",), None),
+    ("ARN", "Stockholm", ("stockholm",), None),
+    ("OSL", "Oslo", ("oslo",), None),
+    ("HEL", "Helsinki", ("helsinki",), None),
+
+    # Asian cities
+    ("PEK", "Beijing", ("beijing",), None),
+    ("PVG", "Shanghai", ("shanghai",), None),
+    ("HKG", "Hong Kong", ("hong kong",), None),
+    ("SIN", "Singapore", ("singapore",), None),
+    ("BKK", "Bangkok", ("bangkok",), None),
+    ("KUL", "Kuala Lumpur", ("kuala lumpur",), None),
+    ("CGK", "Jakarta", ("jakarta",), None),
+    ("MNL", "Manila", ("manila",), None),
+    ("ICN", "Seoul", ("seoul",), None),
+    ("PUS", "Busan", ("busan",), None),
+    ("TPE", "Taipei", ("taipei",), None),
+    ("BOM", "Mumbai", ("mumbai",), None),
+    ("DEL", "Delhi", ("delhi", "new delhi"), None),
+    ("BLR", "Bangalore", ("bangalore",), None),
+    ("MAA", "Chennai", ("chennai",), None),
+    ("CCU", "Kolkata", ("kolkata",), None),
+    ("HYD", "Hyderabad", ("hyderabad",), None),
+    ("PNQ", "Pune", ("pune",), None),
+    ("AMD", "Ahmedabad", ("ahmedabad",), None),
+    ("COK", "Kochi", ("kochi",), None),
+    ("GOI", "Goa", ("goa",), None),
+
+    # Middle East & Africa
+    ("DXB", "Dubai", ("dubai",), None),
+    ("AUH", "Abu Dhabi", ("abu dhabi",), None),
+    ("DOH", "Doha", ("doha",), None),
+    ("RUH", "Riyadh", ("riyadh",), None),
+    ("JED", "Jeddah", ("jeddah",), None),
+    ("CAI", "Cairo", ("cairo",), None),
+    ("CMN", "Casablanca", ("casablanca",), None),
+    ("JNB", "Johannesburg", ("johannesburg",), None),
+    ("CPT", "Cape Town", ("cape town",), None),
+    ("NBO", "Nairobi", ("nairobi",), None),
+    ("LOS", "Lagos", ("lagos",), None),
+    ("ACC", "Accra", ("accra",), None),
+
+    # South America
+    ("GRU", "Sao Paulo", ("sao paulo",), None),
+    ("GIG", "Rio de Janeiro", ("rio de janeiro", "rio"), None),
+    ("EZE", "Buenos Aires", ("buenos aires",), None),
+    ("SCL", "Santiago", ("santiago",), None),
+    ("LIM", "Lima", ("lima",), None),
+    ("BOG", "Bogota", ("bogota",), None),
+    ("CCS", "Caracas", ("caracas",), None),
+    ("MEX", "Mexico City", ("mexico city",), None),
+    ("GDL", "Guadalajara", ("guadalajara",), None),
+    ("CUN", "Cancun", ("cancun",), None),
+
+    # Australia & Pacific
+    ("SYD", "Sydney", ("sydney",), None),
+    ("MEL", "Melbourne", ("melbourne",), None),
+    ("BNE", "Brisbane", ("brisbane",), None),
+    ("PER", "Perth", ("perth",), None),
+    ("ADL", "Adelaide", ("adelaide",), None),
+    ("AKL", "Auckland", ("auckland",), None),
+    ("WLG", "Wellington", ("wellington",), None),
+    ("NAN", "Fiji", ("fiji",), None),
+    ("HNL", "Honolulu", ("honolulu",), None),
+
+    # Additional major airports
+    ("ATL", "Atlanta", ("atlanta",), None),
+    ("DFW", "Dallas", ("dallas", "fort worth", "dallas fort worth"), None),
+    ("DEN", "Denver", ("denver",), None),
+    ("LAS", "Las Vegas", ("las vegas", "vegas"), None),
+    ("PHX", "Phoenix", ("phoenix",), None),
+    ("MCO", "Orlando", ("orlando",), None),
+    ("TPA", "Tampa", ("tampa",), None),
+    ("DTW", "Detroit", ("detroit",), None),
+    ("MSP", "Minneapolis", ("minneapolis",), None),
+    ("PHL", "Philadelphia", ("philadelphia", "philly"), None),
+    ("BWI", "Baltimore", ("baltimore",), None),
+    ("PIT", "Pittsburgh", ("pittsburgh",), None),
+    ("CLT", "Charlotte", ("charlotte",), None),
+    ("RDU", "Raleigh", ("raleigh",), None),
+    ("BNA", "Nashville", ("nashville",), None),
+    ("MEM", "Memphis", ("memphis",), None),
+    ("MSY", "New Orleans", ("new orleans", "nola"), None),
+    ("IAH", "Houston", ("houston",), None),
+    ("AUS", "Austin", ("austin",), None),
+    ("SAT", "San Antonio", ("san antonio",), None),
+    ("MCI", "Kansas City", ("kansas city",), None),
+    ("STL", "St Louis", ("st louis", "saint louis"), None),
+    ("IND", "Indianapolis", ("indianapolis",), None),
+    ("SDF", "Louisville", ("louisville",), None),
+    ("LEX", "Lexington", ("lexington",), None),
+    ("TYS", "Knoxville", ("knoxville",), None),
+    ("CHA", "Chattanooga", ("chattanooga",), None),
+    ("BHM", "Birmingham", ("birmingham",), None),
+    ("MOB", "Mobile", ("mobile",), None),
+    ("PNS", "Pensacola", ("pensacola",), None),
+    ("TLH", "Tallahassee", ("tallahassee",), None),
+    ("GNV", "Gainesville", ("gainesville",), None),
+    ("JAX", "Jacksonville", ("jacksonville",), None),
+    ("SAV", "Savannah", ("savannah",), None),
+    ("CHS", "Charleston", ("charleston",), None),
+    ("CAE", "Columbia", ("columbia",), None),
+    ("GSP", "Greenville", ("greenville",), None),
+    ("AVL", "Asheville", ("asheville",), None),
+    ("ILM", "Wilmington", ("wilmington",), None),
+    ("FAY", "Fayetteville", ("fayetteville",), None),
+    ("GSO", "Greensboro", ("greensboro",), None),
+    ("INT", "Winston-Salem", ("winston salem",), None),
+    ("RIC", "Richmond", ("richmond",), None),
+    ("ROA", "Roanoke", ("roanoke",), None),
+    ("LYH", "Lynchburg", ("lynchburg",), None),
+    ("CHO", "Charlottesville", ("charlottesville",), None),
+    ("SHD", "Harrisonburg", ("harrisonburg",), None),
+    ("BCB", "Blacksburg", ("blacksburg",), None),
+    ("RAD", "Radford", ("radford",), None),
+    ("ORF", "Norfolk", ("norfolk", "virginia beach", "chesapeake", "portsmouth", "suffolk", "hampton"), None),
+    ("PHF", "Newport News", (
+        "newport news", "williamsburg", "yorktown", "gloucester", "mathews", "middlesex",
+        "king and queen", "king william", "new kent", "charles city", "james city", "york",
+        "poquoson", "surry", "sussex", "southampton", "isle of wight", "franklin",
+    ), None),
+]
+
+# Aliases that are also everyday words; they only count when written in
+# capitals ("I'm mad" is not Madrid, "MAD" is). Every place's code is added
+# as an alias of this kind too, unless the table lists it explicitly.
+WORD_ALIASES = frozenset({"la", "sea", "den", "mad", "las", "mia", "ber", "mobile"})
+
+_TOKEN = re.compile(r"[A-Za-z]+")
+
+# Trie key holding the (place, alias, ambiguous) that ends at a node
+_END = ""
+
+
+def fold(text: str) -> str:
+    """Strip accents so "São Paulo" and "Zürich" match their ASCII aliases"""
+    if text.isascii():
+        return text
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def tokenize(text: str) -> Tuple[List[str], List[str]]:
+    """Word tokens of a text as written, and lowercased for matching"""
+    raw = _TOKEN.findall(fold(text or ""))
+    return raw, [token.lower() for token in raw]
+
+
+class Gazetteer:
+    """
+    Every known place name, alias and code in one token trie
+
+    Matching walks the trie from each token while the following tokens
+    extend a known alias and keeps the longest alias that ends there, so
+    "new york" wins over "york" and "los angeles" over "los". Tokens are
+    whole words, so "la" never matches inside "atlanta". A scan is a single
+    pass over the text; the work per token is bounded by the longest alias
+    (a handful of words), which keeps it linear in the message length.
+    """
+
+    def __init__(self, table=PLACE_TABLE, word_aliases=WORD_ALIASES):
+        self._trie: dict = {}
+        self._aliases: Dict[str, Place] = {}
+        self._ambiguous = set()
+        self._names: Dict[str, str] = {}
+        for code, name, aliases, airport in table:
+            place = Place(code, name, airport or code)
+            self._names.setdefault(code, name)
+            for alias in aliases:
+                self._add(alias, place, alias in word_aliases)
+        # Codes last, so an explicit alias ("sea" -> Seattle) is never overridden
+        for code, name, aliases, airport in table:
+            if code.lower() not in self._aliases:
+                self._add(code.lower(), Place(code, name, airport or code), True)
+
+    def _add(self, alias: str, place: Place, ambiguous: bool) -> None:
+        tokens = tokenize(alias)[1]
+        if not tokens or alias in self._aliases:
+            return
+        node = self._trie
+        for token in tokens:
+            node = node.setdefault(token, {})
+        node[_END] = (place, alias, ambiguous)
+        self._aliases[alias] = place
+        if ambiguous:
+            self._ambiguous.add(alias)
+
+    def __len__(self) -> int:
+        return len(self._aliases)
+
+    def aliases(self) -> Dict[str, Place]:
+        """Alias -> place for every name the gazetteer knows"""
+        return dict(self._aliases)
+
+    def entries(self) -> List[Tuple[str, Place, bool]]:
+        """(alias, place, ambiguous) for every name the gazetteer knows"""
+        return [(alias, place, alias in self._ambiguous) for alias, place in self._aliases.items()]
+
+    def name_for(self, code: str) -> Optional[str]:
+        return self._names.get(code)
+
+    def match_at(self, words: List[str], i: int) -> Optional[Tuple[Place, str, int, bool]]:
+        """Longest alias starting at token i: (place, alias, token count, ambiguous)"""
+        node = self._trie
+        best = None
+        for j in range(i, len(words)):
+            node = node.get(words[j])
+            if node is None:
+                break
+            end = node.get(_END)
+            if end is not None:
+                best = (end[0], end[1], j - i + 1, end[2])
+        return best
+
+    def find_all(self, text: str) -> List[Mention]:
+        """
+        Every place mention in a text, left to right without overlaps
+
+        Ambiguous aliases only count when written in capitals.
+        """
+        raw, words = tokenize(text)
+        mentions: List[Mention] = []
+        i = 0
+        while i < len(words):
+            match = self.match_at(words, i)
+            if match is not None and (not match[3] or raw[i].isupper()):
+                place, alias, length, ambiguous = match
+                mentions.append(Mention(place, alias, i, i + length, ambiguous))
+                i += length
+            else:
+                i += 1
+        return mentions
+
+    def lookup(self, name: str) -> Optional[Place]:
+        """Place whose alias is exactly name (any case, accents and punctuation ignored)"""
+        words = tokenize(name)[1]
+        if not words:
+            return None
+        match = self.match_at(words, 0)
+        if match is not None and match[2] == len(words):
+            return match[0]
+        return None
+
+
+GAZETTEER = Gazetteer()
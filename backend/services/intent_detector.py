@@ -7,7 +7,7 @@ from typing import Dict, List, Optional, Any
 from openai import OpenAI
 import os
 from datetime import datetime, timedelta
-import re
+from .date_parser import parse_date
 from .iata_codes import get_iata_code
 
 logger = logging.getLogger(__name__)
@@ -59,6 +59,7 @@ Detect the travel intent and extract relevant parameters. Return ONLY a JSON obj
         "return_date": "YYYY-MM-DD format if mentioned",
         "adults": "number of passengers",
         "max_price": "budget limit as number",
+        "non_stop": "true if only nonstop/direct flights are wanted",
         "check_in": "YYYY-MM-DD for hotels",
         "check_out": "YYYY-MM-DD for hotels",
         "latitude": "decimal for activities",
@@ -243,64 +244,8 @@ Return only the JSON object, no other text."""
         if not date_str or date_str in ["null", "None", ""]:
             return None
         
-        # If already in YYYY-MM-DD format, return as is
-        if re.match(r'\d{4}-\d{2}-\d{2}', date_str):
-            return date_str
-        
-        date_str_lower = date_str.lower().strip()
-        today = datetime.now()
-        
-        # Handle common relative dates
-        if date_str_lower in ["today"]:
-            return today.strftime("%Y-%m-%d")
-        elif date_str_lower in ["tomorrow"]:
-            return (today + timedelta(days=1)).strftime("%Y-%m-%d")
-        elif date_str_lower in ["day after tomorrow"]:
-            return (today + timedelta(days=2)).strftime("%Y-%m-%d")
-        elif "next week" in date_str_lower:
-            return (today + timedelta(weeks=1)).strftime("%Y-%m-%d")
-        elif "next month" in date_str_lower:
-            # Simple next month calculation
-            if today.month == 12:
-                next_month = today.replace(year=today.year + 1, month=1)
-            else:
-                next_month = today.replace(month=today.month + 1)
-            return next_month.strftime("%Y-%m-%d")
-        
-        # Handle month names, optionally with explicit year like "December 2025"
-        month_mapping = {
-            "january": "01", "february": "02", "march": "03", "april": "04",
-            "may": "05", "june": "06", "july": "07", "august": "08",
-            "september": "09", "october": "10", "november": "11", "december": "12"
-        }
-        
-        for month_name, month_num in month_mapping.items():
-            if month_name in date_str_lower:
-                # Try to capture explicit year if present (e.g., "December 2025")
-                year_match = re.search(r"(19|20)\d{2}", date_str_lower)
-                if year_match:
-                    year = int(year_match.group(0))
-                else:
-                    # Default to current year, or next year if month has passed
-                    year = today.year
-                    if int(month_num) < today.month:
-                        year = today.year + 1
-                return f"{year}-{month_num}-01"
-        
-        # Handle "this month" - return a date in the current month
-        if "this month" in date_str_lower:
-            return today.replace(day=15).strftime("%Y-%m-%d")
-        
-        # Handle "this week", "this month" etc.
-        if "this week" in date_str_lower:
-            # Return a date 3 days from now (middle of the week)
-            return (today + timedelta(days=3)).strftime("%Y-%m-%d")
-        elif "this month" in date_str_lower:
-            # Return 15th of current month
-            return today.replace(day=15).strftime("%Y-%m-%d")
-        
         # If we can't parse it, return None (will trigger API fallback)
-        return None
+        return parse_date(date_str)
     
     def _get_fallback_intent(self, message: str) -> Dict[str, Any]:
         """Return fallback intent when detection fails"""
@@ -0,0 +1,119 @@
+"""
+Cached timezone and locale formatting for the runtime context in system prompts
+"""
+import datetime
+import functools
+import logging
+from typing import NamedTuple, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+logger = logging.getLogger(__name__)
+
+
+@functools.lru_cache(maxsize=256)
+def resolve_timezone(name: str) -> Optional[ZoneInfo]:
+    """ZoneInfo for an IANA name, or None (logged once per unknown name)"""
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError) as e:
+        logger.warning(f"Unknown timezone {name!r}: {e}")
+        return None
+
+
+@functools.lru_cache(maxsize=128)
+def format_utc_offset(offset: Optional[datetime.timedelta]) -> str:
+    """UTC±HH:MM for an offset (a zone only has a few, so each is formatted once)"""
+    if not offset:
+        return "UTC+00:00"
+    minutes = int(offset.total_seconds()) // 60
+    sign = "+" if minutes >= 0 else "-"
+    hours, minutes = divmod(abs(minutes), 60)
+    return f"UTC{sign}{hours:02d}:{minutes:02d}"
+
+
+def format_local_time(now_iso: Optional[str], user_tz: Optional[str]) -> str:
+    """
+    now_iso in the user's timezone, e.g. "Mon, 19 Oct 2026 - 09:30 AM
+    (America/New_York, UTC-04:00)"; now_iso unchanged if either is missing
+    or invalid
+
+    now_iso differs on every request, so the result is not cached; the
+    timezone and offset lookups behind it are.
+    """
+    if not now_iso or not user_tz:
+        return now_iso or ""
+    zone = resolve_timezone(user_tz)
+    if zone is None:
+        return now_iso
+    try:
+        instant = datetime.datetime.fromisoformat(now_iso.replace('Z', '+00:00'))
+    except ValueError as e:
+        logger.error(f"Error formatting local time: {e}")
+        return now_iso
+    local = instant.astimezone(zone)
+    return local.strftime("%a, %d %b %Y - %I:%M %p") + f" ({user_tz}, {format_utc_offset(local.utcoffset())})"
+
+
+class LocaleFormat(NamedTuple):
+    """How a locale writes prices and dates"""
+    locale: str
+    currency: str
+    symbol: str
+    symbol_first: bool
+    decimals: int
+    decimal_sep: str
+    group_sep: str
+    date_pattern: str  # strftime pattern
+
+    def format_currency(self, amount: float) -> str:
+        number = f"{abs(amount):,.{self.decimals}f}".translate(
+            str.maketrans({",": self.group_sep, ".": self.decimal_sep}))
+        sign = "-" if amount < 0 else ""
+        if self.symbol_first:
+            return f"{sign}{self.symbol}{number}"
+        return f"{sign}{number} {self.symbol}"
+
+    def format_date(self, day: datetime.date) -> str:
+        return day.strftime(self.date_pattern)
+
+
+# Browser locales seen most often; others fall back on their language, then en-US
+_LOCALES = {
+    "en-US": ("USD", "$", True, 2, ".", ",", "%b %d, %Y"),
+    "en-GB": ("GBP", "£", True, 2, ".", ",", "%d %b %Y"),
+    "en-CA": ("CAD", "$", True, 2, ".", ",", "%b %d, %Y"),
+    "en-AU": ("AUD", "$", True, 2, ".", ",", "%d %b %Y"),
+    "en-IN": ("INR", "₹", True, 2, ".", ",", "%d %b %Y"),
+    "de-DE": ("EUR", "€", False, 2, ",", ".", "%d.%m.%Y"),
+    "fr-FR": ("EUR", "€", False, 2, ",", " ", "%d/%m/%Y"),
+    "fr-CA": ("CAD", "$", False, 2, ",", " ", "%Y-%m-%d"),
+    "es-ES": ("EUR", "€", False, 2, ",", ".", "%d/%m/%Y"),
+    "es-MX": ("MXN", "$", True, 2, ".", ",", "%d/%m/%Y"),
+    "it-IT": ("EUR", "€", False, 2, ",", ".", "%d/%m/%Y"),
+    "nl-NL": ("EUR", "€", True, 2, ",", ".", "%d-%m-%Y"),
+    "pt-BR": ("BRL", "R$", True, 2, ",", ".", "%d/%m/%Y"),
+    "ja-JP": ("JPY", "¥", True, 0, ".", ",", "%Y/%m/%d"),
+    "zh-CN": ("CNY", "¥", True, 2, ".", ",", "%Y/%m/%d"),
+    "ko-KR": ("KRW", "₩", True, 0, ".", ",", "%Y. %m. %d."),
+}
+_LANGUAGE_DEFAULTS = {locale.split("-")[0]: locale for locale in reversed(list(_LOCALES))}
+DEFAULT_LOCALE = "en-US"
+
+
+@functools.lru_cache(maxsize=128)
+def locale_format(user_locale: Optional[str]) -> LocaleFormat:
+    """Formatting rules for a BCP 47 locale ("de-DE", "en_gb", "fr"), built once per locale"""
+    parts = (user_locale or "").replace("_", "-").split("-")
+    language = parts[0].lower()
+    region = parts[1].upper() if len(parts) > 1 else ""
+    key = f"{language}-{region}"
+    if key not in _LOCALES:
+        key = _LANGUAGE_DEFAULTS.get(language, DEFAULT_LOCALE)
+    return LocaleFormat(key, *_LOCALES[key])
+
+
+@functools.lru_cache(maxsize=128)
+def locale_examples(user_locale: Optional[str]) -> str:
+    """A sample price and date in a locale, for the system prompt"""
+    formats = locale_format(user_locale)
+    return f"{formats.format_currency(1234.5)} ({formats.currency}), {formats.format_date(datetime.date(2026, 3, 14))}"
@@ -0,0 +1,152 @@
+"""
+Nearest-airport lookup: a k-d tree over airport positions on the unit sphere
+"""
+import heapq
+import logging
+import math
+import threading
+from typing import List, NamedTuple, Optional, Tuple
+from .airport_db import AIRPORTS, CITY_RADIUS_KM, EARTH_RADIUS_KM, AirportDatabase, AirportRecord, distance_km
+
+logger = logging.getLogger(__name__)
+
+# An international airport this much farther than the closest airport is still
+# preferred as a departure point (a regional strip rarely has useful flights)
+INTERNATIONAL_DETOUR_KM = 120.0
+# Beyond this, the nearest airport is no sensible guess at where the user flies from
+MAX_DEPARTURE_DISTANCE_KM = 300.0
+
+
+class NearbyAirport(NamedTuple):
+    airport: AirportRecord
+    distance_km: float
+
+
+def _unit_vector(lat: float, lon: float) -> Tuple[float, float, float]:
+    phi, lam = math.radians(lat), math.radians(lon)
+    return (math.cos(phi) * math.cos(lam), math.cos(phi) * math.sin(lam), math.sin(phi))
+
+
+def _chord_km(chord: float) -> float:
+    """Great-circle distance for a straight-line distance between unit vectors"""
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, chord / 2))
+
+
+class NearestAirportIndex:
+    """
+    k nearest airports to a position
+
+    Airports are placed on the unit sphere as 3-D vectors, where straight-line
+    distance orders points exactly like great-circle distance, and indexed in
+    a k-d tree. That avoids any special casing of the date line or the poles.
+    The tree is built from the airport database the first time it is
+    queried, because building it reads the whole table. Metro codes are left
+    out since they are not physical airports.
+    """
+
+    def __init__(self, database: AirportDatabase = AIRPORTS):
+        self.database = database
+        self._lock = threading.Lock()
+        self._built = False
+        self._codes: List[str] = []
+        self._points: List[Tuple[float, float, float]] = []
+        # Node arrays: point number, left child, right child (-1 for none); axis is depth % 3
+        self._node_point: List[int] = []
+        self._left: List[int] = []
+        self._right: List[int] = []
+        self._root = -1
+
+    def _build(self) -> None:
+        if self._built:
+            return
+        with self._lock:
+            if self._built:
+                return
+            for code, latitude, longitude in self.database.positions():
+                self._codes.append(code)
+                self._points.append(_unit_vector(latitude, longitude))
+            self._root = self._build_node(list(range(len(self._points))), 0)
+            self._built = True
+            logger.info(f"Nearest-airport index built over {len(self._codes)} airports")
+
+    def _build_node(self, numbers: List[int], depth: int) -> int:
+        if not numbers:
+            return -1
+        axis = depth % 3
+        numbers.sort(key=lambda number: self._points[number][axis])
+        middle = len(numbers) // 2
+        node = len(self._node_point)
+        self._node_point.append(numbers[middle])
+        self._left.append(-1)
+        self._right.append(-1)
+        self._left[node] = self._build_node(numbers[:middle], depth + 1)
+        self._right[node] = self._build_node(numbers[middle + 1:], depth + 1)
+        return node
+
+    def __len__(self) -> int:
+        self._build()
+        return len(self._codes)
+
+    def nearest(self, latitude: float, longitude: float, k: int = 5) -> List[NearbyAirport]:
+        """The k airports closest to a position, nearest first"""
+        self._build()
+        if self._root < 0 or k <= 0:
+            return []
+        target = _unit_vector(latitude, longitude)
+        # Max-heap of (-squared distance, point number) holding the best k so far
+        best: List[Tuple[float, int]] = []
+        # (node, depth, squared distance from the target to the node's region)
+        stack = [(self._root, 0, 0.0)]
+        while stack:
+            node, depth, bound = stack.pop()
+            if node < 0 or (len(best) == k and bound >= -best[0][0]):
+                continue
+            number = self._node_point[node]
+            point = self._points[number]
+            squared = ((point[0] - target[0]) ** 2 + (point[1] - target[1]) ** 2
+                       + (point[2] - target[2]) ** 2)
+            if len(best) < k:
+                heapq.heappush(best, (-squared, number))
+            elif squared < -best[0][0]:
+                heapq.heapreplace(best, (-squared, number))
+            axis = depth % 3
+            offset = target[axis] - point[axis]
+            near, far = (self._left[node], self._right[node]) if offset < 0 else (self._right[node], self._left[node])
+            # The far side is only worth visiting if the splitting plane is closer than the k-th best
+            stack.append((far, depth + 1, max(bound, offset * offset)))
+            stack.append((near, depth + 1, bound))
+        results = []
+        for negative_squared, number in sorted(best, reverse=True):
+            airport = self.database.get(self._codes[number])
+            if airport is not None:
+                results.append(NearbyAirport(airport, round(_chord_km(math.sqrt(-negative_squared)), 1)))
+        return results
+
+    def departure_airport(self, latitude: float, longitude: float, k: int = 8,
+                          destination: Optional[AirportRecord] = None) -> Optional[NearbyAirport]:
+        """
+        Airport to fly out of from a position: the nearest international
+        airport unless it is more than ``INTERNATIONAL_DETOUR_KM`` farther
+        than the nearest airport of any kind
+
+        None when no airport is within ``MAX_DEPARTURE_DISTANCE_KM`` (a
+        position at sea), or when the pick serves the same city as
+        ``destination`` (a user in Paris asking for flights to Paris).
+        """
+        nearby = self.nearest(latitude, longitude, k)
+        if not nearby or nearby[0].distance_km > MAX_DEPARTURE_DISTANCE_KM:
+            return None
+        limit = nearby[0].distance_km + INTERNATIONAL_DETOUR_KM
+        choice = nearby[0]
+        for candidate in nearby:
+            if candidate.distance_km > limit:
+                break
+            if "international" in candidate.airport.name.lower():
+                choice = candidate
+                break
+        if destination is not None and distance_km(choice.airport, destination) <= CITY_RADIUS_KM:
+            return None
+        return choice
+
+
+NEAREST_AIRPORTS = NearestAirportIndex()
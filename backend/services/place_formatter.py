@@ -0,0 +1,53 @@
+"""
+Bold-and-underline formatting of place names in assistant replies, in one regex pass
+"""
+import json
+import os
+import re
+from typing import Iterable, Optional
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "place_names.json")
+
+OPEN, CLOSE = "**__", "__**"
+
+
+class PlaceNameFormatter:
+    """
+    Wraps known place names and "<Capitalized> <Suffix>" names
+    ("Picasso Museum", "Boqueria Market") in ``**__...__**``
+
+    Names and suffix patterns are compiled into one alternation, longest
+    names first, together with an alternative that matches spans that are
+    already formatted. ``re.sub`` walks the text once, left to right, and
+    the callback leaves formatted spans untouched, so the cost is linear in
+    the reply length and no name is ever wrapped twice.
+    """
+
+    def __init__(self, names: Iterable[str], suffixes: Iterable[str] = ()):
+        names = sorted(set(names), key=len, reverse=True)
+        suffixes = sorted(set(suffixes), key=len, reverse=True)
+        alternatives = [re.escape(name) for name in names]
+        if suffixes:
+            alternatives.append(r"[A-Z][a-z]+ (?:" + "|".join(re.escape(suffix) for suffix in suffixes) + r")")
+        self._pattern = re.compile(
+            r"(?P<formatted>" + re.escape(OPEN) + r".*?" + re.escape(CLOSE) + r")"
+            r"|\b(?P<place>" + "|".join(alternatives) + r")\b"
+        )
+
+    @classmethod
+    def from_file(cls, path: str = DEFAULT_PATH) -> "PlaceNameFormatter":
+        """Load {"names": [...], "suffixes": [...]} from a JSON file"""
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data.get("names", []), data.get("suffixes", []))
+
+    @staticmethod
+    def _wrap(match: "re.Match[str]") -> str:
+        if match.group("formatted"):
+            return match.group("formatted")
+        return f"{OPEN}{match.group('place')}{CLOSE}"
+
+    def format(self, text: Optional[str]) -> Optional[str]:
+        if not text:
+            return text
+        return self._pattern.sub(self._wrap, text)
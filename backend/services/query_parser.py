@@ -0,0 +1,111 @@
+"""
+Request-scoped parse of a chat message: tokens, keyword score, route and dates, each computed once
+"""
+import datetime
+import threading
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, TypeVar
+from .date_parser import DateRange, parse_dates
+from .flight_keywords import FlightKeywordMatcher, KeywordMatch
+from .gazetteer import tokenize
+from .route_parser import ParsedRoute, parse_route
+
+T = TypeVar("T")
+
+# Marks a stage that has not run yet (None is a valid result for dates)
+_PENDING = object()
+
+
+class ParsedQuery:
+    """
+    Everything the chat flow extracts from one message
+
+    The message is folded and tokenized once, up front, and the route and
+    keyword stages work on those tokens; the date stage uses them to skip
+    messages that cannot hold a date (date formats depend on digits and
+    punctuation, so its pattern still reads the text). The keyword score,
+    route and dates are computed on first access and kept, so each stage
+    runs at most once per request whichever code path asks for it, and
+    stages a request never reaches (dates when there is no route) cost
+    nothing. ``timings`` holds milliseconds per stage that ran.
+    """
+
+    __slots__ = ("message", "raw_tokens", "tokens", "timings", "_matcher", "_today",
+                 "_keywords", "_route", "_dates")
+
+    def __init__(self, message: str, matcher: Optional[FlightKeywordMatcher] = None,
+                 today: Optional[datetime.date] = None):
+        self.message = message or ""
+        self.timings: Dict[str, float] = {}
+        self._matcher = matcher
+        self._today = today
+        self._keywords = self._route = self._dates = _PENDING
+        self.raw_tokens, self.tokens = self._timed("tokenize", lambda: tokenize(self.message))
+
+    def _timed(self, stage: str, compute: Callable[[], T]) -> T:
+        start = time.perf_counter()
+        result = compute()
+        self.timings[stage] = round((time.perf_counter() - start) * 1000, 3)
+        return result
+
+    @property
+    def route(self) -> ParsedRoute:
+        if self._route is _PENDING:
+            self._route = self._timed("route", lambda: parse_route(self.message, (self.raw_tokens, self.tokens)))
+        return self._route
+
+    @route.setter
+    def route(self, route: ParsedRoute) -> None:
+        """Replace the parsed route (an origin filled from the user's location)"""
+        self._route = route
+
+    @property
+    def keywords(self) -> KeywordMatch:
+        if self._keywords is _PENDING:
+            if self._matcher is None:
+                raise ValueError("ParsedQuery has no keyword matcher")
+            route = self.route
+            self._keywords = self._timed("keywords", lambda: self._matcher.match(
+                self.message, route=route, tokens=(self.raw_tokens, self.tokens)))
+        return self._keywords
+
+    @property
+    def dates(self) -> Optional[DateRange]:
+        if self._dates is _PENDING:
+            self._dates = self._timed("dates", lambda: parse_dates(self.message, self._today, self.tokens))
+        return self._dates
+
+    @property
+    def total_ms(self) -> float:
+        return round(sum(self.timings.values()), 3)
+
+    def __repr__(self) -> str:
+        stages = " ".join(f"{stage}={ms}ms" for stage, ms in self.timings.items())
+        return f"ParsedQuery({self.message[:40]!r}, {stages})"
+
+
+class ParseTimings:
+    """Running per-stage totals over many parsed queries, for diagnostics"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._count: Dict[str, int] = defaultdict(int)
+        self._total_ms: Dict[str, float] = defaultdict(float)
+
+    def record(self, query: ParsedQuery) -> None:
+        with self._lock:
+            for stage, ms in query.timings.items():
+                self._count[stage] += 1
+                self._total_ms[stage] += ms
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            stages: List[str] = sorted(self._count)
+            return {
+                stage: {
+                    'count': self._count[stage],
+                    'mean_ms': round(self._total_ms[stage] / self._count[stage], 3),
+                }
+                for stage in stages
+            }
@@ -0,0 +1,184 @@
+"""
+Redis-protocol L2 cache backend, shared by every replica behind the load balancer
+"""
+import json
+import logging
+import math
+import time
+from typing import Any, Iterable, List, Optional
+from urllib.parse import urlsplit, urlunsplit
+from .cache_backend import INDEXED_FIELDS, BackendEntry, CacheBackend
+from .cache_codec import EncodedValue
+
+try:
+    import redis
+except ImportError:  # optional: only needed when a Redis URL is configured
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+# Keys per DEL/EXISTS pipeline batch when deleting or cleaning up many entries
+_BATCH_SIZE = 500
+
+# Adds a key (ARGV[1]) to the index sets in KEYS and extends each set's expiry to
+# at least ARGV[2] seconds, never shortening it (EXPIRE GT without needing Redis 7)
+_INDEX_SCRIPT = """
+local ttl = tonumber(ARGV[2])
+for _, index_key in ipairs(KEYS) do
+    redis.call('SADD', index_key, ARGV[1])
+    if redis.call('TTL', index_key) < ttl then
+        redis.call('EXPIRE', index_key, ttl)
+    end
+end
+"""
+
+
+def _redact(url: str) -> str:
+    parts = urlsplit(url)
+    if parts.password is None:
+        return url
+    netloc = f"{parts.username or ''}:***@{parts.hostname}" + (f":{parts.port}" if parts.port else "")
+    return urlunsplit(parts._replace(netloc=netloc))
+
+
+class RedisCacheTier(CacheBackend):
+    """
+    Cache tier in any Redis-protocol server (Redis, Valkey, KeyDB, ...)
+
+    Connections come from a shared pool and multi-command operations are
+    pipelined, so a write (entry plus its index memberships) is a single
+    round trip. Entries expire through Redis TTLs. Each entry is stored as
+    a JSON metadata line followed by the JSON value, so pre-serialized
+    values are written as-is.
+
+    Secondary indexes are Redis sets of keys per session, API type and
+    route. Each set expires with the longest-lived entry written to it, so
+    an index that is no longer written to disappears on its own; members
+    whose entry expired earlier are pruned by ``delete_by`` and by
+    ``purge_expired``, which the app runs periodically. The expiry is
+    extended by a small Lua script, which any server with EVAL runs.
+
+    The client is synchronous. CacheManager callers on an event loop go
+    through ``CacheManager.run_blocking``, which runs L2 calls on a worker
+    thread so a round trip never blocks the loop.
+
+    Pass ``client`` to use an existing client instead of ``url``, e.g. a
+    ``fakeredis.FakeRedis()`` for local runs without a server.
+    """
+
+    def __init__(self, url: str = "redis://localhost:6379/0", prefix: str = "miles:cache:",
+                 max_connections: int = 16, socket_timeout: float = 0.5, client: Any = None):
+        if client is None:
+            if redis is None:
+                raise ImportError("RedisCacheTier requires the 'redis' package (pip install redis)")
+            pool = redis.ConnectionPool.from_url(
+                url,
+                max_connections=max_connections,
+                socket_timeout=socket_timeout,
+                socket_connect_timeout=socket_timeout,
+            )
+            client = redis.Redis(connection_pool=pool)
+            self.location = _redact(url)
+        else:
+            self.location = f"{type(client).__name__} client"
+        self._client = client
+        self.prefix = prefix
+        self._index_script = client.register_script(_INDEX_SCRIPT)
+
+    def _entry_key(self, key: str) -> str:
+        return f"{self.prefix}e:{key}"
+
+    def _index_key(self, field: str, value: str) -> str:
+        return f"{self.prefix}i:{field}:{value}"
+
+    def get(self, key: str) -> Optional[BackendEntry]:
+        raw = self._client.get(self._entry_key(key))
+        if raw is None:
+            return None
+        try:
+            if isinstance(raw, bytes):
+                raw = raw.decode("utf-8")
+            meta, _, payload = raw.partition("\n")
+            stored_at, stale_at, expires_at, api_type, session_id, route = json.loads(meta)
+            entry = BackendEntry(json.loads(payload), stored_at, stale_at, expires_at, api_type, session_id, route)
+        except ValueError:
+            logger.warning(f"Dropping undecodable L2 cache entry {key}")
+            self.delete(key)
+            return None
+        # Redis expires the key itself; this only guards against clock skew between hosts
+        return entry if entry.expires_at > time.time() else None
+
+    def set(self, key: str, api_type: str, value: Any, ttl: float, soft_ttl: Optional[float] = None,
+            session_id: Optional[str] = None, route: Optional[str] = None) -> bool:
+        try:
+            if isinstance(value, EncodedValue):
+                payload = value.json_bytes().decode("utf-8")
+            else:
+                payload = json.dumps(value, separators=(",", ":"))
+        except (TypeError, ValueError):
+            logger.debug(f"Skipping L2 write for {key}: value is not JSON-serializable")
+            return False
+        now = time.time()
+        meta = json.dumps([now, now + (ttl if soft_ttl is None else soft_ttl), now + ttl, api_type, session_id, route],
+                          separators=(",", ":"))
+        pipe = self._client.pipeline(transaction=False)
+        pipe.set(self._entry_key(key), f"{meta}\n{payload}", px=max(1, int(ttl * 1000)))
+        index_keys = [
+            self._index_key(field, field_value)
+            for field, field_value in (("session_id", session_id), ("api_type", api_type), ("route", route))
+            if field_value is not None
+        ]
+        self._index_script(keys=index_keys, args=[key, max(1, math.ceil(ttl))], client=pipe)
+        pipe.execute()
+        return True
+
+    def delete(self, key: str) -> None:
+        self._client.delete(self._entry_key(key))
+
+    def delete_by(self, field: str, value: str) -> int:
+        if field not in INDEXED_FIELDS:
+            raise ValueError(f"Cannot invalidate by {field!r}; expected one of {INDEXED_FIELDS}")
+        index_key = self._index_key(field, value)
+        # Read and drop the index atomically so concurrent writers are not lost mid-way
+        pipe = self._client.pipeline(transaction=True)
+        pipe.smembers(index_key)
+        pipe.delete(index_key)
+        members, _ = pipe.execute()
+        return self._delete_entries(self._entry_key(self._text(member)) for member in members)
+
+    def purge_expired(self) -> int:
+        """Redis expires entries itself; this only prunes dead index members (returns 0)"""
+        for index_key in self._client.scan_iter(match=f"{self.prefix}i:*", count=_BATCH_SIZE):
+            members = [self._text(member) for member in self._client.smembers(index_key)]
+            for start in range(0, len(members), _BATCH_SIZE):
+                batch = members[start:start + _BATCH_SIZE]
+                pipe = self._client.pipeline(transaction=False)
+                for member in batch:
+                    pipe.exists(self._entry_key(member))
+                dead = [member for member, exists in zip(batch, pipe.execute()) if not exists]
+                if dead:
+                    self._client.srem(index_key, *dead)
+        return 0
+
+    def clear(self) -> None:
+        self._delete_entries(self._client.scan_iter(match=f"{self.prefix}*", count=_BATCH_SIZE))
+
+    def __len__(self) -> int:
+        # SCAN over the prefix: O(n), meant for diagnostics only
+        return sum(1 for _ in self._client.scan_iter(match=f"{self.prefix}e:*", count=_BATCH_SIZE))
+
+    def _delete_entries(self, keys: Iterable) -> int:
+        deleted = 0
+        batch: List = []
+        for key in keys:
+            batch.append(key)
+            if len(batch) >= _BATCH_SIZE:
+                deleted += self._client.delete(*batch)
+                batch = []
+        if batch:
+            deleted += self._client.delete(*batch)
+        return deleted
+
+    @staticmethod
+    def _text(value: Any) -> str:
+        return value.decode("utf-8") if isinstance(value, bytes) else value
@@ -0,0 +1,142 @@
+"""
+Single-pass route parser: finds origin and destination places in a chat message
+"""
+from typing import List, NamedTuple, Optional, Tuple
+from .airport_db import AIRPORTS
+from .fuzzy_places import FUZZY_PLACES
+from .gazetteer import GAZETTEER, tokenize
+
+# Words that mark the role of the place right after them
+_ORIGIN, _DESTINATION = "origin", "destination"
+_MARKERS = {"from": _ORIGIN, "to": _DESTINATION, "between": _ORIGIN}
+
+# Uppercase three-letter words that are never airport codes
+_NOT_CODES = frozenset({"THE", "AND", "FOR", "YOU", "ANY", "ALL", "ARE", "CAN", "NOT", "BUT", "HOW", "WHO", "ONE", "USA"})
+
+
+class ParsedRoute(NamedTuple):
+    """Origin and destination found in a message, with how sure the parser is (0-1)"""
+    origin_code: Optional[str] = None
+    origin_name: Optional[str] = None
+    destination_code: Optional[str] = None
+    destination_name: Optional[str] = None
+    confidence: float = 0.0
+
+    @property
+    def complete(self) -> bool:
+        return bool(self.origin_code and self.destination_code)
+
+    def to_route_info(self) -> dict:
+        """The route dict used by the flight data generator and the dashboard"""
+        return {
+            'departure': self.origin_name,
+            'destination': self.destination_name,
+            'departureCode': self.origin_code,
+            'destinationCode': self.destination_code,
+        }
+
+
+# Longest word window tried against the fuzzy index after a from/to
+_MAX_FUZZY_TOKENS = 3
+
+
+class _Mention(NamedTuple):
+    code: str
+    name: str
+    role: Optional[str]  # from the marker right before it, if any
+
+
+def _fuzzy_at(words: List[str], i: int):
+    """(place, token count) for the longest window at token i close to a known name"""
+    end = i
+    while end < len(words) and end - i < _MAX_FUZZY_TOKENS and words[end] not in _MARKERS:
+        end += 1
+    for length in range(end - i, 0, -1):
+        match = FUZZY_PLACES.best(" ".join(words[i:i + length]))
+        if match is not None:
+            return match.place, length
+    return None
+
+
+def _mentions(raw: List[str], words: List[str]) -> List[_Mention]:
+    """Place mentions in order, from one pass over the tokens (longest gazetteer alias wins)"""
+    mentions: List[_Mention] = []
+    role = None
+    i = 0
+    while i < len(words):
+        word = words[i]
+        if word in _MARKERS:
+            role = _MARKERS[word]
+            i += 1
+            continue
+        if word == "and" and mentions and mentions[-1].role == _ORIGIN and role is None:
+            # "between X and Y"
+            role = _DESTINATION
+            i += 1
+            continue
+        match = GAZETTEER.match_at(words, i)
+        # Everyday-word aliases ("I'm mad") need capitals or a from/to right before them
+        if match is not None and (not match[3] or role is not None or raw[i].isupper()):
+            place, _, length, _ = match
+            mentions.append(_Mention(place.airport, place.name, role))
+            i += length
+        elif role is not None and (fuzzy := _fuzzy_at(words, i)) is not None:
+            # A misspelled place right after a marker ("from barcelonna")
+            place, length = fuzzy
+            mentions.append(_Mention(place.airport, place.name, role))
+            i += length
+        else:
+            token = raw[i]
+            if len(token) == 3 and token.isupper() and token not in _NOT_CODES:
+                record = AIRPORTS.get(token)
+                if record is not None:
+                    mentions.append(_Mention(token, record.city, role))
+            i += 1
+        role = None
+    return mentions
+
+
+def parse_route(message: str, tokens: Optional[Tuple[List[str], List[str]]] = None) -> ParsedRoute:
+    """
+    Find the origin and destination in a message; pass its ``tokenize``
+    output as tokens if the caller already has it
+
+    Explicit markers ("from X to Y", "between X and Y") give confidence
+    1.0; positional forms ("X to Y", "flights to X to Y") 0.9; two bare
+    place names 0.6; a single place only fills one side (0.3).
+    """
+    mentions = _mentions(*(tokens or tokenize(message or "")))
+    if not mentions:
+        return ParsedRoute()
+    origins = [i for i, m in enumerate(mentions) if m.role == _ORIGIN]
+    destinations = [i for i, m in enumerate(mentions) if m.role == _DESTINATION]
+    origin = destination = None
+    if origins and destinations:
+        origin, destination, confidence = origins[0], destinations[0], 1.0
+    elif len(destinations) >= 2:
+        # "flights to X to Y"
+        origin, destination, confidence = destinations[0], destinations[1], 0.9
+    elif destinations:
+        destination = destinations[0]
+        # "X to Y": the last place before the destination is the origin
+        origin = destination - 1 if destination > 0 else None
+        confidence = 0.9 if origin is not None else 0.3
+    elif origins:
+        origin = origins[0]
+        # "from X, Y": the next place after the origin
+        destination = origin + 1 if origin + 1 < len(mentions) else None
+        confidence = 0.9 if destination is not None else 0.3
+    elif len(mentions) >= 2:
+        origin, destination, confidence = 0, 1, 0.6
+    else:
+        # A lone unmarked place ("Paris flights") is most likely where they want to go
+        destination, confidence = 0, 0.3
+    origin = mentions[origin] if origin is not None else None
+    destination = mentions[destination] if destination is not None else None
+    return ParsedRoute(
+        origin.code if origin else None,
+        origin.name if origin else None,
+        destination.code if destination else None,
+        destination.name if destination else None,
+        confidence,
+    )
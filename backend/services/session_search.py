@@ -0,0 +1,252 @@
+"""
+Per-session state of the last flight search, for answering follow-ups in memory
+"""
+import heapq
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from cachetools import TTLCache
+from .cache_engine import estimate_size
+from .query_parser import ParsedQuery
+
+logger = logging.getLogger(__name__)
+
+# Follow-up phrasings, checked in order; the first match wins
+_REFINEMENTS: List[Tuple[str, "re.Pattern[str]"]] = [
+    ("nonstop", re.compile(r"\b(non-?stop|direct(?!\s+(?:me|us|you|them)\b))\b")),
+    ("cheaper", re.compile(r"\b(cheaper|cheapest|lower price|less expensive|sort by price|by price)\b")),
+    ("shorter", re.compile(r"\b(shorter|shortest|fastest|quickest|sort by duration|by duration)\b")),
+    ("earlier", re.compile(r"\b(earlier|earliest)\b")),
+    ("later", re.compile(r"\b(later|latest)\b")),
+    ("return", re.compile(r"\b(the return|return flights?|way back|coming back|flying back)\b")),
+]
+
+# A follow-up is about the stored flights if it names them ("cheaper ones",
+# "the return flights") or is a short bare command ("nonstop only", "sort by price")
+_FLIGHT_SUBJECT = re.compile(r"\b(flights?|ones?|options?|fares?|prices?|results?|tickets?|outbound|return"
+                             r"|departures?|them|those|these)\b")
+_MAX_BARE_WORDS = 4
+# ...unless it is about something else entirely ("cheapest hotels", "latest news")
+_OTHER_SUBJECT = re.compile(r"\b(hotels?|rooms?|stays?|hostels?|news|weather|restaurants?|food|bars?|museums?"
+                            r"|activit(?:y|ies)|tours?|things to do|cars?|rentals?|trains?|bus(?:es)?)\b")
+
+_DURATION = re.compile(r"(?:(\d+)\s*h)?\s*(?:(\d+)\s*m)?", re.IGNORECASE)
+
+
+def _price(flight: dict) -> float:
+    try:
+        return float(flight.get("price"))
+    except (TypeError, ValueError):
+        return float("inf")
+
+
+def _duration_minutes(flight: dict) -> float:
+    """Minutes from "7h 30m" (dashboard) or "PT7H30M" (Amadeus) durations"""
+    duration = flight.get("duration")
+    if duration is None and flight.get("itineraries"):
+        duration = flight["itineraries"][0].get("duration")
+    match = _DURATION.search(str(duration or "").replace("PT", ""))
+    if not match or not any(match.groups()):
+        return float("inf")
+    hours, minutes = match.groups()
+    return int(hours or 0) * 60 + int(minutes or 0)
+
+
+def _stops(flight: dict) -> int:
+    if "stops" in flight:
+        return flight["stops"]
+    itineraries = flight.get("itineraries") or [{}]
+    return max(len(itinerary.get("segments") or [None]) - 1 for itinerary in itineraries)
+
+
+def _departure(flight: dict) -> str:
+    departure = flight.get("departure")
+    if departure is None and flight.get("itineraries"):
+        segments = flight["itineraries"][0].get("segments") or [{}]
+        departure = segments[0].get("departure", {}).get("time")
+    return str(departure or "~")
+
+
+# Refinement -> (sort key, reverse) for re-ranking, or a filter predicate
+_SORTS: Dict[str, Tuple[Callable[[dict], Any], bool]] = {
+    "cheaper": (_price, False),
+    "shorter": (_duration_minutes, False),
+    "earlier": (_departure, False),
+    "later": (_departure, True),
+}
+_FILTERS: Dict[str, Callable[[dict], bool]] = {
+    "nonstop": lambda flight: _stops(flight) == 0,
+}
+
+# Result fields holding flight lists that refinements apply to
+_FLIGHT_LISTS = ("outboundFlights", "returnFlights", "flights")
+
+
+class SearchState:
+    """The last structured search of a session and the refinements applied since"""
+
+    __slots__ = ("route", "result", "refinements", "size", "updated_at")
+
+    def __init__(self, route: dict, result: dict):
+        self.route = route
+        self.result = result
+        self.refinements: List[str] = []
+        self.size = estimate_size(route) + estimate_size(result)
+        self.updated_at = time.time()
+
+
+def detect_refinement(message: str, query: Optional[ParsedQuery] = None) -> Optional[str]:
+    """
+    Name of the refinement a follow-up message asks for, or None for a new search
+
+    Only follow-ups about the flights themselves count. A message about
+    another subject ("cheapest hotels in Paris", "latest news") or naming
+    any place or date, in any case ("from miami to seattle next week"), is
+    a new request. Pass the request's ParsedQuery to reuse its route and
+    dates.
+    """
+    text = (message or "").lower()
+    if _OTHER_SUBJECT.search(text):
+        return None
+    query = query or ParsedQuery(message)
+    if len(query.tokens) > _MAX_BARE_WORDS and not _FLIGHT_SUBJECT.search(text):
+        return None
+    refinement = next((name for name, pattern in _REFINEMENTS if pattern.search(text)), None)
+    if refinement is None:
+        return None
+    route = query.route
+    if route.origin_code or route.destination_code or query.dates is not None:
+        return None
+    return refinement
+
+
+def apply_refinements(result: dict, refinements: List[str]) -> dict:
+    """Filter and re-rank a copy of a full result set; the last sort requested wins"""
+    refined = dict(result)
+    sort = next((name for name in reversed(refinements) if name in _SORTS), None)
+    filters = [_FILTERS[name] for name in refinements if name in _FILTERS]
+    for field in _FLIGHT_LISTS:
+        flights = result.get(field)
+        if not isinstance(flights, list):
+            continue
+        flights = [flight for flight in flights if all(keep(flight) for keep in filters)]
+        if sort is not None:
+            key, reverse = _SORTS[sort]
+            flights = sorted(flights, key=key, reverse=reverse)
+        refined[field] = flights
+    if "count" in result and isinstance(refined.get("flights"), list):
+        refined["count"] = len(refined["flights"])
+    if "return" in refinements:
+        refined["focus"] = "return"
+    refined["refinements"] = list(refinements)
+    return refined
+
+
+class SessionSearchStore:
+    """
+    Keeps each session's last flight search so follow-ups such as "show
+    cheaper ones", "nonstop only" or "what about the return?" are answered
+    by filtering and re-ranking the stored result set, without re-running
+    route extraction or a search.
+
+    Only the ``max_offers`` cheapest flights of each list are kept (a full
+    Amadeus result of 250 offers is close to 1 MB), so follow-ups re-rank
+    those. Every state is sized once when stored: a single session may use
+    at most ``max_session_bytes`` and all sessions together
+    ``max_total_bytes`` (least recently used sessions are evicted first). A
+    session's state expires after ``idle_ttl`` seconds without being read
+    or written.
+    """
+
+    def __init__(self, idle_ttl: int = 1800, max_session_bytes: int = 256 * 1024,
+                 max_total_bytes: int = 16 * 1024 * 1024, max_offers: int = 50):
+        self.idle_ttl = idle_ttl
+        self.max_session_bytes = max_session_bytes
+        self.max_offers = max_offers
+        self.max_total_bytes = max_total_bytes
+        self._states: TTLCache = TTLCache(maxsize=max_total_bytes, ttl=idle_ttl,
+                                          getsizeof=lambda state: state.size)
+        self._lock = threading.Lock()
+        self._counters: Counter = Counter()
+
+    def remember(self, session_id: str, route: dict, result: dict) -> bool:
+        """Store a session's latest search, replacing the previous one"""
+        if not session_id or not isinstance(result, dict) or result.get("error"):
+            return False
+        state = SearchState(route or {}, self._cheapest(result))
+        with self._lock:
+            if state.size > self.max_session_bytes:
+                self._states.pop(session_id, None)
+                self._counters['oversize'] += 1
+                logger.debug(f"Not keeping search state for {session_id}: {state.size} bytes over budget")
+                return False
+            self._states[session_id] = state
+        return True
+
+    def _cheapest(self, result: dict) -> dict:
+        """A copy of result keeping the max_offers cheapest flights of each list, in their original order"""
+        kept = dict(result)
+        for field in _FLIGHT_LISTS:
+            flights = result.get(field)
+            if not isinstance(flights, list) or len(flights) <= self.max_offers:
+                continue
+            cheapest = {id(flight) for flight in heapq.nsmallest(self.max_offers, flights, key=_price)}
+            kept[field] = [flight for flight in flights if id(flight) in cheapest]
+            with self._lock:
+                self._counters['trimmed'] += 1
+        if "count" in result and isinstance(kept.get("flights"), list):
+            kept["count"] = len(kept["flights"])
+        return kept
+
+    def get(self, session_id: str) -> Optional[SearchState]:
+        """A session's state; reading it counts as activity and renews the idle TTL"""
+        with self._lock:
+            state = self._states.get(session_id)
+            if state is not None:
+                # Re-inserting restarts the TTL
+                self._states[session_id] = state
+            return state
+
+    def refine(self, session_id: str, message: str, query: Optional[ParsedQuery] = None) -> Optional[dict]:
+        """Answer a follow-up from the stored search, or None if it needs a new search"""
+        refinement = detect_refinement(message, query)
+        if refinement is None:
+            return None
+        state = self.get(session_id)
+        if state is None:
+            with self._lock:
+                self._counters['misses'] += 1
+            return None
+        with self._lock:
+            if refinement in _SORTS:
+                state.refinements = [name for name in state.refinements if name not in _SORTS]
+            if refinement not in state.refinements:
+                state.refinements.append(refinement)
+            refinements = list(state.refinements)
+            state.updated_at = time.time()
+            self._counters['refinements'] += 1
+        logger.info(f"Refining last search for session {session_id} in memory: {refinements}")
+        return apply_refinements(state.result, refinements)
+
+    def forget(self, session_id: str) -> None:
+        with self._lock:
+            self._states.pop(session_id, None)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            self._states.expire()
+            return {
+                'sessions': len(self._states),
+                'bytes_used': self._states.currsize,
+                'max_total_bytes': self.max_total_bytes,
+                'max_session_bytes': self.max_session_bytes,
+                'max_offers': self.max_offers,
+                'idle_ttl': self.idle_ttl,
+                'refinements': self._counters['refinements'],
+                'misses': self._counters['misses'],
+                'oversize': self._counters['oversize'],
+                'trimmed': self._counters['trimmed'],
+            }
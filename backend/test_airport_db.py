@@ -0,0 +1,43 @@
+"""
+Tests for city-name resolution against the bundled airport database
+"""
+import os
+import sys
+
+import pytest
+
+# Add backend directory to path
+sys.path.append(os.path.dirname(__file__))
+
+from services.airport_db import AIRPORTS
+from services.nearest_airports import NEAREST_AIRPORTS
+
+
+@pytest.mark.parametrize("city, code", [
+    ("London", "LON"),
+    ("Paris", "PAR"),
+    ("Denver", "DEN"),
+    ("Kansas City", "MCI"),
+    ("Nashville", "BNA"),
+])
+def test_unambiguous_cities_resolve(city, code):
+    assert AIRPORTS.resolve_city(city).code == code
+
+
+@pytest.mark.parametrize("city", ["Valencia", "Bali", "Cordoba", "Santa Cruz", "Portland", "Manchester"])
+def test_ambiguous_or_minor_names_fall_through(city):
+    assert AIRPORTS.resolve_city(city) is None
+
+
+def test_departure_airport_is_the_nearest_international_one():
+    assert NEAREST_AIRPORTS.departure_airport(42.36, -71.06, destination=AIRPORTS.get("DEN")).airport.code == "BOS"
+
+
+@pytest.mark.parametrize("latitude, longitude, destination", [
+    (48.8566, 2.3522, "CDG"),   # already in the destination city
+    (48.8566, 2.3522, "PAR"),   # ... named by its metro code
+    (-30.0, -140.0, None),      # mid-Pacific, no airport within reach
+])
+def test_no_departure_airport_for_same_city_or_remote_positions(latitude, longitude, destination):
+    assert NEAREST_AIRPORTS.departure_airport(
+        latitude, longitude, destination=AIRPORTS.get(destination) if destination else None) is None
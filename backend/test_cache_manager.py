@@ -0,0 +1,248 @@
+"""
+Tests for CacheManager semantics: TTLs, indexes, stale-while-revalidate, negative entries and snapshots
+"""
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+
+# Add backend directory to path
+sys.path.append(os.path.dirname(__file__))
+
+from services.adaptive_ttl import AdaptiveTTLPolicy
+from services.cache_engine import INDEX_FIELDS
+from services.cache_manager import MAX_TRANSIENT_NEGATIVE_TTL, CacheManager
+from services.flight_query_planner import FlightQueryPlanner
+
+PARAMS = {'origin': 'BOS', 'destination': 'DEN', 'departure_date': '2026-12-05'}
+FLIGHTS = {'flights': [{'price': 310}], 'count': 1}
+
+
+def _entry(cache, key):
+    shard = cache._l1.shard_for(key)
+    return shard.cache.get(key)
+
+
+def _index_keys(cache, field):
+    keys = set()
+    for shard in cache._l1.shards:
+        for members in shard.indexes[field].values():
+            keys |= members
+    return keys
+
+
+def _live_keys(cache):
+    return {key for shard in cache._l1.shards for key, _ in shard.peek()}
+
+
+# Variable TTL
+
+def test_ttl_comes_from_the_api_type_policy():
+    cache = CacheManager(ttl_policies={'flight_search': 120}, default_ttl=30, stale_grace={})
+    cache.set("s1", "flight_search", PARAMS, FLIGHTS)
+    cache.set("s1", "hotel_search", {'destination': 'PAR'}, {'hotels': [1]})
+    assert _entry(cache, cache._generate_key("s1", "flight_search", PARAMS, shared=True)).ttl == 120
+    assert _entry(cache, cache._generate_key("s1", "hotel_search", {'destination': 'PAR'})).ttl == 30
+
+
+def test_entries_expire_after_their_own_ttl():
+    cache = CacheManager(stale_grace={})
+    cache.set("s1", "flight_search", PARAMS, FLIGHTS, ttl=0.05)
+    cache.set("s1", "location_search", {'keyword': 'paris'}, {'locations': [1]})
+    time.sleep(0.1)
+    assert cache.get("s1", "flight_search", PARAMS) is None
+    assert cache.get("s1", "location_search", {'keyword': 'Paris'}) == {'locations': [1]}
+
+
+def test_equivalent_params_share_one_key():
+    cache = CacheManager()
+    cache.set("s1", "flight_search", PARAMS, FLIGHTS)
+    same = {'origin': 'bos ', 'destination': 'den', 'departure_date': '2026-12-05', 'adults': '1'}
+    assert cache.get("s2", "flight_search", same) == FLIGHTS
+
+
+# Session overlay
+
+def test_personalized_values_are_only_served_to_their_session():
+    cache = CacheManager()
+    cache.set("s1", "flight_search", PARAMS, FLIGHTS)
+    cache.set("s2", "flight_search", PARAMS, {'flights': [{'price': 99}]}, personalized=True)
+    assert cache.get("s1", "flight_search", PARAMS) == FLIGHTS
+    assert cache.get("s2", "flight_search", PARAMS) == {'flights': [{'price': 99}]}
+    cache.clear_session("s2")
+    assert cache.get("s2", "flight_search", PARAMS) == FLIGHTS
+
+
+# Secondary indexes
+
+def test_indexes_follow_lru_eviction():
+    cache = CacheManager(max_bytes=None, maxsize=5, shards=1)
+    for day in range(1, 21):
+        cache.set(f"s{day % 3}", "hotel_search", {'destination': 'PAR', 'check_in': f'2026-12-{day:02d}'},
+                  {'hotels': [day]})
+    live = _live_keys(cache)
+    assert len(live) == 5
+    for field in INDEX_FIELDS[:2]:
+        assert _index_keys(cache, field) == live
+    assert cache.invalidate_api_type("hotel_search") == 5
+    assert cache.get_stats()['indexed'] == {field: 0 for field in INDEX_FIELDS}
+
+
+def test_indexes_follow_byte_budget_eviction():
+    cache = CacheManager(max_bytes=20_000, shards=1)
+    for number in range(50):
+        cache.set("s1", "flight_search", dict(PARAMS, origin=f"A{number:02d}"), {'flights': ['x' * 500]})
+    live = _live_keys(cache)
+    assert 0 < len(live) < 50
+    assert _index_keys(cache, 'route') == live
+    assert cache.get_stats()['memory']['bytes_used'] <= 20_000
+
+
+def test_invalidate_route_removes_only_that_route():
+    cache = CacheManager()
+    cache.set("s1", "flight_search", PARAMS, FLIGHTS)
+    cache.set("s1", "flight_search", dict(PARAMS, destination='SEA'), FLIGHTS)
+    assert cache.invalidate_route("bos", "den") == 1
+    assert cache.get("s1", "flight_search", PARAMS) is None
+    assert cache.get("s1", "flight_search", dict(PARAMS, destination='SEA')) == FLIGHTS
+
+
+# Stale-while-revalidate
+
+def test_stale_entry_is_served_while_one_refresh_runs():
+    cache = CacheManager(stale_grace={'flight_search': 60})
+    calls = []
+
+    async def loader(params):
+        calls.append(params)
+        await asyncio.sleep(0.01)
+        return {'flights': [{'price': 280}], 'count': 1}
+
+    cache.register_loader("flight_search", loader)
+    cache.set("s1", "flight_search", PARAMS, FLIGHTS, ttl=0.05)
+    time.sleep(0.1)
+
+    async def scenario():
+        first = cache.lookup("s1", "flight_search", PARAMS)
+        second = cache.lookup("s1", "flight_search", PARAMS)
+        await asyncio.gather(*cache._refresh_tasks)
+        return first, second, cache.lookup("s1", "flight_search", PARAMS)
+
+    first, second, refreshed = asyncio.run(scenario())
+    assert first.stale and first.value == FLIGHTS and second.stale
+    assert len(calls) == 1
+    assert not refreshed.stale and refreshed.value['flights'][0]['price'] == 280
+    assert cache.get_stats()['stale_while_revalidate']['refreshes'] == 1
+
+
+def test_failed_refresh_keeps_serving_the_stale_value():
+    cache = CacheManager(stale_grace={'flight_search': 60})
+    cache.register_loader("flight_search", lambda params: {'error': 'upstream down', 'status_code': 503})
+    cache.set("s1", "flight_search", PARAMS, FLIGHTS, ttl=0.05)
+    time.sleep(0.1)
+
+    async def scenario():
+        cache.lookup("s1", "flight_search", PARAMS)
+        await asyncio.gather(*cache._refresh_tasks)
+        return cache.lookup("s1", "flight_search", PARAMS)
+
+    result = asyncio.run(scenario())
+    # Still stale, so the second lookup retries the refresh
+    assert result.stale and result.value == FLIGHTS
+    stats = cache.get_stats()['stale_while_revalidate']
+    assert stats['refreshes'] == 0 and stats['refresh_failures'] >= 1
+
+
+# Negative entries
+
+def test_negative_entries_read_as_misses_but_are_reported_by_lookup():
+    cache = CacheManager()
+    assert cache.set_negative("s1", "flight_search", PARAMS, {'flights': [], 'count': 0})
+    assert cache.get("s1", "flight_search", PARAMS) is None
+    result = cache.lookup("s1", "flight_search", PARAMS)
+    assert result.negative and not result.stale
+    stats = cache.get_stats()
+    assert stats['negative']['hits'] == 2 and stats['tiers']['shared']['hits'] == 0
+
+
+def test_transient_errors_are_cached_briefly_and_never_replace_data():
+    cache = CacheManager(negative_ttls={'transient': 600})
+    assert cache.negative_ttls['transient'] == MAX_TRANSIENT_NEGATIVE_TTL
+    cache.set("s1", "flight_search", PARAMS, FLIGHTS)
+    assert not cache.set_negative("s1", "flight_search", PARAMS, {'error': 'timeout', 'status_code': 504})
+    assert cache.get("s1", "flight_search", PARAMS) == FLIGHTS
+    assert not cache.set_negative("s1", "flight_search", PARAMS, FLIGHTS)
+
+
+# Snapshots
+
+def test_snapshot_restores_the_hottest_entries(tmp_path):
+    path = str(tmp_path / "snapshot.jsonl")
+    cache = CacheManager(serialize_values=True)
+    for destination in ('DEN', 'SEA', 'MIA'):
+        cache.set("s1", "flight_search", dict(PARAMS, destination=destination), {'flights': [destination]})
+    for _ in range(3):
+        cache.get("s1", "flight_search", dict(PARAMS, destination='SEA'))
+    cache.get("s1", "flight_search", dict(PARAMS, destination='MIA'))
+    assert cache.snapshot(path, limit=2) == 2
+
+    restored = CacheManager()
+    assert asyncio.run(restored.restore_snapshot(path)) == 2
+    assert restored.get("s2", "flight_search", dict(PARAMS, destination='SEA')) == {'flights': ['SEA']}
+    assert restored.get("s2", "flight_search", dict(PARAMS, destination='MIA')) == {'flights': ['MIA']}
+    assert restored.get("s2", "flight_search", PARAMS) is None
+
+
+def test_snapshot_skips_negative_entries(tmp_path):
+    path = str(tmp_path / "snapshot.jsonl")
+    cache = CacheManager()
+    cache.set_negative("s1", "flight_search", PARAMS, {'flights': [], 'count': 0})
+    assert cache.snapshot(path) == 0
+
+
+# Adaptive TTL accounting
+
+def test_saved_calls_count_once_per_base_ttl_window():
+    cache = CacheManager(ttl_policies={'flight_search': 300}, stale_grace={}, adaptive_ttl=AdaptiveTTLPolicy())
+    cache.set("s1", "flight_search", PARAMS, FLIGHTS, ttl=3600)
+    entry = _entry(cache, cache._generate_key("s1", "flight_search", PARAMS, shared=True))
+    entry.stored_at -= 400
+    for _ in range(5):
+        cache.get("s1", "flight_search", PARAMS)
+    assert cache.get_stats()['adaptive_ttl']['saved_calls'] == 1
+    entry.stored_at -= 300
+    cache.get("s1", "flight_search", PARAMS)
+    assert cache.get_stats()['adaptive_ttl']['saved_calls'] == 2
+
+
+# Query planner
+
+@pytest.fixture
+def planner():
+    return FlightQueryPlanner(CacheManager())
+
+
+def _offer(price, segments=1):
+    return {'price': price, 'itineraries': [{'segments': [{}] * segments}]}
+
+
+def test_tighter_price_cap_is_answered_from_a_looser_one(planner):
+    cache = planner.cache
+    capped = dict(PARAMS, max_price=500)
+    assert planner.lookup("s1", "flight_search", capped) is None
+    cache.set("s1", "flight_search", capped, {'flights': [_offer(300), _offer(450, 2), _offer(480)], 'count': 3})
+    result = planner.lookup("s1", "flight_search", dict(PARAMS, max_price=400))
+    assert [offer['price'] for offer in result.value['flights']] == [300]
+    result = planner.lookup("s1", "flight_search", dict(PARAMS, max_price=490, non_stop=True))
+    assert [offer['price'] for offer in result.value['flights']] == [300, 480]
+    assert planner.lookup("s1", "flight_search", dict(PARAMS, max_price=600)) is None
+    # One hit or miss per planner lookup, however many keys it probed
+    assert cache.get_stats()['tiers']['shared'] == {'hits': 2, 'misses': 2, 'hit_rate': 0.5}
+
+
+def test_refinements_are_answered_from_an_unfiltered_result(planner):
+    planner.cache.set("s1", "flight_search", PARAMS, {'flights': [_offer(300, 2), _offer(420)], 'count': 2})
+    result = planner.lookup("s1", "flight_search", dict(PARAMS, non_stop=True))
+    assert result.value == {'flights': [_offer(420)], 'count': 1}
@@ -0,0 +1,40 @@
+"""
+Golden-corpus tests for the route and date parsers (benchmarks/data/*.jsonl)
+"""
+import datetime
+import json
+import os
+import sys
+
+import pytest
+
+# Add backend directory to path
+sys.path.append(os.path.dirname(__file__))
+
+from services.date_parser import parse_dates
+from services.gazetteer import tokenize
+from services.route_parser import parse_route
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks", "data")
+
+
+def load_corpus(name):
+    with open(os.path.join(CORPUS_DIR, name), encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+@pytest.mark.parametrize("case", load_corpus("route_corpus.jsonl"), ids=lambda case: case["message"])
+def test_route_corpus(case):
+    route = parse_route(case["message"])
+    assert (route.origin_code, route.destination_code) == (case["origin"], case["destination"])
+    # Same answer from tokens computed up front, as ParsedQuery passes them
+    assert parse_route(case["message"], tokenize(case["message"])) == route
+
+
+@pytest.mark.parametrize("case", load_corpus("date_corpus.jsonl"), ids=lambda case: case["message"])
+def test_date_corpus(case):
+    today = datetime.date.fromisoformat(case["today"])
+    dates = parse_dates(case["message"], today)
+    got = (dates.start.isoformat(), dates.end.isoformat() if dates.end else None) if dates else (None, None)
+    assert got == (case["start"], case["end"])
+    assert parse_dates(case["message"], today, tokenize(case["message"])[1]) == dates
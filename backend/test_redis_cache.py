@@ -0,0 +1,95 @@
+"""
+Tests for the Redis L2 cache tier against an in-process fakeredis server
+"""
+import asyncio
+import os
+import sys
+import threading
+
+import pytest
+
+# Add backend directory to path
+sys.path.append(os.path.dirname(__file__))
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from services.cache_manager import CacheManager
+from services.redis_cache import RedisCacheTier
+
+PARAMS = {'origin': 'BOS', 'destination': 'DEN', 'date': '2026-12-05'}
+
+
+@pytest.fixture
+def client():
+    return fakeredis.FakeRedis()
+
+
+@pytest.fixture
+def tier(client):
+    return RedisCacheTier(client=client)
+
+
+def test_set_and_get_round_trip(tier):
+    assert tier.set("k1", "flight_search", {"flights": [1, 2]}, ttl=60, soft_ttl=30,
+                    session_id="s1", route="BOS-DEN")
+    entry = tier.get("k1")
+    assert entry.value == {"flights": [1, 2]}
+    assert (entry.api_type, entry.session_id, entry.route) == ("flight_search", "s1", "BOS-DEN")
+    assert entry.stale_at < entry.expires_at
+    assert len(tier) == 1
+
+
+def test_index_sets_expire_with_longest_entry(tier, client):
+    tier.set("short", "flight_search", {}, ttl=30, route="BOS-DEN")
+    tier.set("long", "flight_search", {}, ttl=600, route="BOS-DEN")
+    tier.set("shorter", "flight_search", {}, ttl=10, route="BOS-DEN")
+    index_ttl = client.ttl(tier._index_key("route", "BOS-DEN"))
+    assert 590 < index_ttl <= 600
+    assert 0 < client.ttl(tier._index_key("api_type", "flight_search")) <= 600
+
+
+def test_delete_by_and_purge_prune_index(tier, client):
+    tier.set("k1", "flight_search", {}, ttl=60, session_id="s1")
+    tier.set("k2", "hotel_search", {}, ttl=60, session_id="s1")
+    tier.set("k3", "flight_search", {}, ttl=60, session_id="s2")
+    assert tier.delete_by("session_id", "s1") == 2
+    assert tier.get("k1") is None and tier.get("k3") is not None
+    # An entry that expired before its index: purge drops the dead member
+    client.delete(tier._entry_key("k3"))
+    assert tier.purge_expired() == 0
+    assert client.smembers(tier._index_key("api_type", "flight_search")) == set()
+
+
+def test_cache_manager_reads_through_redis(client):
+    writer = CacheManager(l2=RedisCacheTier(client=client), serialize_values=True)
+    writer.set("s1", "flight_search", PARAMS, {"flights": [{"price": 310}]})
+    # A second replica with a cold L1 is served from Redis
+    reader = CacheManager(l2=RedisCacheTier(client=client), serialize_values=True)
+    result = reader.lookup("s1", "flight_search", PARAMS)
+    assert result.value == {"flights": [{"price": 310}]}
+    assert reader.get_stats()['l2']['hits'] == 1
+
+
+def test_run_blocking_keeps_l2_calls_off_the_event_loop(client):
+    calls = []
+
+    class RecordingClient:
+        """Delegates to fakeredis, recording which thread each call runs on"""
+
+        def __getattr__(self, name):
+            calls.append(threading.current_thread())
+            return getattr(client, name)
+
+    cache = CacheManager(l2=RedisCacheTier(client=RecordingClient()))
+
+    async def scenario():
+        await cache.run_blocking(cache.set, "s1", "flight_search", PARAMS, {"flights": [{"price": 310}]})
+        # Drop the in-memory copy so the lookup has to read Redis
+        for shard in cache._l1.shards:
+            shard.clear()
+        calls.clear()
+        return await cache.run_blocking(cache.lookup, "s1", "flight_search", PARAMS)
+
+    result = asyncio.run(scenario())
+    assert result is not None
+    assert calls and all(thread is not threading.main_thread() for thread in calls)
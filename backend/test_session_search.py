@@ -0,0 +1,88 @@
+"""
+Tests for follow-up detection and in-memory refinement of a session's last flight search
+"""
+import os
+import sys
+
+import pytest
+
+# Add backend directory to path
+sys.path.append(os.path.dirname(__file__))
+
+from services.session_search import SessionSearchStore, detect_refinement
+
+ROUTE = {'departure': 'Boston', 'destination': 'Denver', 'departureCode': 'BOS', 'destinationCode': 'DEN'}
+RESULT = {
+    'route': ROUTE,
+    'outboundFlights': [
+        {'id': '1', 'price': 420, 'stops': 1, 'duration': '5h 10m', 'departure': '09:00'},
+        {'id': '2', 'price': 310, 'stops': 0, 'duration': '4h 05m', 'departure': '13:30'},
+        {'id': '3', 'price': 515, 'stops': 0, 'duration': '3h 55m', 'departure': '07:15'},
+    ],
+    'returnFlights': [],
+}
+
+
+@pytest.mark.parametrize("message, refinement", [
+    ("show cheaper ones", "cheaper"),
+    ("nonstop only", "nonstop"),
+    ("only direct flights please", "nonstop"),
+    ("sort by duration", "shorter"),
+    ("any later ones?", "later"),
+    ("what about the return flights?", "return"),
+])
+def test_flight_follow_ups_are_refinements(message, refinement):
+    assert detect_refinement(message) == refinement
+
+
+@pytest.mark.parametrize("message", [
+    "cheapest flights from miami to seattle next week",
+    "cheaper flights from boston to chicago",
+    "nonstop to denver",
+    "cheapest flights next friday",
+])
+def test_lowercase_new_routes_and_dates_are_new_searches(message):
+    assert detect_refinement(message) is None
+
+
+@pytest.mark.parametrize("message", [
+    "cheapest hotels in Paris",
+    "latest news",
+    "direct me to the nearest museum",
+    "what are the cheapest things to do in lisbon",
+    "can you tell me about the best places to eat, the earliest they open",
+])
+def test_non_flight_messages_are_not_refinements(message):
+    assert detect_refinement(message) is None
+
+
+def test_refine_reranks_stored_search():
+    store = SessionSearchStore()
+    store.remember("s1", ROUTE, RESULT)
+    refined = store.refine("s1", "show cheaper ones")
+    assert [flight['id'] for flight in refined['outboundFlights']] == ['2', '1', '3']
+    refined = store.refine("s1", "nonstop only")
+    assert [flight['id'] for flight in refined['outboundFlights']] == ['2', '3']
+    assert refined['refinements'] == ['cheaper', 'nonstop']
+
+
+def test_new_lowercase_route_is_not_answered_from_previous_search():
+    store = SessionSearchStore()
+    store.remember("s1", ROUTE, RESULT)
+    assert store.refine("s1", "cheapest flights from miami to seattle next week") is None
+    assert store.refine("s1", "cheapest hotels in Paris") is None
+    assert store.refine("s1", "latest news") is None
+    assert store.get_stats()['refinements'] == 0
+
+
+def test_full_upstream_result_is_kept_as_its_cheapest_offers():
+    store = SessionSearchStore(max_offers=50)
+    segment = {'departure': {'iataCode': 'BOS', 'at': '2026-12-05T09:00:00'},
+               'arrival': {'iataCode': 'DEN', 'at': '2026-12-05T13:00:00'}, 'carrierCode': 'UA', 'number': '1234'}
+    offers = [{'id': str(i), 'price': 900 - i, 'itineraries': [{'duration': 'PT4H', 'segments': [segment] * 3}],
+               'travelerPricings': [{'fareDetailsBySegment': [{'cabin': 'ECONOMY', 'class': 'K'}] * 6}]}
+              for i in range(250)]
+    assert store.remember("s1", ROUTE, {'flights': offers, 'count': 250})
+    refined = store.refine("s1", "show cheaper ones")
+    assert refined['count'] == 50
+    assert [flight['price'] for flight in refined['flights']][:2] == [651, 652]